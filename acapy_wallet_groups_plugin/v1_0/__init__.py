@@ -1,14 +1,35 @@
 """Handles the initialization of the plugin."""
 
 import logging
-from importlib import metadata
 
 from acapy_agent.admin.request_context import InjectionContext
+from acapy_agent.core.event_bus import EventBus
+from acapy_agent.core.util import SHUTDOWN_EVENT_PATTERN, STARTUP_EVENT_PATTERN
 from acapy_agent.wallet.models.wallet_record import WalletRecord
 
+from .activity import ActivityTracker
+from .cache import GroupProfileCacheInstaller
+from .change_feed import GroupChangeFeed
+from .config import WalletGroupsConfig
+from .events import WALLET_EVENT_PATTERN
+from .idempotency import IdempotencyStore
+from .quotas import GroupQuotas
+from .search import GroupSearchIndex
+from .snapshot import GroupSnapshots
+from .tracing import Tracer, load_exporter
+
 LOGGER = logging.getLogger(__name__)
 
-__version__ = metadata.version("acapy_wallet_groups_plugin")
+
+def __getattr__(name: str):
+    # Looking up the installed version scans the distributions on sys.path,
+    # so it is only done when asked for
+    if name == "__version__":
+        from importlib import metadata
+
+        return metadata.version("acapy_wallet_groups_plugin")
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
 # ------------------------------------------
 # The code below done because ACA-Py, version 0.7.4 does not support custom
@@ -34,7 +55,7 @@ WalletRecord.__init__ = custom_wallet_init
 # ------------------------------------------
 
 
-async def setup(_: InjectionContext):
+async def setup(context: InjectionContext):
     """Plugin initialization call.
 
     This function is automatically called by ACA-Py during start up.
@@ -42,4 +63,114 @@ async def setup(_: InjectionContext):
     Args:
         context (InjectionContext): Context injected by ACA-Py.
     """
+    config = WalletGroupsConfig.from_settings(context.settings)
+    context.injector.bind_instance(WalletGroupsConfig, config)
+
+    event_bus = context.inject(EventBus)
+
+    change_feed = GroupChangeFeed(
+        config.change_feed_max_events, config.change_feed_max_groups
+    )
+    context.injector.bind_instance(GroupChangeFeed, change_feed)
+    event_bus.subscribe(WALLET_EVENT_PATTERN, change_feed.on_wallet_event)
+
+    # Groups are indexed on their first search
+    search_index = GroupSearchIndex(config.search_max_groups, config.group_page_size)
+    context.injector.bind_instance(GroupSearchIndex, search_index)
+    event_bus.subscribe(WALLET_EVENT_PATTERN, search_index.on_wallet_event)
+
+    if config.tracing_exporter:
+        tracer = Tracer(load_exporter(config.tracing_exporter))
+        context.injector.bind_instance(Tracer, tracer)
+
+    if config.idempotency_ttl > 0:
+        idempotency = IdempotencyStore(
+            config.idempotency_ttl, config.idempotency_lock_timeout
+        )
+        context.injector.bind_instance(IdempotencyStore, idempotency)
+
+    if config.snapshot_ttl > 0:
+        snapshots = GroupSnapshots(config.snapshot_ttl, config.group_page_size)
+        context.injector.bind_instance(GroupSnapshots, snapshots)
+
+    if config.group_quotas_enabled:
+        quotas = GroupQuotas(config.group_quotas, config.default_group_quota)
+        context.injector.bind_instance(GroupQuotas, quotas)
+
+    # Modules of features the routes do not always need are imported when
+    # enabled, to keep them out of the agent's start up
+    if config.endorser_setup_deferred:
+        from .endorser_setup import EndorserSetupQueue
+
+        endorser_setup = EndorserSetupQueue(config.endorser_setup_concurrency)
+        context.injector.bind_instance(EndorserSetupQueue, endorser_setup)
+        event_bus.subscribe(WALLET_EVENT_PATTERN, endorser_setup.on_wallet_event)
+        event_bus.subscribe(SHUTDOWN_EVENT_PATTERN, endorser_setup.on_shutdown)
+
+    if config.activity_tracking:
+        tracker = ActivityTracker(config.activity_flush_interval)
+        context.injector.bind_instance(ActivityTracker, tracker)
+        event_bus.subscribe(WALLET_EVENT_PATTERN, tracker.on_wallet_event)
+        event_bus.subscribe(STARTUP_EVENT_PATTERN, tracker.on_startup)
+        event_bus.subscribe(SHUTDOWN_EVENT_PATTERN, tracker.on_shutdown)
+
+    if config.reconcile_interval > 0:
+        from .reconciler import GroupReconciler
+
+        reconciler = GroupReconciler(
+            config.reconcile_interval,
+            config.reconcile_batch_size,
+            config.reconcile_records_per_second,
+        )
+        context.injector.bind_instance(GroupReconciler, reconciler)
+        event_bus.subscribe(STARTUP_EVENT_PATTERN, reconciler.on_startup)
+        event_bus.subscribe(SHUTDOWN_EVENT_PATTERN, reconciler.on_shutdown)
+
+    # Other agent instances are only reachable once started
+    if config.invalidation_backend:
+        from .invalidation import InvalidationBus, load_backend
+
+        invalidation_bus = InvalidationBus(load_backend(config))
+        context.injector.bind_instance(InvalidationBus, invalidation_bus)
+        event_bus.subscribe(WALLET_EVENT_PATTERN, invalidation_bus.on_wallet_event)
+        event_bus.subscribe(STARTUP_EVENT_PATTERN, invalidation_bus.on_startup)
+        event_bus.subscribe(SHUTDOWN_EVENT_PATTERN, invalidation_bus.on_shutdown)
+
+    # Shard stores are opened, and filled from the base wallet, once started
+    if config.shards:
+        from .sharding import ShardRouter
+
+        router = ShardRouter(
+            config.shards,
+            config.shard_groups,
+            page_size=config.group_page_size,
+            shared=config.shards_shared,
+        )
+        context.injector.bind_instance(ShardRouter, router)
+        event_bus.subscribe(WALLET_EVENT_PATTERN, router.on_wallet_event)
+        event_bus.subscribe(STARTUP_EVENT_PATTERN, router.on_startup)
+        event_bus.subscribe(SHUTDOWN_EVENT_PATTERN, router.on_shutdown)
+
+    # The multitenant manager, and its profile cache, exist once started
+    if config.group_profile_cache_enabled:
+        installer = GroupProfileCacheInstaller(
+            pinned_groups=config.cache_pinned_groups,
+            group_weights=config.cache_group_weights,
+            default_weight=config.cache_default_weight,
+        )
+        event_bus.subscribe(STARTUP_EVENT_PATTERN, installer.on_startup)
+
+    # Profiles can only be opened once the base profile exists, after start up
+    if config.warmup_groups:
+        from .warmup import ProfileWarmer
+
+        warmer = ProfileWarmer(
+            config.warmup_groups,
+            concurrency=config.warmup_concurrency,
+            limit=config.warmup_limit,
+            page_size=config.group_page_size,
+        )
+        event_bus.subscribe(STARTUP_EVENT_PATTERN, warmer.on_startup)
+        event_bus.subscribe(SHUTDOWN_EVENT_PATTERN, warmer.on_shutdown)
+
     LOGGER.info("ACA-Py Wallet Groups plugin set up.")
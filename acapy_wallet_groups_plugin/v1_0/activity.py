@@ -0,0 +1,252 @@
+"""Track the last activity of tenant wallets, to find idle wallets per group.
+
+Admin requests made with a tenant token touch the wallet in memory only. The
+touches are written periodically, in a single transaction per batch, to an
+activity record per wallet, tagged with the wallet's group and its last
+activity time. Idle wallets of a group are then found with a tag query on
+those records, without reading the wallets themselves.
+
+Wallets are tracked from the moment they are created, or first used, after
+tracking is enabled.
+"""
+
+import asyncio
+import json
+import logging
+import time
+from typing import Dict, List, Optional, Set, Tuple
+
+from acapy_agent.admin.request_context import AdminRequestContext
+from acapy_agent.core.event_bus import Event
+from acapy_agent.core.profile import Profile
+from acapy_agent.storage.base import BaseStorage
+from acapy_agent.storage.error import StorageError, StorageNotFoundError
+from acapy_agent.storage.record import StorageRecord
+from aiohttp import web
+
+from .events import WALLET_CREATED, WALLET_EVENT_TOPIC_PREFIX, WALLET_REMOVED
+
+LOGGER = logging.getLogger(__name__)
+
+ACTIVITY_RECORD_TYPE = "wallet_groups_activity"
+
+
+def _time_tag(timestamp: float) -> str:
+    # Zero padded, so that the plaintext tag orders like the number
+    return f"{int(timestamp):012d}"
+
+
+class ActivityTracker:
+    """Records wallet activity in memory and flushes it in batches."""
+
+    def __init__(self, flush_interval: float = 60.0):
+        """Initialize the tracker.
+
+        Args:
+            flush_interval: seconds between writes of the recorded activity
+        """
+        self.flush_interval = flush_interval
+        # Wallet id to last activity time and group
+        self.pending: Dict[str, Tuple[float, Optional[str]]] = {}
+        # Wallets that moved group without activity since, to be retagged
+        self.moved: Dict[str, Optional[str]] = {}
+        self.removed: Set[str] = set()
+        self.task: Optional[asyncio.Task] = None
+
+    def touch(self, wallet_id: str, group_id: Optional[str] = None):
+        """Record activity of a wallet."""
+        self.pending[wallet_id] = (time.time(), group_id)
+
+    def last_active(self, wallet_id: str) -> Optional[float]:
+        """Return the unflushed last activity time of a wallet, if any."""
+        pending = self.pending.get(wallet_id)
+        return pending[0] if pending else None
+
+    async def on_wallet_event(self, profile: Profile, event: Event):
+        """Event bus handler keeping activity records in line with wallet changes."""
+
+        state = event.topic[len(WALLET_EVENT_TOPIC_PREFIX) :]
+        wallet_id = event.payload["wallet_id"]
+        group_id = event.payload.get("group_id")
+
+        if state == WALLET_CREATED:
+            self.touch(wallet_id, group_id)
+        elif state == WALLET_REMOVED:
+            self.pending.pop(wallet_id, None)
+            self.moved.pop(wallet_id, None)
+            self.removed.add(wallet_id)
+        elif group_id != event.payload.get("previous_group_id"):
+            pending = self.pending.get(wallet_id)
+            if pending:
+                self.pending[wallet_id] = (pending[0], group_id)
+            else:
+                self.moved[wallet_id] = group_id
+
+    async def flush(self, profile: Profile) -> int:
+        """Write the recorded activity to storage in a single transaction.
+
+        Returns:
+            The number of activity records written or deleted
+        """
+
+        pending, self.pending = self.pending, {}
+        moved, self.moved = self.moved, {}
+        removed, self.removed = self.removed, set()
+        if not (pending or moved or removed):
+            return 0
+
+        try:
+            async with profile.transaction() as txn:
+                storage = txn.inject(BaseStorage)
+                for wallet_id, (last_active, group_id) in pending.items():
+                    await self._write(storage, wallet_id, last_active, group_id)
+                for wallet_id, group_id in moved.items():
+                    await self._retag(storage, wallet_id, group_id)
+                for wallet_id in removed:
+                    await self._delete(storage, wallet_id)
+                await txn.commit()
+        except StorageError:
+            # Keep the batch for the next flush, unless newer activity arrived
+            for wallet_id, entry in pending.items():
+                self.pending.setdefault(wallet_id, entry)
+            for wallet_id, group_id in moved.items():
+                self.moved.setdefault(wallet_id, group_id)
+            self.removed |= removed
+            raise
+
+        return len(pending) + len(moved) + len(removed)
+
+    async def _write(
+        self,
+        storage: BaseStorage,
+        wallet_id: str,
+        last_active: float,
+        group_id: Optional[str],
+    ):
+        tags = {"~last_active": _time_tag(last_active)}
+        if group_id:
+            tags["group_id"] = group_id
+
+        try:
+            record = await storage.get_record(ACTIVITY_RECORD_TYPE, wallet_id)
+        except StorageNotFoundError:
+            await storage.add_record(
+                StorageRecord(
+                    ACTIVITY_RECORD_TYPE,
+                    json.dumps({"last_active": last_active}),
+                    tags,
+                    wallet_id,
+                )
+            )
+            return
+
+        # Another agent instance may have flushed more recent activity
+        last_active = max(last_active, json.loads(record.value)["last_active"])
+        tags["~last_active"] = _time_tag(last_active)
+        if not group_id and "group_id" in record.tags:
+            tags["group_id"] = record.tags["group_id"]
+        await storage.update_record(
+            record, json.dumps({"last_active": last_active}), tags
+        )
+
+    async def _retag(
+        self, storage: BaseStorage, wallet_id: str, group_id: Optional[str]
+    ):
+        try:
+            record = await storage.get_record(ACTIVITY_RECORD_TYPE, wallet_id)
+        except StorageNotFoundError:
+            return
+
+        tags = {"~last_active": record.tags["~last_active"]}
+        if group_id:
+            tags["group_id"] = group_id
+        await storage.update_record(record, record.value, tags)
+
+    async def _delete(self, storage: BaseStorage, wallet_id: str):
+        try:
+            record = await storage.get_record(ACTIVITY_RECORD_TYPE, wallet_id)
+        except StorageNotFoundError:
+            return
+        await storage.delete_record(record)
+
+    async def idle_wallets(
+        self,
+        profile: Profile,
+        group_id: str,
+        since: float,
+        limit: int = 100,
+        offset: int = 0,
+    ) -> List[dict]:
+        """Return wallets of the group without activity since a point in time.
+
+        Args:
+            profile: the base profile
+            group_id: the group to search
+            since: epoch seconds; wallets last active before are idle
+            limit: maximum number of activity records to read
+            offset: number of activity records to skip
+        """
+
+        async with profile.session() as session:
+            records = await session.inject(BaseStorage).find_paginated_records(
+                ACTIVITY_RECORD_TYPE,
+                {"group_id": group_id, "~last_active": {"$lt": _time_tag(since)}},
+                limit=limit,
+                offset=offset,
+            )
+
+        results = []
+        for record in records:
+            # Activity that is not flushed yet
+            last_active = self.last_active(record.id)
+            if last_active is not None and last_active >= since:
+                continue
+            results.append(
+                {
+                    "wallet_id": record.id,
+                    "last_active": json.loads(record.value)["last_active"],
+                }
+            )
+        return results
+
+    async def _run(self, profile: Profile):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush(profile)
+            except StorageError:
+                LOGGER.exception("Failed to flush wallet activity")
+
+    async def on_startup(self, profile: Profile, event: Event):
+        """Event bus handler starting the periodic flush."""
+
+        if not self.task:
+            self.task = asyncio.create_task(self._run(profile))
+
+    async def on_shutdown(self, profile: Profile, event: Event):
+        """Event bus handler stopping the periodic flush, after a last flush."""
+
+        if self.task:
+            self.task.cancel()
+            self.task = None
+        try:
+            await self.flush(profile)
+        except StorageError:
+            LOGGER.exception("Failed to flush wallet activity on shutdown")
+
+
+@web.middleware
+async def activity_middleware(request: web.BaseRequest, handler):
+    """Touch the wallet of tenant admin requests."""
+
+    context: Optional[AdminRequestContext] = request.get("context")
+    # Only requests authenticated with a tenant token carry the wallet id, the
+    # base profile has a `wallet.id` setting as well
+    metadata = context.metadata if context else None
+    wallet_id = metadata and metadata.get("wallet_id")
+    if wallet_id:
+        tracker = context.profile.inject_or(ActivityTracker)
+        if tracker:
+            tracker.touch(wallet_id, context.profile.settings.get("wallet.group_id"))
+
+    return await handler(request)
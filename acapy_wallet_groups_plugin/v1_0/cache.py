@@ -0,0 +1,209 @@
+"""Group aware replacement for the ACA-Py multitenant profile cache.
+
+ACA-Py evicts the least recently used wallet profile once the cache is full,
+regardless of the tenant. This cache never evicts profiles of pinned groups,
+and otherwise evicts from the group using the largest share of the cache
+relative to its configured weight, so a burst of activity in one group can
+only push out its own profiles once it has used up its share.
+"""
+
+import logging
+from collections import Counter
+from dataclasses import dataclass
+from typing import Dict, Iterable, Optional
+
+from acapy_agent.core.event_bus import Event
+from acapy_agent.core.profile import Profile
+from acapy_agent.multitenant.base import BaseMultitenantManager
+from acapy_agent.multitenant.cache import ProfileCache
+
+LOGGER = logging.getLogger(__name__)
+
+
+@dataclass
+class GroupCacheMetrics:
+    """Cache counters of a single group."""
+
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+
+
+class GroupAwareProfileCache(ProfileCache):
+    """Profile cache with per group pinning and weighted capacity shares."""
+
+    def __init__(
+        self,
+        capacity: int,
+        *,
+        pinned_groups: Iterable[str] = (),
+        group_weights: Optional[Dict[str, float]] = None,
+        default_weight: float = 1.0,
+    ):
+        """Initialize the cache.
+
+        Args:
+            capacity: number of profiles held open
+            pinned_groups: groups whose profiles are never evicted
+            group_weights: relative share of the capacity per group
+            default_weight: share of groups without a configured weight
+        """
+        super().__init__(capacity)
+        self.pinned_groups = set(pinned_groups)
+        self.group_weights = group_weights or {}
+        self.default_weight = default_weight
+        self.metrics: Dict[Optional[str], GroupCacheMetrics] = {}
+        self._groups: Dict[str, Optional[str]] = {}
+
+    def _metrics(self, group_id: Optional[str]) -> GroupCacheMetrics:
+        if group_id not in self.metrics:
+            self.metrics[group_id] = GroupCacheMetrics()
+        return self.metrics[group_id]
+
+    def _weight(self, group_id: Optional[str]) -> float:
+        return self.group_weights.get(group_id, self.default_weight) or 1e-9
+
+    def _select_victim(self) -> Optional[str]:
+        """Select the profile to evict next, or None if all profiles are pinned.
+
+        The victim is the least recently used profile of the group with the
+        highest usage of the cache relative to its weight.
+        """
+
+        sizes = Counter(self._groups.get(key) for key in self._cache)
+        candidates = [
+            group_id for group_id in sizes if group_id not in self.pinned_groups
+        ]
+        if not candidates:
+            return None
+
+        group_id = max(candidates, key=lambda group: sizes[group] / self._weight(group))
+        return next(key for key in self._cache if self._groups.get(key) == group_id)
+
+    def _cleanup(self):
+        """Prune the cache until its size matches the capacity."""
+
+        while len(self._cache) > self.capacity:
+            key = self._select_victim()
+            if key is None:
+                LOGGER.warning(
+                    "Profile cache holds %d pinned profiles, above its capacity of %d",
+                    len(self._cache),
+                    self.capacity,
+                )
+                return
+
+            del self._cache[key]
+            # Accounted again if the profile is still open and gets rescued
+            self._metrics(self._groups.pop(key, None)).evictions += 1
+            LOGGER.debug("Evicted profile with key %s", key)
+
+    def get(self, key: str) -> Optional[Profile]:
+        """Return a cached profile, counting it as a cache hit.
+
+        The multitenant manager looks profiles up with `get`, and opens and
+        `put`s them on a miss.
+        """
+
+        value = self.profiles.get(key)
+        if value and key not in self._groups:
+            # Evicted, but still open: the base class puts it back in the cache
+            self._groups[key] = value.settings.get("wallet.group_id")
+        group_id = self._groups.get(key)
+
+        value = super().get(key)
+        if value:
+            self._metrics(group_id).hits += 1
+        return value
+
+    def put(self, key: str, value: Profile) -> None:
+        """Add an opened profile to the cache, counting it as a cache miss."""
+
+        group_id = value.settings.get("wallet.group_id")
+        self._groups[key] = group_id
+        self._metrics(group_id).misses += 1
+        super().put(key, value)
+
+    def adopt(self, cache: ProfileCache):
+        """Take over the profiles held by another cache.
+
+        The profiles already have their finalizer registered, so they are
+        added without going through `put`.
+        """
+
+        for key, value in cache.profiles.items():
+            self._groups[key] = value.settings.get("wallet.group_id")
+            self.profiles[key] = value
+        for key, value in cache._cache.items():
+            self._cache[key] = value
+        self._cleanup()
+
+    def regroup(self, key: str, group_id: Optional[str]):
+        """Account a cached profile to the group its wallet moved to."""
+
+        if key in self._groups:
+            self._groups[key] = group_id
+
+    def remove(self, key: str):
+        """Remove a profile from the cache."""
+
+        super().remove(key)
+        self._groups.pop(key, None)
+
+    def stats(self) -> dict:
+        """Return the size and counters of the cache, per group."""
+
+        sizes = Counter(self._groups.get(key) for key in self._cache)
+        return {
+            "capacity": self.capacity,
+            "size": len(self._cache),
+            "groups": [
+                {
+                    "group_id": group_id,
+                    "size": sizes[group_id],
+                    "pinned": group_id in self.pinned_groups,
+                    "weight": self.group_weights.get(group_id, self.default_weight),
+                    "hits": metrics.hits,
+                    "misses": metrics.misses,
+                    "evictions": metrics.evictions,
+                }
+                for group_id, metrics in self.metrics.items()
+            ],
+        }
+
+
+class GroupProfileCacheInstaller:
+    """Replaces the profile cache of the multitenant manager once started."""
+
+    def __init__(
+        self,
+        *,
+        pinned_groups: Iterable[str] = (),
+        group_weights: Optional[Dict[str, float]] = None,
+        default_weight: float = 1.0,
+    ):
+        """Initialize the installer with the cache policy."""
+        self.pinned_groups = list(pinned_groups)
+        self.group_weights = group_weights or {}
+        self.default_weight = default_weight
+
+    async def on_startup(self, profile: Profile, event: Event):
+        """Event bus handler installing the group aware cache."""
+
+        multitenant_mgr = profile.inject_or(BaseMultitenantManager)
+        current = getattr(multitenant_mgr, "_profiles", None)
+        if not isinstance(current, ProfileCache):
+            LOGGER.warning("Group profile cache not installed: no profile cache found")
+            return
+
+        cache = GroupAwareProfileCache(
+            current.capacity,
+            pinned_groups=self.pinned_groups,
+            group_weights=self.group_weights,
+            default_weight=self.default_weight,
+        )
+        cache.adopt(current)
+
+        multitenant_mgr._profiles = cache
+        profile.context.injector.bind_instance(GroupAwareProfileCache, cache)
+        LOGGER.info("Installed group aware profile cache")
@@ -0,0 +1,170 @@
+"""In-memory change feed of wallet events, per wallet group.
+
+Every wallet event published by the plugin routes is appended to the feed of
+the wallet's group, with a sequence number that increases across all groups.
+Clients follow a group by passing the last sequence number they have seen.
+
+Sequence numbers are seeded from the clock when the feed is created, so a
+cursor from before an agent restart is always older than the new feed. Such
+cursors, and cursors older than the retained history of a group, are reported
+as truncated: the client missed events and should re-list the group.
+
+Only the most recently changed groups are kept. The history of a group pushed
+out by newer ones is dropped, and cursors older than its last event are then
+reported as truncated too.
+"""
+
+import asyncio
+import time
+from collections import OrderedDict, deque
+from dataclasses import asdict, dataclass
+from typing import Deque, Dict, List, Optional
+
+from acapy_agent.core.event_bus import Event
+from acapy_agent.core.profile import Profile
+
+from .events import WALLET_EVENT_TOPIC_PREFIX, WALLET_REMOVED
+
+
+@dataclass
+class GroupEvent:
+    """A change to a wallet within a group."""
+
+    sequence: int
+    state: str
+    wallet_id: str
+    group_id: str
+    timestamp: float
+    previous_group_id: Optional[str] = None
+
+    def serialize(self) -> dict:
+        """Return the event as a JSON serializable dict."""
+
+        return asdict(self)
+
+
+class GroupChangeFeed:
+    """Bounded, in-memory history of wallet events per group."""
+
+    def __init__(self, max_events_per_group: int = 1000, max_groups: int = 1000):
+        """Initialize the feed.
+
+        Args:
+            max_events_per_group: number of events retained for each group
+            max_groups: number of groups whose events are retained
+        """
+        self.start_sequence = time.time_ns() // 1000
+        self._sequence = self.start_sequence
+        self._max_events = max_events_per_group
+        self.max_groups = max_groups
+        self._events: "OrderedDict[str, Deque[GroupEvent]]" = OrderedDict()
+        # Highest sequence number dropped from the history of each group
+        self._dropped: Dict[str, int] = {}
+        # Sequence number of the latest event of any group pushed out of the
+        # feed, which is all that is known of the history of those groups
+        self._evicted_sequence = 0
+        self._condition = asyncio.Condition()
+
+    @property
+    def sequence(self) -> int:
+        """Sequence number of the latest event in the feed."""
+        return self._sequence
+
+    async def publish(
+        self,
+        group_id: str,
+        state: str,
+        wallet_id: str,
+        previous_group_id: Optional[str] = None,
+    ) -> GroupEvent:
+        """Append an event to the feed of a group and wake up waiting readers."""
+
+        self._sequence += 1
+        event = GroupEvent(
+            sequence=self._sequence,
+            state=state,
+            wallet_id=wallet_id,
+            group_id=group_id,
+            timestamp=time.time(),
+            previous_group_id=previous_group_id,
+        )
+
+        events = self._events.get(group_id)
+        if events is None:
+            events = self._events[group_id] = deque(maxlen=self._max_events)
+            # The group may have been pushed out of the feed before
+            self._dropped[group_id] = self._evicted_sequence
+        else:
+            self._events.move_to_end(group_id)
+        if len(events) == events.maxlen:
+            self._dropped[group_id] = events[0].sequence
+        events.append(event)
+
+        while len(self._events) > self.max_groups:
+            evicted_id, evicted = self._events.popitem(last=False)
+            del self._dropped[evicted_id]
+            self._evicted_sequence = evicted[-1].sequence
+
+        async with self._condition:
+            self._condition.notify_all()
+
+        return event
+
+    def events_after(self, group_id: str, after: int) -> List[GroupEvent]:
+        """Return the retained events of a group with a sequence above `after`."""
+
+        events = self._events.get(group_id)
+        if not events or events[-1].sequence <= after:
+            return []
+
+        return [event for event in events if event.sequence > after]
+
+    def is_truncated(self, group_id: str, after: int) -> bool:
+        """Check whether events after the cursor are no longer retained."""
+
+        if not after:
+            return False
+
+        return after < max(
+            self.start_sequence, self._dropped.get(group_id, self._evicted_sequence)
+        )
+
+    async def wait_for_events(
+        self, group_id: str, after: int, timeout: float
+    ) -> List[GroupEvent]:
+        """Return events after the cursor, waiting up to `timeout` seconds for one."""
+
+        events = self.events_after(group_id, after)
+        if events or timeout <= 0:
+            return events
+
+        async with self._condition:
+            try:
+                await asyncio.wait_for(
+                    self._condition.wait_for(
+                        lambda: bool(self.events_after(group_id, after))
+                    ),
+                    timeout,
+                )
+            except asyncio.TimeoutError:
+                pass
+
+        return self.events_after(group_id, after)
+
+    async def on_wallet_event(self, profile: Profile, event: Event):
+        """Event bus handler recording plugin wallet events in the feed."""
+
+        state = event.topic[len(WALLET_EVENT_TOPIC_PREFIX) :]
+        payload = event.payload
+        wallet_id = payload["wallet_id"]
+        group_id = payload.get("group_id")
+        previous_group_id = payload.get("previous_group_id")
+
+        if previous_group_id and previous_group_id != group_id:
+            # The wallet left its previous group
+            await self.publish(previous_group_id, WALLET_REMOVED, wallet_id)
+        else:
+            previous_group_id = None
+
+        if group_id:
+            await self.publish(group_id, state, wallet_id, previous_group_id)
@@ -0,0 +1,211 @@
+"""Content encoding of large responses, negotiated with `Accept-Encoding`.
+
+Wallet listings and group streams are mostly repeated JSON keys, so they
+compress well. gzip is always available; brotli and zstd are offered when the
+`brotli` or `zstandard` packages are installed. JSON responses are only
+compressed from a configured size, streamed responses always once
+negotiated, flushing after each write so every line or event can be decoded
+as soon as it arrives.
+
+brotli and zstd run at low levels, their defaults favour size over speed, and
+large bodies are compressed in an executor so that they don't block the event
+loop, as aiohttp does for its own compression.
+
+The optional packages are imported the first time an encoding is negotiated,
+so agents that never compress do not load them.
+"""
+
+import asyncio
+import functools
+import importlib
+import zlib
+from typing import Dict, Optional
+
+from aiohttp import web
+
+from .config import get_config
+
+GZIP = "gzip"
+BROTLI = "br"
+ZSTD = "zstd"
+
+# brotli quality and zstd level, low enough for responses compressed on demand
+BROTLI_QUALITY = 4
+ZSTD_LEVEL = 3
+# Size in bytes from which a body is compressed in an executor
+EXECUTOR_MIN_SIZE = 64 * 1024
+
+
+@functools.lru_cache(maxsize=None)
+def _codec(name: str):
+    """Return an optional codec module, None when it is not installed."""
+    try:
+        return importlib.import_module(name)
+    except ImportError:  # pragma: no cover - optional dependency
+        return None
+
+
+def available_encodings() -> list:
+    """Return the supported content codings, most preferred first."""
+
+    encodings = []
+    if _codec("zstandard"):
+        encodings.append(ZSTD)
+    if _codec("brotli"):
+        encodings.append(BROTLI)
+    encodings.append(GZIP)
+    return encodings
+
+
+def _parse_accept_encoding(header: str) -> Dict[str, float]:
+    """Return the quality value of each coding in an `Accept-Encoding` header."""
+
+    qualities = {}
+    for item in header.split(","):
+        coding, *params = item.strip().split(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        quality = 1.0
+        for param in params:
+            name, _, value = param.strip().partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[coding] = quality
+    return qualities
+
+
+def negotiate_encoding(request: web.BaseRequest) -> Optional[str]:
+    """Return the content coding to respond with, None for no compression."""
+
+    header = request.headers.get("Accept-Encoding")
+    if not header or not get_config(request["context"].profile).response_compression:
+        return None
+
+    qualities = _parse_accept_encoding(header)
+    wildcard = qualities.get("*", 0.0)
+    best, best_quality = None, 0.0
+    for encoding in available_encodings():
+        quality = qualities.get(encoding, wildcard)
+        # Ties go to the encoding listed first, which compresses best
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+class StreamCompressor:
+    """Incremental compressor for a single content coding."""
+
+    def __init__(self, encoding: str):
+        """Initialize the compressor for the given content coding."""
+        self.encoding = encoding
+        if encoding == ZSTD:
+            compressor = _codec("zstandard").ZstdCompressor(level=ZSTD_LEVEL)
+            self._compressor = compressor.compressobj()
+        elif encoding == BROTLI:
+            self._compressor = _codec("brotli").Compressor(quality=BROTLI_QUALITY)
+        else:
+            self._compressor = zlib.compressobj(wbits=16 + zlib.MAX_WBITS)
+
+    def compress(self, data: bytes) -> bytes:
+        """Compress data, flushed so that it can be decoded on arrival."""
+
+        if self.encoding == ZSTD:
+            return self._compressor.compress(data) + self._compressor.flush(
+                _codec("zstandard").COMPRESSOBJ_FLUSH_BLOCK
+            )
+        if self.encoding == BROTLI:
+            return self._compressor.process(data) + self._compressor.flush()
+        return self._compressor.compress(data) + self._compressor.flush(
+            zlib.Z_SYNC_FLUSH
+        )
+
+    def finish(self) -> bytes:
+        """Return the end of the compressed stream."""
+
+        if self.encoding == ZSTD:
+            return self._compressor.flush(_codec("zstandard").COMPRESSOBJ_FLUSH_FINISH)
+        if self.encoding == BROTLI:
+            return self._compressor.finish()
+        return self._compressor.flush()
+
+
+def compress(encoding: str, data: bytes) -> bytes:
+    """Compress a whole body with the given content coding."""
+
+    if encoding == ZSTD:
+        return _codec("zstandard").ZstdCompressor(level=ZSTD_LEVEL).compress(data)
+    if encoding == BROTLI:
+        return _codec("brotli").compress(data, quality=BROTLI_QUALITY)
+    return zlib.compress(data, wbits=16 + zlib.MAX_WBITS)
+
+
+async def compress_response(request: web.BaseRequest, response: web.Response):
+    """Compress the body of a response in place, if negotiated and large enough.
+
+    Bodies from `EXECUTOR_MIN_SIZE` bytes are compressed in the default
+    executor. A strong entity tag is made weak, as the encoded body differs
+    from the uncompressed one.
+    """
+
+    encoding = negotiate_encoding(request)
+    if not encoding:
+        return response
+
+    response.headers["Vary"] = "Accept-Encoding"
+    threshold = get_config(request["context"].profile).compression_min_size
+    if len(response.body) < threshold:
+        return response
+
+    if len(response.body) >= EXECUTOR_MIN_SIZE:
+        response.body = await asyncio.get_running_loop().run_in_executor(
+            None, compress, encoding, response.body
+        )
+    else:
+        response.body = compress(encoding, response.body)
+    response.headers["Content-Encoding"] = encoding
+    etag = response.headers.get("ETag")
+    if etag and not etag.startswith("W/"):
+        response.headers["ETag"] = f"W/{etag}"
+    return response
+
+
+class CompressedStreamResponse(web.StreamResponse):
+    """Streamed response compressing each write incrementally."""
+
+    def __init__(self, compressor: StreamCompressor, **kwargs):
+        """Initialize the response with the compressor of its content coding."""
+        super().__init__(**kwargs)
+        self.compressor = compressor
+        self.finished = False
+        self.headers["Content-Encoding"] = compressor.encoding
+        self.headers["Vary"] = "Accept-Encoding"
+
+    async def write(self, data: bytes):
+        """Compress and send data."""
+
+        chunk = self.compressor.compress(data)
+        if chunk:
+            await super().write(chunk)
+
+    async def write_eof(self, data: bytes = b""):
+        """Send the remaining data and end the compressed stream."""
+
+        # aiohttp ends the response again once the handler returned
+        if self.finished:
+            return await super().write_eof()
+        self.finished = True
+        data = self.compressor.compress(data) + self.compressor.finish()
+        await super().write_eof(data)
+
+
+def stream_response(request: web.BaseRequest, **kwargs) -> web.StreamResponse:
+    """Create a streamed response, compressed if negotiated with the client."""
+
+    encoding = negotiate_encoding(request)
+    if not encoding:
+        return web.StreamResponse(**kwargs)
+    return CompressedStreamResponse(StreamCompressor(encoding), **kwargs)
@@ -0,0 +1,50 @@
+"""Helpers for conditional GET requests using `ETag` and `If-None-Match`.
+
+Validators are derived from the record identifiers and `updated_at`
+timestamps only, so they can be checked before any record is formatted.
+"""
+
+import hashlib
+from typing import Iterable
+
+from acapy_agent.wallet.models.wallet_record import WalletRecord
+from aiohttp import web
+
+
+def wallet_record_etag(wallet_record: WalletRecord) -> str:
+    """Return the entity tag of a single wallet record."""
+
+    return wallet_records_etag([wallet_record])
+
+
+def wallet_records_etag(wallet_records: Iterable[WalletRecord]) -> str:
+    """Return the entity tag of a page of wallet records."""
+
+    digest = hashlib.blake2b(digest_size=16)
+    for wallet_record in wallet_records:
+        digest.update(f"{wallet_record.wallet_id}\0{wallet_record.updated_at}\0".encode())
+
+    return f'"{digest.hexdigest()}"'
+
+
+def etag_matches(request: web.BaseRequest, etag: str) -> bool:
+    """Check whether the request's `If-None-Match` header matches the entity tag.
+
+    Weak comparison is used, as is required for `If-None-Match`.
+    """
+
+    header = request.headers.get("If-None-Match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+
+    return any(
+        candidate.strip().removeprefix("W/") == etag for candidate in header.split(",")
+    )
+
+
+def not_modified(etag: str) -> web.HTTPNotModified:
+    """Build the `304 Not Modified` response for the entity tag."""
+
+    return web.HTTPNotModified(headers={"ETag": etag})
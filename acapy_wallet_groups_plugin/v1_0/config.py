@@ -0,0 +1,160 @@
+"""Configuration for the wallet groups plugin.
+
+Options are read from the `wallet_groups` section of the ACA-Py plugin config
+(`--plugin-config`), for example:
+
+    wallet_groups:
+      token_batch_concurrency: 20
+"""
+
+from dataclasses import dataclass, field, fields
+from typing import Any, Dict, List, get_origin
+
+from acapy_agent.config.base import BaseSettings
+from acapy_agent.core.profile import Profile
+
+PLUGIN_CONFIG_KEY = "wallet_groups"
+
+
+@dataclass
+class WalletGroupsConfig:
+    """Settings for the wallet groups plugin."""
+
+    # Number of `create_auth_token` calls running at once for batch issuance
+    token_batch_concurrency: int = 10
+    # Number of wallet records read from storage per page when streaming a group
+    group_page_size: int = 100
+    # Number of wallets moved per transaction by the group move endpoint
+    group_move_chunk_size: int = 100
+    # Seconds allowed for each storage query of the wallet list, wallet get and
+    # group bulk endpoints, 0 for no deadline
+    query_timeout: float = 0.0
+    # Number of groups whose wallet search index is kept in memory
+    search_max_groups: int = 100
+    # Number of wallet events retained in the change feed of each group
+    change_feed_max_events: int = 1000
+    # Number of most recently changed groups kept in the change feed
+    change_feed_max_groups: int = 1000
+    # Seconds between keep-alive comments on a Server-Sent Events stream
+    change_feed_heartbeat: float = 15.0
+    # Groups whose wallet profiles are opened in the background after start up
+    warmup_groups: List[str] = field(default_factory=list)
+    # Number of wallet profiles opened at once while warming up
+    warmup_concurrency: int = 5
+    # Maximum number of profiles to warm up, 0 for the profile cache size
+    warmup_limit: int = 0
+    # Replace the multitenant profile cache with the group aware cache
+    group_profile_cache: bool = False
+    # Groups whose wallet profiles are never evicted from the profile cache
+    cache_pinned_groups: List[str] = field(default_factory=list)
+    # Relative share of the profile cache capacity per group
+    cache_group_weights: Dict[str, float] = field(default_factory=dict)
+    # Share of the profile cache for groups without a configured weight
+    cache_default_weight: float = 1.0
+    # Report wallet counts per group on the metrics endpoint
+    metrics_group_counts: bool = False
+    # Seconds the wallet counts per group are reused before counting again
+    metrics_group_counts_ttl: float = 60.0
+    # Span exporter for tracing: "logging", "memory" or "module:Class", empty to
+    # disable tracing
+    tracing_exporter: str = ""
+    # Allow profiling single requests sent with the `X-Profile: 1` header
+    request_profiling: bool = False
+    # Directory profiles are written to, instead of returning them as attachment
+    request_profiling_dir: str = ""
+    # Run the endorser setup of new wallets in the background, after responding
+    endorser_setup_deferred: bool = False
+    # Number of deferred endorser setups running at once
+    endorser_setup_concurrency: int = 5
+    # Seconds `wallet_create` responses are replayed for their idempotency key,
+    # 0 to ignore the `Idempotency-Key` header
+    idempotency_ttl: float = 86400.0
+    # Seconds an unfinished request blocks its idempotency key on other agents
+    idempotency_lock_timeout: float = 300.0
+    # Seconds a snapshot of a group can be listed from, 0 to disable snapshots
+    snapshot_ttl: float = 3600.0
+    # Maximum number of wallets per group
+    group_quotas: Dict[str, int] = field(default_factory=dict)
+    # Maximum number of wallets of groups without a quota, 0 for unlimited
+    default_group_quota: int = 0
+    # Record the last activity of tenant wallets, to find idle wallets per group
+    activity_tracking: bool = False
+    # Seconds between batched writes of the recorded wallet activity
+    activity_flush_interval: float = 60.0
+    # Seconds between passes of the group reconciler over all wallets, 0 to
+    # disable the reconciler
+    reconcile_interval: float = 0.0
+    # Wallet records checked, and repaired, per reconciler transaction
+    reconcile_batch_size: int = 100
+    # Wallet records the reconciler reads per second at most
+    reconcile_records_per_second: float = 100.0
+    # Check create and update bodies with checks compiled from their schemas,
+    # decoding each body once; bodies failing the checks are loaded as before
+    fast_body_validation: bool = False
+    # Compress listings and group streams when the client accepts an encoding
+    response_compression: bool = False
+    # Size in bytes from which JSON responses are compressed
+    compression_min_size: int = 1024
+    # Backend relaying wallet events between agent instances: "memory",
+    # "storage", "postgres" or "module:Class", empty to disable
+    invalidation_backend: str = ""
+    # Seconds between polls of the storage invalidation backend
+    invalidation_poll_interval: float = 1.0
+    # Connection string of the postgres invalidation backend
+    invalidation_postgres_dsn: str = ""
+    # Wallet config of each shard store serving group listings, by shard name
+    shards: Dict[str, dict] = field(default_factory=dict)
+    # Shard of each group, other groups are assigned by a hash of their id
+    shard_groups: Dict[str, str] = field(default_factory=dict)
+    # Whether all agent instances use the same shard stores, rather than
+    # stores of their own, e.g. local sqlite files
+    shards_shared: bool = False
+
+    @property
+    def group_profile_cache_enabled(self) -> bool:
+        """Whether the group aware profile cache should be installed."""
+        return bool(
+            self.group_profile_cache
+            or self.cache_pinned_groups
+            or self.cache_group_weights
+        )
+
+    @property
+    def group_quotas_enabled(self) -> bool:
+        """Whether wallet counters per group should be maintained and enforced."""
+        return bool(self.group_quotas or self.default_group_quota)
+
+    @classmethod
+    def from_settings(cls, settings: BaseSettings) -> "WalletGroupsConfig":
+        """Build the plugin config from the ACA-Py settings."""
+
+        plugin_config = settings.get("plugin_config") or {}
+        config = plugin_config.get(PLUGIN_CONFIG_KEY) or {}
+
+        return cls(
+            **{
+                config_field.name: _coerce(config_field.type, config[config_field.name])
+                for config_field in fields(cls)
+                if config.get(config_field.name) is not None
+            }
+        )
+
+
+def _coerce(field_type: Any, value: Any) -> Any:
+    """Coerce a scalar config value, which may come from YAML or env, to its type."""
+
+    if get_origin(field_type) is list and isinstance(value, str):
+        return [item.strip() for item in value.split(",") if item.strip()]
+    if field_type is bool and isinstance(value, str):
+        return value.strip().lower() in ("1", "true", "yes", "on")
+    if field_type in (bool, int, float, str):
+        return field_type(value)
+    return value
+
+
+def get_config(profile: Profile) -> WalletGroupsConfig:
+    """Return the plugin config bound at setup, or build it from settings."""
+
+    return profile.inject_or(WalletGroupsConfig) or WalletGroupsConfig.from_settings(
+        profile.settings
+    )
@@ -0,0 +1,138 @@
+"""Run the endorser auto-author setup of new wallets in the background.
+
+`attempt_auto_author_with_endorser_setup` may set up a connection with the
+endorser, which holds up `wallet_create` although the wallet and its token
+are usable before it completes. In deferred mode, the setup is submitted to
+this queue instead, which runs it with bounded concurrency and keeps the
+outcome per wallet, to be queried through the admin API.
+
+Statuses are kept in memory, per agent instance, and lost on restart.
+"""
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from typing import Awaitable, Callable, Optional, Set
+
+from acapy_agent.core.event_bus import Event
+from acapy_agent.core.profile import Profile
+
+from .events import WALLET_EVENT_TOPIC_PREFIX, WALLET_REMOVED
+
+LOGGER = logging.getLogger(__name__)
+
+SETUP_PENDING = "pending"
+SETUP_RUNNING = "running"
+SETUP_COMPLETED = "completed"
+SETUP_FAILED = "failed"
+
+
+@dataclass
+class EndorserSetupStatus:
+    """Outcome of the endorser setup of a wallet."""
+
+    wallet_id: str
+    state: str = SETUP_PENDING
+    submitted_at: float = 0.0
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    error: Optional[str] = None
+
+    def serialize(self) -> dict:
+        """Serialize the status."""
+        return {key: value for key, value in asdict(self).items() if value is not None}
+
+
+class EndorserSetupQueue:
+    """Supervised background runner of wallet endorser setups."""
+
+    def __init__(self, concurrency: int = 5, max_statuses: int = 10000):
+        """Initialize the queue.
+
+        Args:
+            concurrency: number of setups running at once
+            max_statuses: number of finished setup statuses retained
+        """
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.max_statuses = max_statuses
+        self.statuses: "OrderedDict[str, EndorserSetupStatus]" = OrderedDict()
+        self.tasks: Set[asyncio.Task] = set()
+
+    def submit(
+        self, wallet_id: str, setup: Callable[[], Awaitable[None]]
+    ) -> EndorserSetupStatus:
+        """Schedule the endorser setup of a wallet.
+
+        Args:
+            wallet_id: the wallet being set up
+            setup: coroutine function running the setup
+        """
+
+        status = EndorserSetupStatus(wallet_id, submitted_at=time.time())
+        self.statuses[wallet_id] = status
+        self.statuses.move_to_end(wallet_id)
+        self._trim()
+
+        task = asyncio.create_task(self._run(status, setup))
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+        return status
+
+    def status(self, wallet_id: str) -> Optional[EndorserSetupStatus]:
+        """Return the endorser setup status of a wallet, if known."""
+        return self.statuses.get(wallet_id)
+
+    async def _run(
+        self, status: EndorserSetupStatus, setup: Callable[[], Awaitable[None]]
+    ):
+        async with self.semaphore:
+            status.state = SETUP_RUNNING
+            status.started_at = time.time()
+            try:
+                await setup()
+            except asyncio.CancelledError:
+                status.state = SETUP_FAILED
+                status.error = "Cancelled on shutdown"
+                raise
+            except Exception as err:
+                LOGGER.exception("Endorser setup of wallet %s failed", status.wallet_id)
+                status.state = SETUP_FAILED
+                status.error = str(err) or type(err).__name__
+            else:
+                status.state = SETUP_COMPLETED
+            finally:
+                status.finished_at = time.time()
+
+    def _trim(self):
+        """Drop the oldest finished statuses beyond the retention limit."""
+
+        excess = len(self.statuses) - self.max_statuses
+        if excess <= 0:
+            return
+        for wallet_id in [
+            wallet_id
+            for wallet_id, status in self.statuses.items()
+            if status.finished_at is not None
+        ][:excess]:
+            del self.statuses[wallet_id]
+
+    async def join(self):
+        """Wait for all submitted setups to finish."""
+
+        while self.tasks:
+            await asyncio.gather(*self.tasks, return_exceptions=True)
+
+    async def on_wallet_event(self, profile: Profile, event: Event):
+        """Event bus handler forgetting the status of removed wallets."""
+
+        if event.topic == f"{WALLET_EVENT_TOPIC_PREFIX}{WALLET_REMOVED}":
+            self.statuses.pop(event.payload["wallet_id"], None)
+
+    async def on_shutdown(self, profile: Profile, event: Event):
+        """Event bus handler cancelling unfinished setups."""
+
+        for task in list(self.tasks):
+            task.cancel()
+        await self.join()
@@ -0,0 +1,42 @@
+"""Wallet events published by the plugin routes on the ACA-Py event bus."""
+
+import re
+from typing import Optional
+
+from acapy_agent.core.profile import Profile
+
+WALLET_EVENT_TOPIC_PREFIX = "acapy::wallet_groups::wallet::"
+WALLET_EVENT_PATTERN = re.compile(
+    f"^{WALLET_EVENT_TOPIC_PREFIX}(?P<state>created|updated|removed)$"
+)
+
+WALLET_CREATED = "created"
+WALLET_UPDATED = "updated"
+WALLET_REMOVED = "removed"
+
+
+async def notify_wallet_event(
+    profile: Profile,
+    state: str,
+    wallet_id: str,
+    group_id: Optional[str],
+    previous_group_id: Optional[str] = None,
+):
+    """Publish a wallet event.
+
+    Args:
+        profile: the profile to notify on, normally the base profile
+        state: one of `created`, `updated` or `removed`
+        wallet_id: identifier of the affected wallet
+        group_id: group of the wallet after the change
+        previous_group_id: group of the wallet before the change, if it moved
+    """
+
+    await profile.notify(
+        f"{WALLET_EVENT_TOPIC_PREFIX}{state}",
+        {
+            "wallet_id": wallet_id,
+            "group_id": group_id,
+            "previous_group_id": previous_group_id,
+        },
+    )
@@ -0,0 +1,260 @@
+"""Idempotency keys for admin requests that provision wallets.
+
+A client retrying a timed out `wallet_create` with the same `Idempotency-Key`
+header gets the original response back instead of provisioning another
+wallet. Responses are stored per key, with a TTL, in a storage record of the
+base wallet, next to a hash of the request body so that a key reused for a
+different request is rejected.
+
+While the first request with a key is in flight, duplicates on the same
+agent instance wait for its outcome. A duplicate reaching another instance
+finds the in progress record and is told to retry later.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+from acapy_agent.core.error import BaseError
+from acapy_agent.core.profile import Profile
+from acapy_agent.storage.base import BaseStorage
+from acapy_agent.storage.error import (
+    StorageDuplicateError,
+    StorageError,
+    StorageNotFoundError,
+)
+from acapy_agent.storage.record import StorageRecord
+
+LOGGER = logging.getLogger(__name__)
+
+IDEMPOTENCY_KEY_HEADER = "Idempotency-Key"
+IDEMPOTENT_REPLAYED_HEADER = "Idempotent-Replayed"
+RECORD_TYPE = "wallet_groups_idempotency"
+
+STATE_IN_PROGRESS = "in_progress"
+STATE_COMPLETED = "completed"
+
+# Attempts at storing the response of a request that succeeded
+STORE_ATTEMPTS = 2
+
+
+class IdempotencyKeyMismatchError(BaseError):
+    """The idempotency key was used before for a different request."""
+
+
+class IdempotencyKeyInProgressError(BaseError):
+    """A request with the idempotency key is still being processed."""
+
+
+def _record_id(scope: str, key: str) -> str:
+    return hashlib.sha256(f"{scope}:{key}".encode()).hexdigest()
+
+
+def _request_hash(body: dict) -> str:
+    return hashlib.sha256(json.dumps(body, sort_keys=True).encode()).hexdigest()
+
+
+def _expiry_tag(expires_at: float) -> str:
+    # Zero padded, so that the plaintext tag orders like the number
+    return f"{int(expires_at):012d}"
+
+
+class IdempotencyStore:
+    """Stores responses by idempotency key and deduplicates in flight requests."""
+
+    def __init__(self, ttl: float, lock_timeout: float = 300.0):
+        """Initialize the store.
+
+        Args:
+            ttl: seconds a response is replayed for
+            lock_timeout: seconds after which an in progress request, e.g. of
+                an agent that stopped, no longer blocks its key
+        """
+        self.ttl = ttl
+        self.lock_timeout = lock_timeout
+        self.in_flight: Dict[str, Tuple[str, asyncio.Future]] = {}
+        self._purged_at = 0.0
+
+    async def run(
+        self,
+        profile: Profile,
+        scope: str,
+        key: str,
+        body: dict,
+        operation: Callable[[], Awaitable[dict]],
+    ) -> Tuple[dict, bool]:
+        """Run the operation once per idempotency key.
+
+        Args:
+            profile: the base profile, holding the stored responses
+            scope: name of the operation, keys are unique per scope
+            key: the client provided idempotency key
+            body: the request body, which must match for a key to be replayed
+            operation: coroutine function performing the request
+
+        Returns:
+            The response and whether it was replayed
+
+        Raises:
+            IdempotencyKeyMismatchError: if the key was used for another body
+            IdempotencyKeyInProgressError: if a request with the key is being
+                processed by another agent instance
+        """
+
+        record_id = _record_id(scope, key)
+        request_hash = _request_hash(body)
+
+        in_flight = self.in_flight.get(record_id)
+        if in_flight:
+            in_flight_hash, future = in_flight
+            if in_flight_hash != request_hash:
+                raise IdempotencyKeyMismatchError(
+                    "Idempotency key was used for a different request"
+                )
+            return await asyncio.shield(future), True
+
+        # Registered before touching storage, so that duplicates arriving
+        # meanwhile wait for this attempt
+        future = asyncio.get_running_loop().create_future()
+        # Nobody may be waiting for the outcome
+        future.add_done_callback(lambda done: done.cancelled() or done.exception())
+        self.in_flight[record_id] = (request_hash, future)
+        try:
+            response = await self._claim(profile, record_id, request_hash)
+            replayed = response is not None
+            if not replayed:
+                try:
+                    response = await operation()
+                except BaseException:
+                    await self._release(profile, record_id)
+                    raise
+                await self._store(profile, record_id, request_hash, response)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as err:
+            future.set_exception(err)
+            raise
+        else:
+            future.set_result(response)
+        finally:
+            self.in_flight.pop(record_id, None)
+
+        return response, replayed
+
+    async def _claim(
+        self, profile: Profile, record_id: str, request_hash: str
+    ) -> Optional[dict]:
+        """Return the stored response, or mark the key as in progress."""
+
+        now = time.time()
+        async with profile.session() as session:
+            storage = session.inject(BaseStorage)
+            await self._purge_expired(storage, now)
+
+            try:
+                record = await storage.get_record(RECORD_TYPE, record_id)
+            except StorageNotFoundError:
+                record = None
+
+            if record:
+                value = json.loads(record.value)
+                if value["expires_at"] > now:
+                    if value["request_hash"] != request_hash:
+                        raise IdempotencyKeyMismatchError(
+                            "Idempotency key was used for a different request"
+                        )
+                    if value["state"] == STATE_COMPLETED:
+                        return value["response"]
+                    raise IdempotencyKeyInProgressError(
+                        "A request with this idempotency key is in progress"
+                    )
+                await storage.delete_record(record)
+
+            expires_at = now + self.lock_timeout
+            try:
+                await storage.add_record(
+                    StorageRecord(
+                        RECORD_TYPE,
+                        json.dumps(
+                            {
+                                "state": STATE_IN_PROGRESS,
+                                "request_hash": request_hash,
+                                "expires_at": expires_at,
+                            }
+                        ),
+                        {"~expires_at": _expiry_tag(expires_at)},
+                        record_id,
+                    )
+                )
+            except StorageDuplicateError as err:
+                raise IdempotencyKeyInProgressError(
+                    "A request with this idempotency key is in progress"
+                ) from err
+
+        return None
+
+    async def _store(
+        self, profile: Profile, record_id: str, request_hash: str, response: dict
+    ):
+        """Keep the response for replay until the TTL expires.
+
+        The request already succeeded, so the key is never released here: if
+        the response can't be stored, retries get a conflict until the lock
+        times out rather than provision the wallet again.
+        """
+
+        for attempt in range(STORE_ATTEMPTS):
+            expires_at = time.time() + self.ttl
+            try:
+                async with profile.session() as session:
+                    storage = session.inject(BaseStorage)
+                    record = await storage.get_record(RECORD_TYPE, record_id)
+                    await storage.update_record(
+                        record,
+                        json.dumps(
+                            {
+                                "state": STATE_COMPLETED,
+                                "request_hash": request_hash,
+                                "expires_at": expires_at,
+                                "response": response,
+                            }
+                        ),
+                        {"~expires_at": _expiry_tag(expires_at)},
+                    )
+                return
+            except StorageError as err:
+                LOGGER.warning(
+                    "Could not store idempotent response (attempt %d of %d): %s",
+                    attempt + 1,
+                    STORE_ATTEMPTS,
+                    err.roll_up,
+                )
+
+    async def _release(self, profile: Profile, record_id: str):
+        """Free the key of a failed request, so that it can be retried."""
+
+        try:
+            async with profile.session() as session:
+                storage = session.inject(BaseStorage)
+                record = await storage.get_record(RECORD_TYPE, record_id)
+                await storage.delete_record(record)
+        except StorageError as err:
+            LOGGER.warning("Could not release idempotency key: %s", err.roll_up)
+
+    async def _purge_expired(self, storage: BaseStorage, now: float):
+        """Delete expired records, at most once per TTL or lock timeout."""
+
+        if now - self._purged_at < min(self.ttl, self.lock_timeout):
+            return
+        self._purged_at = now
+
+        try:
+            await storage.delete_all_records(
+                RECORD_TYPE, {"~expires_at": {"$lt": _expiry_tag(now)}}
+            )
+        except StorageError as err:
+            LOGGER.warning("Could not purge idempotency records: %s", err.roll_up)
@@ -0,0 +1,361 @@
+"""Relay wallet events between agent instances sharing a database.
+
+The plugin keeps state per agent instance: open wallet profiles and their
+settings, the group change feed, recorded activity and endorser setup
+statuses. When another instance updates or removes a wallet, that state goes
+stale. The invalidation bus publishes the wallet events of the plugin routes
+to the other instances, which refresh or evict the wallet's open profile and
+replay the event on their own event bus, marked with the origin instance.
+
+Backends:
+    memory: instances in the same process, for tests
+    storage: messages written to the base wallet and polled
+    postgres: Postgres `LISTEN`/`NOTIFY`, requires `asyncpg`
+"""
+
+import asyncio
+import importlib
+import json
+import logging
+import time
+from abc import ABC, abstractmethod
+from typing import Awaitable, Callable, Dict, List, Optional, Set
+from uuid import uuid4
+
+from acapy_agent.core.event_bus import Event
+from acapy_agent.core.profile import Profile
+from acapy_agent.multitenant.base import BaseMultitenantManager
+from acapy_agent.multitenant.cache import ProfileCache
+from acapy_agent.storage.base import BaseStorage
+from acapy_agent.storage.error import StorageError, StorageNotFoundError
+from acapy_agent.storage.record import StorageRecord
+from acapy_agent.wallet.models.wallet_record import WalletRecord
+
+from .cache import GroupAwareProfileCache
+from .config import WalletGroupsConfig
+from .events import WALLET_EVENT_PATTERN, WALLET_EVENT_TOPIC_PREFIX, WALLET_REMOVED
+
+LOGGER = logging.getLogger(__name__)
+
+MESSAGE_RECORD_TYPE = "wallet_groups_invalidation"
+POSTGRES_CHANNEL = "wallet_groups_invalidation"
+
+MessageHandler = Callable[[dict], Awaitable[None]]
+
+
+def _time_tag(timestamp: float) -> str:
+    # Zero padded milliseconds, so that the plaintext tag orders like the number
+    return f"{int(timestamp * 1000):015d}"
+
+
+class InvalidationBackend(ABC):
+    """Carries invalidation messages between agent instances."""
+
+    async def start(self, profile: Profile, handler: MessageHandler):
+        """Start delivering messages of other instances to the handler."""
+
+    @abstractmethod
+    async def publish(self, message: dict):
+        """Send a message to the other instances."""
+
+    async def stop(self):
+        """Stop delivering messages."""
+
+
+class InMemoryInvalidationBackend(InvalidationBackend):
+    """Delivers messages to the backends of the same hub, for tests."""
+
+    HUB: List["InMemoryInvalidationBackend"] = []
+
+    def __init__(self, hub: Optional[list] = None):
+        """Initialize the backend, joining the process wide hub by default."""
+        self.hub = self.HUB if hub is None else hub
+        self.handler: Optional[MessageHandler] = None
+
+    async def start(self, profile: Profile, handler: MessageHandler):
+        """Join the hub."""
+        self.handler = handler
+        self.hub.append(self)
+
+    async def publish(self, message: dict):
+        """Deliver the message to the other backends of the hub."""
+        for backend in list(self.hub):
+            if backend is not self:
+                await backend.handler(message)
+
+    async def stop(self):
+        """Leave the hub."""
+        if self in self.hub:
+            self.hub.remove(self)
+
+
+class StorageInvalidationBackend(InvalidationBackend):
+    """Writes messages to the base wallet, where other instances poll them.
+
+    Messages are found by the time they were published, with an overlap to
+    allow for clock skew and late commits, and kept for `retention` seconds.
+    """
+
+    def __init__(
+        self,
+        poll_interval: float = 1.0,
+        retention: float = 300.0,
+        overlap: float = 5.0,
+    ):
+        """Initialize the backend.
+
+        Args:
+            poll_interval: seconds between polls for new messages
+            retention: seconds messages are kept in storage
+            overlap: seconds before the last poll searched again
+        """
+        self.poll_interval = poll_interval
+        self.retention = retention
+        self.overlap = overlap
+        self.profile: Optional[Profile] = None
+        self.handler: Optional[MessageHandler] = None
+        self.task: Optional[asyncio.Task] = None
+        self.cursor = 0.0
+        # Messages found within the overlap, by publication time
+        self.seen: Dict[str, float] = {}
+        self._purged_at = 0.0
+
+    async def start(self, profile: Profile, handler: MessageHandler):
+        """Start polling for messages published from now on."""
+
+        self.profile = profile
+        self.handler = handler
+        self.cursor = time.time()
+        if not self.task:
+            self.task = asyncio.create_task(self._run())
+
+    async def publish(self, message: dict):
+        """Write the message to storage."""
+
+        now = time.time()
+        async with self.profile.session() as session:
+            await session.inject(BaseStorage).add_record(
+                StorageRecord(
+                    MESSAGE_RECORD_TYPE,
+                    json.dumps({**message, "published_at": now}),
+                    {"~published_at": _time_tag(now)},
+                    uuid4().hex,
+                )
+            )
+
+    async def poll(self) -> int:
+        """Deliver the messages published since the last poll.
+
+        Returns:
+            The number of messages delivered
+        """
+
+        since = self.cursor - self.overlap
+        async with self.profile.session() as session:
+            storage = session.inject(BaseStorage)
+            records = await storage.find_all_records(
+                MESSAGE_RECORD_TYPE, {"~published_at": {"$gte": _time_tag(since)}}
+            )
+            await self._purge_expired(storage)
+
+        delivered = 0
+        for record in sorted(records, key=lambda record: record.tags["~published_at"]):
+            if record.id in self.seen:
+                continue
+            message = json.loads(record.value)
+            self.seen[record.id] = message["published_at"]
+            self.cursor = max(self.cursor, message["published_at"])
+            await self.handler(message)
+            delivered += 1
+
+        self.seen = {
+            record_id: published_at
+            for record_id, published_at in self.seen.items()
+            if published_at >= self.cursor - self.overlap
+        }
+        return delivered
+
+    async def _purge_expired(self, storage: BaseStorage):
+        """Delete expired messages, at most once per retention period."""
+
+        now = time.time()
+        if now - self._purged_at < self.retention:
+            return
+        self._purged_at = now
+        await storage.delete_all_records(
+            MESSAGE_RECORD_TYPE,
+            {"~published_at": {"$lt": _time_tag(now - self.retention)}},
+        )
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            try:
+                await self.poll()
+            except StorageError:
+                LOGGER.exception("Failed to poll invalidation messages")
+
+    async def stop(self):
+        """Stop polling."""
+
+        if self.task:
+            self.task.cancel()
+            self.task = None
+
+
+class PostgresInvalidationBackend(InvalidationBackend):
+    """Sends messages with Postgres `NOTIFY`, received with `LISTEN`."""
+
+    def __init__(self, dsn: str, channel: str = POSTGRES_CHANNEL):
+        """Initialize the backend.
+
+        Args:
+            dsn: connection string of the Postgres server
+            channel: notification channel shared by the agent instances
+        """
+        self.dsn = dsn
+        self.channel = channel
+        self.connection = None
+        self.handler: Optional[MessageHandler] = None
+        self.tasks: Set[asyncio.Task] = set()
+        self._lock = asyncio.Lock()
+
+    async def start(self, profile: Profile, handler: MessageHandler):
+        """Connect and listen on the channel."""
+
+        import asyncpg
+
+        self.handler = handler
+        self.connection = await asyncpg.connect(self.dsn)
+        await self.connection.add_listener(self.channel, self._on_notification)
+
+    def _on_notification(self, connection, pid: int, channel: str, payload: str):
+        task = asyncio.create_task(self.handler(json.loads(payload)))
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+
+    async def publish(self, message: dict):
+        """Notify the channel."""
+
+        # A connection runs one query at a time
+        async with self._lock:
+            await self.connection.execute(
+                "SELECT pg_notify($1, $2)", self.channel, json.dumps(message)
+            )
+
+    async def stop(self):
+        """Stop listening and disconnect."""
+
+        if self.connection:
+            await self.connection.close()
+            self.connection = None
+
+
+def load_backend(config: WalletGroupsConfig) -> InvalidationBackend:
+    """Create the configured backend, by name or given as `module:Class`."""
+
+    name = config.invalidation_backend
+    if name == "memory":
+        return InMemoryInvalidationBackend()
+    if name == "storage":
+        return StorageInvalidationBackend(config.invalidation_poll_interval)
+    if name == "postgres":
+        if not config.invalidation_postgres_dsn:
+            raise ValueError("invalidation_postgres_dsn is required for postgres")
+        return PostgresInvalidationBackend(config.invalidation_postgres_dsn)
+
+    module_name, _, class_name = name.partition(":")
+    if not class_name:
+        raise ValueError(f"Unknown invalidation backend: {name}")
+    return getattr(importlib.import_module(module_name), class_name)()
+
+
+class InvalidationBus:
+    """Publishes local wallet events and applies those of other instances."""
+
+    def __init__(self, backend: InvalidationBackend, node_id: Optional[str] = None):
+        """Initialize the bus.
+
+        Args:
+            backend: carrier of the messages between instances
+            node_id: identifier of this agent instance, random by default
+        """
+        self.backend = backend
+        self.node_id = node_id or uuid4().hex
+        self.profile: Optional[Profile] = None
+
+    async def on_startup(self, profile: Profile, event: Event):
+        """Event bus handler starting to receive messages."""
+
+        self.profile = profile
+        await self.backend.start(profile, self.receive)
+
+    async def on_shutdown(self, profile: Profile, event: Event):
+        """Event bus handler stopping the backend."""
+
+        await self.backend.stop()
+
+    async def on_wallet_event(self, profile: Profile, event: Event):
+        """Event bus handler publishing the wallet events of this instance."""
+
+        if event.payload.get("origin"):
+            return
+
+        try:
+            await self.backend.publish(
+                {"origin": self.node_id, "topic": event.topic, "payload": event.payload}
+            )
+        except Exception:
+            # The change is made, only other instances stay stale
+            LOGGER.exception("Failed to publish wallet event %s", event.topic)
+
+    async def receive(self, message: dict):
+        """Apply a wallet event of another instance."""
+
+        origin = message.get("origin")
+        topic = message.get("topic", "")
+        if origin == self.node_id or not WALLET_EVENT_PATTERN.match(topic):
+            return
+
+        payload = message["payload"]
+        try:
+            await self._refresh_profile(
+                payload["wallet_id"],
+                topic == f"{WALLET_EVENT_TOPIC_PREFIX}{WALLET_REMOVED}",
+            )
+        except StorageError:
+            LOGGER.exception("Failed to refresh profile of %s", payload["wallet_id"])
+
+        await self.profile.notify(topic, {**payload, "origin": origin})
+
+    async def _refresh_profile(self, wallet_id: str, removed: bool):
+        """Bring the open profile of a wallet in line with its record."""
+
+        multitenant_mgr = self.profile.inject_or(BaseMultitenantManager)
+        cache = getattr(multitenant_mgr, "_profiles", None)
+        if not isinstance(cache, ProfileCache):
+            return
+        wallet_profile = cache.profiles.get(wallet_id)
+        if not wallet_profile:
+            return
+
+        if not removed:
+            try:
+                async with self.profile.session() as session:
+                    wallet_record = await WalletRecord.retrieve_by_id(
+                        session, wallet_id
+                    )
+            except StorageNotFoundError:
+                removed = True
+
+        if removed:
+            try:
+                cache.remove(wallet_id)
+            except KeyError:
+                # Already evicted, only held open by its users
+                pass
+            return
+
+        wallet_profile.settings.update(wallet_record.settings)
+        if isinstance(cache, GroupAwareProfileCache):
+            cache.regroup(wallet_id, wallet_record.group_id)
@@ -0,0 +1,339 @@
+"""Prometheus metrics for the plugin routes.
+
+A small, dependency free registry rendering the Prometheus text format. The
+hot path only does a `perf_counter()` call and a few dict lookups per
+observation, so instrumentation stays negligible next to storage access.
+"""
+
+import functools
+import time
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import (
+    Awaitable,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+)
+
+from acapy_agent.core.profile import Profile
+from acapy_agent.storage.base import BaseStorage
+from acapy_agent.wallet.models.wallet_record import WalletRecord
+from aiohttp import web
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1,
+    2.5,
+    5,
+    10,
+)
+SIZE_BUCKETS = (0, 1, 10, 50, 100, 500, 1000, 5000, 10000)
+
+Labels = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Labels, **extra: str) -> str:
+    pairs = [*zip(names, values), *extra.items()]
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric(ABC):
+    """Base class of a labelled metric."""
+
+    type_name = "untyped"
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = ()):
+        """Initialize the metric."""
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+
+    @abstractmethod
+    def samples(self) -> Iterator[str]:
+        """Yield the sample lines of the metric."""
+
+    def render(self) -> List[str]:
+        """Return the metric in Prometheus text format."""
+        return [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.type_name}",
+            *self.samples(),
+        ]
+
+
+class Counter(Metric):
+    """Monotonically increasing counter, named with its `_total` suffix.
+
+    HELP, TYPE and sample lines share the name, as the text format 0.0.4
+    expects.
+    """
+
+    type_name = "counter"
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = ()):
+        """Initialize the counter."""
+        super().__init__(name, documentation, label_names)
+        self.values: Dict[Labels, float] = {}
+
+    def inc(self, *labels: str, amount: float = 1):
+        """Increment the counter of the label values."""
+        self.values[labels] = self.values.get(labels, 0) + amount
+
+    def samples(self) -> Iterator[str]:
+        """Yield the sample lines of the counter."""
+        for labels, value in self.values.items():
+            yield (
+                f"{self.name}{_format_labels(self.label_names, labels)} "
+                f"{_format_value(value)}"
+            )
+
+
+class Gauge(Metric):
+    """Value that can go up and down."""
+
+    type_name = "gauge"
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = ()):
+        """Initialize the gauge."""
+        super().__init__(name, documentation, label_names)
+        self.values: Dict[Labels, float] = {}
+
+    def set(self, *labels: str, value: float):
+        """Set the gauge of the label values."""
+        self.values[labels] = value
+
+    def clear(self):
+        """Remove all values."""
+        self.values = {}
+
+    def samples(self) -> Iterator[str]:
+        """Yield the sample lines of the gauge."""
+        for labels, value in self.values.items():
+            yield (
+                f"{self.name}{_format_labels(self.label_names, labels)} "
+                f"{_format_value(value)}"
+            )
+
+
+class Histogram(Metric):
+    """Distribution of observations over fixed buckets."""
+
+    type_name = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        label_names: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ):
+        """Initialize the histogram."""
+        super().__init__(name, documentation, label_names)
+        self.buckets = tuple(buckets)
+        # Per label values: count per bucket (last is +Inf), sum of observations
+        self.values: Dict[Labels, Tuple[List[int], List[float]]] = {}
+
+    def observe(self, *labels: str, value: float):
+        """Record an observation for the label values."""
+        state = self.values.get(labels)
+        if state is None:
+            state = self.values[labels] = ([0] * (len(self.buckets) + 1), [0.0])
+        counts, total = state
+        counts[bisect_left(self.buckets, value)] += 1
+        total[0] += value
+
+    def samples(self) -> Iterator[str]:
+        """Yield the cumulative bucket, sum and count lines of the histogram."""
+        for labels, (counts, total) in self.values.items():
+            cumulative = 0
+            for bound, count in zip((*self.buckets, float("inf")), counts):
+                cumulative += count
+                bucket_labels = _format_labels(
+                    self.label_names, labels, le=_format_value(bound)
+                )
+                yield f"{self.name}_bucket{bucket_labels} {cumulative}"
+            label_text = _format_labels(self.label_names, labels)
+            yield f"{self.name}_sum{label_text} {_format_value(total[0])}"
+            yield f"{self.name}_count{label_text} {cumulative}"
+
+
+class WalletGroupsMetrics:
+    """Metrics collected by the plugin routes."""
+
+    def __init__(self):
+        """Initialize the metrics."""
+        self.request_duration = Histogram(
+            "wallet_groups_request_duration_seconds",
+            "Time spent handling a request, per route.",
+            ["route"],
+        )
+        self.storage_duration = Histogram(
+            "wallet_groups_storage_duration_seconds",
+            "Time spent in storage sessions, per route.",
+            ["route"],
+        )
+        self.serialization_duration = Histogram(
+            "wallet_groups_serialization_duration_seconds",
+            "Time spent formatting wallet records, per route.",
+            ["route"],
+        )
+        self.result_size = Histogram(
+            "wallet_groups_list_result_size",
+            "Number of wallet records returned per list request.",
+            ["route"],
+            buckets=SIZE_BUCKETS,
+        )
+        self.errors = Counter(
+            "wallet_groups_errors_total",
+            "Errors raised by the routes, per exception type.",
+            ["route", "exception"],
+        )
+        self.group_wallets = Gauge(
+            "wallet_groups_wallets",
+            "Number of wallets per group.",
+            ["group_id"],
+        )
+        self.reconciler_scanned = Counter(
+            "wallet_groups_reconciler_scanned_total",
+            "Wallet records checked by the group reconciler.",
+        )
+        self.reconciler_drift = Counter(
+            "wallet_groups_reconciler_drift_total",
+            "Wallets whose group tag and setting disagreed, per field to repair.",
+            ["field"],
+        )
+        self.reconciler_repaired = Counter(
+            "wallet_groups_reconciler_repaired_total",
+            "Wallets repaired by the group reconciler, per field rewritten.",
+            ["field"],
+        )
+        self.reconciler_pass_drift = Gauge(
+            "wallet_groups_reconciler_pass_drift",
+            "Wallets found drifted in the last completed reconciler pass.",
+        )
+        self._group_wallets_at: Optional[float] = None
+
+    @property
+    def metrics(self) -> List[Metric]:
+        """All metrics of the registry."""
+        return [
+            self.request_duration,
+            self.storage_duration,
+            self.serialization_duration,
+            self.result_size,
+            self.errors,
+            self.group_wallets,
+            self.reconciler_scanned,
+            self.reconciler_drift,
+            self.reconciler_repaired,
+            self.reconciler_pass_drift,
+        ]
+
+    @contextmanager
+    def timer(self, histogram: Histogram, route: str):
+        """Observe the duration of the block on the histogram."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            histogram.observe(route, value=time.perf_counter() - started)
+
+    def storage(self, route: str):
+        """Time a storage session of the route."""
+        return self.timer(self.storage_duration, route)
+
+    def serialization(self, route: str):
+        """Time the formatting of wallet records by the route."""
+        return self.timer(self.serialization_duration, route)
+
+    async def refresh_group_wallets(self, profile: Profile, max_age: float):
+        """Recount the wallets per group, if the last count is older than max_age.
+
+        This reads all wallet records, so it is opt-in and cached.
+        """
+
+        now = time.monotonic()
+        if self._group_wallets_at and now - self._group_wallets_at < max_age:
+            return
+
+        counts: Dict[str, int] = {}
+        async with profile.session() as session:
+            records = await session.inject(BaseStorage).find_all_records(
+                WalletRecord.RECORD_TYPE
+            )
+        for record in records:
+            group_id = record.tags.get("group_id")
+            if group_id:
+                counts[group_id] = counts.get(group_id, 0) + 1
+
+        self.group_wallets.clear()
+        for group_id, count in counts.items():
+            self.group_wallets.set(group_id, value=count)
+        self._group_wallets_at = now
+
+    def render(self) -> str:
+        """Return all metrics in Prometheus text format."""
+        lines = [line for metric in self.metrics for line in metric.render()]
+        return "\n".join(lines) + "\n"
+
+
+METRICS = WalletGroupsMetrics()
+
+
+def instrumented(
+    handler: Callable[[web.BaseRequest], Awaitable[web.StreamResponse]],
+) -> Callable[[web.BaseRequest], Awaitable[web.StreamResponse]]:
+    """Record the latency and errors of a route handler.
+
+    Client errors are counted by their HTTP exception type, other failures by
+    their exception type. Redirects and `304 Not Modified` are not errors.
+    """
+
+    route = handler.__name__
+
+    @functools.wraps(handler)
+    async def wrapper(request: web.BaseRequest):
+        started = time.perf_counter()
+        try:
+            return await handler(request)
+        except web.HTTPException as err:
+            if err.status >= 400:
+                METRICS.errors.inc(route, type(err).__name__)
+            raise
+        except Exception as err:
+            METRICS.errors.inc(route, type(err).__name__)
+            raise
+        finally:
+            METRICS.request_duration.observe(
+                route, value=time.perf_counter() - started
+            )
+
+    return wrapper
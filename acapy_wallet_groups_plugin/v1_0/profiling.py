@@ -0,0 +1,105 @@
+"""On-demand CPU profiling of single requests.
+
+A request sent with the `X-Profile: 1` header runs under `cProfile` when the
+`request_profiling` setting allows it. The profile is written to
+`request_profiling_dir` when configured, otherwise it is returned as a
+`.prof` attachment (readable with `pstats`, snakeviz, ...) instead of the
+route's response. Requests that change wallets would lose their response,
+such as the token of a created wallet, so they are only profiled to
+`request_profiling_dir`.
+
+Other requests only pay for a header lookup. `cProfile` traces the whole
+thread, so other requests handled by the event loop while the profiled
+handler awaits show up in its profile too. Only one profiler can be active,
+so a request asking for a profile while another is profiled gets
+`409 Conflict`.
+"""
+
+import asyncio
+import functools
+import logging
+import marshal
+import os
+import time
+from typing import Awaitable, Callable
+from uuid import uuid4
+
+from aiohttp import web
+
+from .config import get_config
+
+LOGGER = logging.getLogger(__name__)
+
+PROFILE_HEADER = "X-Profile"
+PROFILE_CONTENT_TYPE = "application/octet-stream"
+READ_METHODS = ("GET", "HEAD")
+
+# Route of the request being profiled, if any
+_profiling = None
+
+
+def _profile_file_name(route: str) -> str:
+    return f"{route}-{time.strftime('%Y%m%dT%H%M%S')}-{uuid4().hex[:8]}.prof"
+
+
+def profiled(
+    handler: Callable[[web.BaseRequest], Awaitable[web.StreamResponse]],
+) -> Callable[[web.BaseRequest], Awaitable[web.StreamResponse]]:
+    """Run a route handler under cProfile when requested with `X-Profile: 1`."""
+
+    route = handler.__name__
+
+    @functools.wraps(handler)
+    async def wrapper(request: web.BaseRequest):
+        if request.headers.get(PROFILE_HEADER) != "1":
+            return await handler(request)
+
+        config = get_config(request["context"].profile)
+        if not config.request_profiling:
+            return await handler(request)
+        if request.method not in READ_METHODS and not config.request_profiling_dir:
+            raise web.HTTPBadRequest(
+                reason="Profiling requests that change wallets needs a profiling dir"
+            )
+
+        global _profiling
+        if _profiling:
+            raise web.HTTPConflict(reason=f"A {_profiling} request is being profiled")
+
+        import cProfile
+
+        profiler = cProfile.Profile()
+        file_name = _profile_file_name(route)
+        try:
+            profiler.enable()
+        except ValueError as err:
+            # Another profiler, not started by the plugin, is active
+            raise web.HTTPConflict(reason=str(err)) from err
+        _profiling = route
+        try:
+            response = await handler(request)
+        finally:
+            profiler.disable()
+            _profiling = None
+            if config.request_profiling_dir:
+                path = os.path.join(config.request_profiling_dir, file_name)
+                await asyncio.get_running_loop().run_in_executor(
+                    None, profiler.dump_stats, path
+                )
+                LOGGER.info("Wrote profile of %s request to %s", route, path)
+
+        if config.request_profiling_dir:
+            response.headers["X-Profile-File"] = file_name
+            return response
+
+        profiler.create_stats()
+        return web.Response(
+            body=marshal.dumps(profiler.stats),
+            content_type=PROFILE_CONTENT_TYPE,
+            headers={
+                "Content-Disposition": f'attachment; filename="{file_name}"',
+                "X-Profile-Status": str(response.status),
+            },
+        )
+
+    return wrapper
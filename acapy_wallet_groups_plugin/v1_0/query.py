@@ -0,0 +1,122 @@
+"""Helpers for reading wallet records from storage in pages."""
+
+import asyncio
+from typing import AsyncIterator, Awaitable, Callable, List, Optional, Tuple, TypeVar
+
+from acapy_agent.core.error import BaseError
+from acapy_agent.core.profile import Profile
+from acapy_agent.wallet.models.wallet_record import WalletRecord
+
+T = TypeVar("T")
+
+
+class QueryTimeoutError(BaseError):
+    """A storage query did not finish before its deadline."""
+
+
+async def run_query(query: Awaitable[T], timeout: float) -> T:
+    """Await a storage query, cancelling it after `timeout` seconds.
+
+    The query should open its own session: cancelling it closes the session,
+    rolling back anything it did not commit.
+
+    Args:
+        query: the query to await
+        timeout: seconds allowed, 0 for no deadline
+
+    Raises:
+        QueryTimeoutError: if the query did not finish in time
+
+    """
+
+    if not timeout:
+        return await query
+    try:
+        return await asyncio.wait_for(query, timeout)
+    except asyncio.TimeoutError as err:
+        raise QueryTimeoutError(
+            f"Storage query did not finish within {timeout:g} seconds"
+        ) from err
+
+
+async def query_until_deadline(
+    fetch: Callable[[int, int], Awaitable[List[T]]],
+    limit: int,
+    offset: int,
+    timeout: float,
+    page_size: int = 100,
+) -> Tuple[List[T], bool]:
+    """Read up to `limit` records in pages, keeping those read by the deadline.
+
+    Args:
+        fetch: coroutine function reading a page, given its limit and offset
+        limit: number of records to read
+        offset: offset of the first record
+        timeout: seconds allowed for all pages
+        page_size: number of records read per page
+
+    Returns:
+        The records read, and whether the deadline cut them short
+
+    """
+
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    records = []
+    while len(records) < limit:
+        page_limit = min(page_size, limit - len(records))
+        try:
+            page = await asyncio.wait_for(
+                fetch(page_limit, offset + len(records)), deadline - loop.time()
+            )
+        except asyncio.TimeoutError:
+            return records, True
+
+        records.extend(page)
+        if len(page) < page_limit:
+            break
+    return records, False
+
+
+async def iter_wallet_records(
+    profile: Profile,
+    tag_filter: Optional[dict] = None,
+    page_size: int = 100,
+    timeout: float = 0.0,
+) -> AsyncIterator[List[WalletRecord]]:
+    """Yield pages of wallet records matching the tag filter.
+
+    Each page is read in its own session, so a long running consumer does not
+    hold a storage session open between pages.
+
+    Args:
+        profile: the (base) profile holding the wallet records
+        tag_filter: tag filter to apply, e.g. `{"group_id": "some_group_id"}`
+        page_size: number of records to read per page
+        timeout: seconds allowed to read each page, 0 for no deadline
+
+    Raises:
+        QueryTimeoutError: if a page was not read in time
+
+    """
+
+    async def read_page(offset: int) -> List[WalletRecord]:
+        async with profile.session() as session:
+            return await WalletRecord.query(
+                session,
+                tag_filter=tag_filter or {},
+                limit=page_size,
+                offset=offset,
+                order_by="id",
+                descending=False,
+            )
+
+    offset = 0
+    while True:
+        records = await run_query(read_page(offset), timeout)
+
+        if records:
+            yield records
+        if len(records) < page_size:
+            return
+        offset += len(records)
@@ -0,0 +1,224 @@
+"""Per group wallet quotas, enforced against stored counters.
+
+Each group has a counter record in the base wallet holding its number of
+wallets, so a quota is checked in O(1) instead of counting the group. The
+counter is read for update and written in a single transaction, under a
+per group lock, so concurrent creates cannot both take the last slot.
+
+A counter is initialized by counting the group's wallet records the first
+time the group is reserved in. Afterwards it is only maintained by the plugin
+routes; wallets removed through other means leave it too high.
+"""
+
+import asyncio
+import json
+from collections import defaultdict
+from contextlib import AsyncExitStack, asynccontextmanager
+from typing import Dict, Optional
+
+from acapy_agent.core.error import BaseError
+from acapy_agent.core.profile import Profile
+from acapy_agent.storage.base import BaseStorage
+from acapy_agent.storage.error import StorageNotFoundError
+from acapy_agent.storage.record import StorageRecord
+from acapy_agent.wallet.models.wallet_record import WalletRecord
+
+COUNTER_RECORD_TYPE = "wallet_groups_counter"
+
+
+class GroupQuotaExceededError(BaseError):
+    """The group has no room for another wallet."""
+
+
+class GroupQuotas:
+    """Maintains wallet counters per group and enforces their quotas."""
+
+    def __init__(self, quotas: Dict[str, int], default_quota: int = 0):
+        """Initialize the quotas.
+
+        Args:
+            quotas: maximum number of wallets per group
+            default_quota: maximum for groups without a quota, 0 for unlimited
+        """
+        self.quotas = dict(quotas)
+        self.default_quota = default_quota
+        self._locks: Dict[str, asyncio.Lock] = defaultdict(asyncio.Lock)
+
+    def limit(self, group_id: str) -> Optional[int]:
+        """Return the quota of a group, None if unlimited."""
+        return self.quotas.get(group_id, self.default_quota) or None
+
+    async def reserve(self, profile: Profile, group_id: str) -> int:
+        """Take a slot in the group for a new or moved wallet.
+
+        Returns:
+            The number of wallets in the group, including the reserved one
+
+        Raises:
+            GroupQuotaExceededError: if the group is at its quota
+
+        """
+        return await self._adjust(profile, group_id, 1)
+
+    async def release(self, profile: Profile, group_id: str) -> int:
+        """Free the slot of a wallet that left the group, or was not created.
+
+        Returns:
+            The number of wallets left in the group
+        """
+        return await self._adjust(profile, group_id, -1)
+
+    async def count(self, profile: Profile, group_id: str) -> int:
+        """Return the number of wallets in the group."""
+
+        async with profile.session() as session:
+            storage = session.inject(BaseStorage)
+            try:
+                record = await storage.get_record(COUNTER_RECORD_TYPE, group_id)
+            except StorageNotFoundError:
+                return await self._count_wallets(storage, group_id)
+        return json.loads(record.value)["count"]
+
+    async def _count_wallets(self, storage: BaseStorage, group_id: str) -> int:
+        records = await storage.find_all_records(
+            WalletRecord.RECORD_TYPE, {"group_id": group_id}
+        )
+        return len(records)
+
+    @asynccontextmanager
+    async def lock(self, *group_ids: str):
+        """Hold the counter locks of the groups, taken in a stable order."""
+
+        async with AsyncExitStack() as stack:
+            for group_id in sorted(set(group_ids)):
+                await stack.enter_async_context(self._locks[group_id])
+            yield
+
+    async def adjust(
+        self,
+        storage: BaseStorage,
+        group_id: str,
+        delta: int,
+        *,
+        enforce: bool = True,
+    ) -> int:
+        """Change the counter of a group within the caller's transaction.
+
+        The caller holds the lock of the group. A missing counter is
+        initialized by counting, which is expected to include neither the
+        wallets joining the group nor those that already left it.
+
+        Args:
+            storage: storage of the caller's transaction
+            group_id: the group to count the wallets of
+            delta: number of wallets joining, or leaving when negative
+            enforce: whether to refuse wallets beyond the quota, rather than
+                only count wallets already in the group
+
+        Returns:
+            The number of wallets in the group after the change
+
+        Raises:
+            GroupQuotaExceededError: if the group has no room for the wallets
+
+        """
+
+        try:
+            record = await storage.get_record(
+                COUNTER_RECORD_TYPE, group_id, {"forUpdate": True}
+            )
+            count = json.loads(record.value)["count"]
+        except StorageNotFoundError:
+            record = None
+            count = await self._count_wallets(storage, group_id)
+            if delta < 0:
+                # The wallets already left the group, the count excludes them
+                delta = 0
+
+        limit = self.limit(group_id)
+        if enforce and delta > 0 and limit is not None and count + delta > limit:
+            raise GroupQuotaExceededError(
+                f"Group {group_id} reached its quota of {limit} wallets"
+            )
+
+        count = max(0, count + delta)
+        value = json.dumps({"count": count})
+        if record:
+            await storage.update_record(record, value, record.tags)
+        else:
+            await storage.add_record(
+                StorageRecord(
+                    COUNTER_RECORD_TYPE, value, {"group_id": group_id}, group_id
+                )
+            )
+        return count
+
+    async def _adjust(self, profile: Profile, group_id: str, delta: int) -> int:
+        async with self._locks[group_id], profile.transaction() as txn:
+            count = await self.adjust(txn.inject(BaseStorage), group_id, delta)
+            await txn.commit()
+
+        return count
+
+
+@asynccontextmanager
+async def group_slot(profile: Profile, group_id: Optional[str]):
+    """Reserve a slot in the group for a wallet created in the block.
+
+    The slot is kept when the block succeeds, and released when it raises.
+    Does nothing when quotas are not enabled or no group is given.
+
+    Raises:
+        GroupQuotaExceededError: if the group is at its quota
+
+    """
+
+    quotas = profile.inject_or(GroupQuotas) if group_id else None
+    if not quotas:
+        yield
+        return
+
+    await quotas.reserve(profile, group_id)
+    try:
+        yield
+    except BaseException:
+        await quotas.release(profile, group_id)
+        raise
+
+
+@asynccontextmanager
+async def group_move_slot(profile: Profile, wallet_id: str, group_id: Optional[str]):
+    """Reserve a slot in the group for a wallet moved into it in the block.
+
+    On success, the slot of the wallet in its previous group is released.
+
+    Raises:
+        GroupQuotaExceededError: if the group is at its quota
+        StorageNotFoundError: if the wallet does not exist
+
+    """
+
+    quotas = profile.inject_or(GroupQuotas) if group_id is not None else None
+    if not quotas:
+        yield
+        return
+
+    async with profile.session() as session:
+        wallet_record = await WalletRecord.retrieve_by_id(session, wallet_id)
+    previous_group_id = wallet_record.group_id
+    if previous_group_id == group_id:
+        yield
+        return
+
+    async with group_slot(profile, group_id):
+        yield
+    if previous_group_id:
+        await quotas.release(profile, previous_group_id)
+
+
+async def release_group_slot(profile: Profile, group_id: Optional[str]):
+    """Release the slot of a wallet removed from the group, if quotas are enabled."""
+
+    quotas = profile.inject_or(GroupQuotas) if group_id else None
+    if quotas:
+        await quotas.release(profile, group_id)
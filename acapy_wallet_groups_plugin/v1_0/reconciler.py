@@ -0,0 +1,320 @@
+"""Repair wallets whose group tag and group setting disagree.
+
+A wallet's group is kept twice: in the `group_id` tag of its wallet record,
+which listings and group endpoints query, and in its `wallet.group_id`
+setting, which its profile reads. The routes write both, but a failed second
+save or an older plugin version can leave them apart.
+
+The reconciler walks all wallet records in the background, one batch per
+transaction, from a cursor kept in the base wallet so a restart resumes where
+it stopped. The setting wins: a wrong tag is rewritten from the setting, and a
+missing setting is filled from the tag. Reads are paced to
+`records_per_second`, and a new pass starts `interval` seconds after the
+previous one completed. Agent instances sharing the base wallet share the
+cursor, so each batch is reconciled once.
+"""
+
+import asyncio
+import json
+import logging
+import time
+from collections import Counter
+from contextlib import nullcontext
+from dataclasses import dataclass, field
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from acapy_agent.core.event_bus import Event
+from acapy_agent.core.profile import Profile, ProfileSession
+from acapy_agent.storage.base import BaseStorage
+from acapy_agent.storage.error import StorageNotFoundError
+from acapy_agent.storage.record import StorageRecord
+from acapy_agent.wallet.models.wallet_record import WalletRecord
+
+from .events import WALLET_UPDATED, notify_wallet_event
+from .metrics import METRICS
+from .quotas import GroupQuotas
+from .regroup import update_cached_profile
+
+LOGGER = logging.getLogger(__name__)
+
+RECONCILER_RECORD_TYPE = "wallet_groups_reconciler"
+CURSOR_RECORD_ID = "cursor"
+
+# Drifted field rewritten by a repair
+TAG = "tag"
+SETTING = "setting"
+
+
+def _groups(wallet_record: WalletRecord) -> Tuple[Optional[str], Optional[str]]:
+    """Return the group tag and group setting of a wallet record."""
+    setting = wallet_record.settings.get("wallet.group_id")
+    return wallet_record.group_id or None, setting or None
+
+
+def _drift(wallet_record: WalletRecord) -> Optional[str]:
+    """Return the field to repair, if the group tag and setting disagree."""
+
+    tag, setting = _groups(wallet_record)
+    if tag == setting:
+        return None
+    return TAG if setting else SETTING
+
+
+class ReconcileCursor(NamedTuple):
+    """Position of the reconciler, persisted between batches."""
+
+    # Number of wallet records, ordered by id, reconciled in the current pass
+    offset: int = 0
+    # Wallets found drifted in the current pass
+    drift: int = 0
+    # Epoch seconds the previous pass completed, 0 if none did
+    completed_at: float = 0.0
+
+    @classmethod
+    def from_record(cls, record: StorageRecord) -> "ReconcileCursor":
+        """Return the cursor stored in a record."""
+        return cls(**json.loads(record.value))
+
+    def to_json(self) -> str:
+        """Serialize the cursor."""
+        return json.dumps(self._asdict())
+
+
+@dataclass
+class ReconcileResult:
+    """Outcome of reconciling a batch of wallets."""
+
+    scanned: int = 0
+    drifted: Dict[str, str] = field(default_factory=dict)
+    repaired: Dict[str, str] = field(default_factory=dict)
+    # Whether the batch completed a pass over all wallets
+    completed: bool = False
+
+
+class GroupReconciler:
+    """Walks the wallet records in batches, repairing group drift."""
+
+    def __init__(
+        self,
+        interval: float = 3600.0,
+        batch_size: int = 100,
+        records_per_second: float = 100.0,
+    ):
+        """Initialize the reconciler.
+
+        Args:
+            interval: seconds between the end of a pass and the next one
+            batch_size: number of wallet records reconciled per transaction
+            records_per_second: wallet records read per second at most
+        """
+        self.interval = interval
+        self.batch_size = batch_size
+        self.records_per_second = records_per_second
+        self.task: Optional[asyncio.Task] = None
+
+    async def load_cursor(self, profile: Profile) -> ReconcileCursor:
+        """Return the persisted cursor, or the start of a first pass."""
+
+        async with profile.session() as session:
+            return await self._read_cursor(session.inject(BaseStorage))
+
+    async def _read_cursor(
+        self, storage: BaseStorage, for_update: bool = False
+    ) -> ReconcileCursor:
+        try:
+            record = await storage.get_record(
+                RECONCILER_RECORD_TYPE, CURSOR_RECORD_ID, {"forUpdate": for_update}
+            )
+        except StorageNotFoundError:
+            return ReconcileCursor()
+        return ReconcileCursor.from_record(record)
+
+    async def _write_cursor(self, storage: BaseStorage, cursor: ReconcileCursor):
+        try:
+            record = await storage.get_record(RECONCILER_RECORD_TYPE, CURSOR_RECORD_ID)
+        except StorageNotFoundError:
+            await storage.add_record(
+                StorageRecord(
+                    RECONCILER_RECORD_TYPE, cursor.to_json(), {}, CURSOR_RECORD_ID
+                )
+            )
+        else:
+            await storage.update_record(record, cursor.to_json(), {})
+
+    async def reconcile_batch(
+        self, profile: Profile, cursor: Optional[ReconcileCursor] = None
+    ) -> ReconcileResult:
+        """Reconcile the next batch of wallets and advance the cursor.
+
+        Args:
+            profile: the base profile
+            cursor: the cursor just loaded, to avoid reading it again
+
+        Returns:
+            The wallets checked and repaired; nothing when another agent
+            instance reconciled the batch first
+
+        """
+
+        cursor = cursor or await self.load_cursor(profile)
+        async with profile.session() as session:
+            records = await WalletRecord.query(
+                session,
+                limit=self.batch_size,
+                offset=cursor.offset,
+                order_by="id",
+                descending=False,
+            )
+
+        result = ReconcileResult(
+            scanned=len(records), completed=len(records) < self.batch_size
+        )
+        drifted = []
+        for record in records:
+            drift_field = _drift(record)
+            if drift_field:
+                result.drifted[record.wallet_id] = drift_field
+                drifted.append(record)
+
+        quotas = profile.inject_or(GroupQuotas)
+        # Counter locks come before the transaction, as for single wallet updates
+        group_ids = {
+            group_id for record in drifted for group_id in _groups(record) if group_id
+        }
+        lock = quotas.lock(*group_ids) if quotas and group_ids else nullcontext()
+
+        async with lock, profile.transaction() as txn:
+            storage = txn.inject(BaseStorage)
+            if await self._read_cursor(storage, for_update=True) != cursor:
+                return ReconcileResult()
+
+            previous_group_ids = await self._repair(txn, storage, quotas, drifted)
+            result.repaired = {
+                wallet_id: result.drifted[wallet_id] for wallet_id in previous_group_ids
+            }
+
+            drift = cursor.drift + len(result.drifted)
+            if result.completed:
+                next_cursor = ReconcileCursor(completed_at=time.time())
+            else:
+                next_cursor = cursor._replace(
+                    offset=cursor.offset + len(records), drift=drift
+                )
+            await self._write_cursor(storage, next_cursor)
+            await txn.commit()
+
+        METRICS.reconciler_scanned.inc(amount=result.scanned)
+        for drift_field in result.drifted.values():
+            METRICS.reconciler_drift.inc(drift_field)
+        for drift_field in result.repaired.values():
+            METRICS.reconciler_repaired.inc(drift_field)
+        if result.completed:
+            METRICS.reconciler_pass_drift.set(value=drift)
+
+        for record in drifted:
+            wallet_id = record.wallet_id
+            if wallet_id not in previous_group_ids:
+                continue
+            group_id = _groups(record)[1] or record.group_id
+            update_cached_profile(profile, wallet_id, group_id)
+            await notify_wallet_event(
+                profile,
+                WALLET_UPDATED,
+                wallet_id,
+                group_id,
+                previous_group_ids[wallet_id],
+            )
+
+        return result
+
+    async def _repair(
+        self,
+        txn: ProfileSession,
+        storage: BaseStorage,
+        quotas: Optional[GroupQuotas],
+        drifted: List[WalletRecord],
+    ) -> Dict[str, Optional[str]]:
+        """Repair drifted wallets within the transaction.
+
+        Returns:
+            The group tag of each repaired wallet before the repair
+
+        """
+
+        repairing = []
+        for record in drifted:
+            try:
+                current = await WalletRecord.retrieve_by_id(
+                    txn, record.wallet_id, for_update=True
+                )
+            except StorageNotFoundError:
+                continue
+            # Changed since the batch was read, and not covered by the locks;
+            # the next pass sees it again
+            if _groups(current) == _groups(record):
+                repairing.append(current)
+
+        retagged = [record for record in repairing if _drift(record) == TAG]
+        # Wallets already belong to the group of their setting, so quotas count
+        # them without refusing them
+        if quotas:
+            joined = Counter(_groups(record)[1] for record in retagged)
+            for group_id, count in joined.items():
+                await quotas.adjust(storage, group_id, count, enforce=False)
+
+        previous_group_ids = {}
+        for wallet_record in repairing:
+            tag, setting = _groups(wallet_record)
+            previous_group_ids[wallet_record.wallet_id] = tag
+            if setting:
+                wallet_record.group_id = setting
+            else:
+                wallet_record.update_settings({"wallet.group_id": tag})
+            await wallet_record.save(txn, reason="Reconciled wallet group")
+
+        if quotas:
+            left = Counter(
+                previous_group_ids[record.wallet_id]
+                for record in retagged
+                if previous_group_ids[record.wallet_id]
+            )
+            for group_id, count in left.items():
+                await quotas.adjust(storage, group_id, -count)
+
+        return previous_group_ids
+
+    async def _run(self, profile: Profile):
+        while True:
+            try:
+                cursor = await self.load_cursor(profile)
+                if cursor.offset == 0 and cursor.completed_at:
+                    wait = cursor.completed_at + self.interval - time.time()
+                    if wait > 0:
+                        await asyncio.sleep(wait)
+                        continue
+
+                started = time.monotonic()
+                result = await self.reconcile_batch(profile, cursor)
+            except Exception:
+                # E.g. storage errors or a wallet record that cannot be loaded;
+                # cancellation is not an Exception, so it still stops the task
+                LOGGER.exception("Failed to reconcile wallet groups")
+                await asyncio.sleep(self.interval)
+                continue
+
+            # Paced so that reads stay within the I/O budget
+            budget = result.scanned / self.records_per_second
+            await asyncio.sleep(max(0.0, budget - (time.monotonic() - started)))
+
+    async def on_startup(self, profile: Profile, event: Event):
+        """Event bus handler starting the background reconciliation."""
+
+        if not self.task:
+            self.task = asyncio.create_task(self._run(profile))
+
+    async def on_shutdown(self, profile: Profile, event: Event):
+        """Event bus handler stopping the background reconciliation."""
+
+        if self.task:
+            self.task.cancel()
+            self.task = None
@@ -0,0 +1,235 @@
+"""Move many wallets to another group at once.
+
+Splitting or merging groups with `PUT /multitenancy/wallet/{wallet_id}` costs
+an `update_wallet` and a second save per wallet. Here the wallets are moved in
+chunks: each chunk rewrites the `group_id` tag and `wallet.group_id` setting of
+its wallet records, and the counters of the groups involved, in a single
+transaction. A chunk is either moved as a whole or not at all; chunks moved
+before a failure stay moved.
+"""
+
+from collections import Counter
+from contextlib import nullcontext
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Iterable, List, Optional
+
+from acapy_agent.core.profile import Profile
+from acapy_agent.multitenant.base import BaseMultitenantManager
+from acapy_agent.multitenant.cache import ProfileCache
+from acapy_agent.storage.base import BaseStorage
+from acapy_agent.storage.error import StorageNotFoundError
+from acapy_agent.wallet.models.wallet_record import WalletRecord
+
+from .cache import GroupAwareProfileCache
+from .events import WALLET_UPDATED, notify_wallet_event
+from .query import run_query
+from .quotas import GroupQuotas
+
+
+@dataclass
+class MoveProgress:
+    """Outcome of moving a chunk of wallets, with the totals so far."""
+
+    moved: List[str] = field(default_factory=list)
+    errors: List[dict] = field(default_factory=list)
+    total_moved: int = 0
+    total_failed: int = 0
+
+    def serialize(self) -> dict:
+        """Serialize the progress."""
+        return {
+            "moved": self.moved,
+            "errors": self.errors,
+            "total_moved": self.total_moved,
+            "total_failed": self.total_failed,
+        }
+
+
+async def move_wallets(
+    profile: Profile,
+    group_id: str,
+    *,
+    wallet_ids: Optional[Iterable[str]] = None,
+    source_group_id: Optional[str] = None,
+    chunk_size: int = 100,
+    timeout: float = 0.0,
+) -> AsyncIterator[MoveProgress]:
+    """Move wallets to a group, yielding the progress after each chunk.
+
+    Args:
+        profile: the base profile
+        group_id: the group to move the wallets to
+        wallet_ids: the wallets to move
+        source_group_id: move every wallet of this group instead
+        chunk_size: number of wallets moved per transaction
+        timeout: seconds allowed to read each chunk, 0 for no deadline
+
+    Raises:
+        GroupQuotaExceededError: if a chunk does not fit in the group's quota;
+            earlier chunks stay moved
+        QueryTimeoutError: if a chunk was not read in time; earlier chunks
+            stay moved
+        StorageError: if a chunk could not be written
+
+    """
+
+    progress = MoveProgress()
+    chunks = (
+        _source_group_chunks(profile, source_group_id, chunk_size, timeout)
+        if source_group_id is not None
+        else _wallet_id_chunks(profile, wallet_ids or (), chunk_size, timeout, progress)
+    )
+    async for records in chunks:
+        previous_group_ids = (
+            await _move_chunk(profile, group_id, records, progress) if records else {}
+        )
+        progress.moved = list(previous_group_ids)
+        progress.total_moved += len(progress.moved)
+        progress.total_failed += len(progress.errors)
+
+        for wallet_id, previous_group_id in previous_group_ids.items():
+            update_cached_profile(profile, wallet_id, group_id)
+            await notify_wallet_event(
+                profile, WALLET_UPDATED, wallet_id, group_id, previous_group_id
+            )
+
+        yield progress
+        progress.errors = []
+
+
+async def _wallet_id_chunks(
+    profile: Profile,
+    wallet_ids: Iterable[str],
+    chunk_size: int,
+    timeout: float,
+    progress: MoveProgress,
+) -> AsyncIterator[List[WalletRecord]]:
+    """Read the listed wallets in chunks, reporting those that do not exist."""
+
+    async def read_chunk(chunk: List[str]) -> List[WalletRecord]:
+        records = []
+        async with profile.session() as session:
+            for wallet_id in chunk:
+                try:
+                    records.append(
+                        await WalletRecord.retrieve_by_id(session, wallet_id)
+                    )
+                except StorageNotFoundError:
+                    progress.errors.append(
+                        {"wallet_id": wallet_id, "error": "Wallet not found"}
+                    )
+        return records
+
+    wallet_ids = list(dict.fromkeys(wallet_ids))
+    for start in range(0, len(wallet_ids), chunk_size):
+        yield await run_query(
+            read_chunk(wallet_ids[start : start + chunk_size]), timeout
+        )
+
+
+async def _source_group_chunks(
+    profile: Profile,
+    source_group_id: str,
+    chunk_size: int,
+    timeout: float,
+) -> AsyncIterator[List[WalletRecord]]:
+    """Read the wallets of a group in chunks, as they are moved out of it."""
+
+    async def read_chunk() -> List[WalletRecord]:
+        # Moved wallets leave the group, so the first page is always read
+        async with profile.session() as session:
+            return await WalletRecord.query(
+                session,
+                tag_filter={"group_id": source_group_id},
+                limit=chunk_size,
+                order_by="id",
+                descending=False,
+            )
+
+    attempted = set()
+    while True:
+        records = await run_query(read_chunk(), timeout)
+
+        records = [record for record in records if record.wallet_id not in attempted]
+        if not records:
+            return
+        attempted.update(record.wallet_id for record in records)
+        yield records
+
+
+async def _move_chunk(
+    profile: Profile,
+    group_id: str,
+    records: List[WalletRecord],
+    progress: MoveProgress,
+) -> dict:
+    """Move a chunk of wallets in a single transaction.
+
+    Returns:
+        The previous group of each moved wallet
+
+    """
+
+    quotas = profile.inject_or(GroupQuotas)
+    # Counter locks come before the transaction, as for single wallet updates
+    group_ids = {record.group_id for record in records if record.group_id}
+    lock = quotas.lock(group_id, *group_ids) if quotas else nullcontext()
+
+    previous_group_ids = {}
+    async with lock, profile.transaction() as txn:
+        storage = txn.inject(BaseStorage)
+        moving = []
+        for record in records:
+            wallet_id = record.wallet_id
+            try:
+                current = await WalletRecord.retrieve_by_id(
+                    txn, wallet_id, for_update=True
+                )
+            except StorageNotFoundError:
+                progress.errors.append(
+                    {"wallet_id": wallet_id, "error": "Wallet not found"}
+                )
+                continue
+            if current.group_id != record.group_id:
+                progress.errors.append(
+                    {"wallet_id": wallet_id, "error": "Wallet moved concurrently"}
+                )
+                continue
+            if current.group_id != group_id:
+                moving.append(current)
+
+        # Counted before the wallets join the target, after they left the sources
+        if quotas and moving:
+            await quotas.adjust(storage, group_id, len(moving))
+
+        for wallet_record in moving:
+            previous_group_ids[wallet_record.wallet_id] = wallet_record.group_id
+            wallet_record.update_settings({"wallet.group_id": group_id})
+            wallet_record.group_id = group_id
+            await wallet_record.save(txn, reason="Moved to another group")
+
+        if quotas:
+            left = Counter(
+                previous for previous in previous_group_ids.values() if previous
+            )
+            for previous_group_id, count in left.items():
+                await quotas.adjust(storage, previous_group_id, -count)
+
+        await txn.commit()
+
+    return previous_group_ids
+
+
+def update_cached_profile(profile: Profile, wallet_id: str, group_id: str):
+    """Update the group of the wallet's profile, if it is open."""
+
+    multitenant_mgr = profile.inject_or(BaseMultitenantManager)
+    cache = getattr(multitenant_mgr, "_profiles", None)
+    if not isinstance(cache, ProfileCache):
+        return
+
+    wallet_profile = cache.profiles.get(wallet_id)
+    if wallet_profile:
+        wallet_profile.settings.update({"wallet.group_id": group_id})
+    if isinstance(cache, GroupAwareProfileCache):
+        cache.regroup(wallet_id, group_id)
@@ -3,9 +3,16 @@ Multitenant admin routes.
 
 This file has been copied from: https://github.com/openwallet-foundation/acapy/blob/1.3.0/acapy_agent/multitenant/admin/routes.py
 
-We do this because we want to override 4 endpoints - create, update, list, get
+We do this because we want to override 5 endpoints - create, update, list, get,
+remove
+
+On top of those, the plugin adds endpoints that operate on a whole wallet group.
 """
 
+import asyncio
+import functools
+import json
+
 from acapy_agent.admin.request_context import AdminRequestContext
 from acapy_agent.core.error import BaseError
 from acapy_agent.messaging.models.base import BaseModelError
@@ -14,15 +21,17 @@ from acapy_agent.messaging.models.paginated_query import get_paginated_query_par
 from acapy_agent.multitenant.admin.routes import (
     CreateWalletRequestSchema,
     CreateWalletResponseSchema,
+    MultitenantModuleResponseSchema,
+    RemoveWalletRequestSchema,
     UpdateWalletRequestSchema,
     WalletIdMatchInfoSchema,
     WalletListQueryStringSchema,
     WalletSettingsError,
     get_extra_settings_dict_per_tenant,
     wallet_create_token,
-    wallet_remove,
 )
 from acapy_agent.multitenant.base import BaseMultitenantManager
+from acapy_agent.multitenant.error import WalletKeyMissingError
 from acapy_agent.storage.error import StorageError, StorageNotFoundError
 from acapy_agent.utils.endorsement_setup import attempt_auto_author_with_endorser_setup
 from acapy_agent.wallet.models.wallet_record import WalletRecord, WalletRecordSchema
@@ -34,7 +43,52 @@ from aiohttp_apispec import (
     request_schema,
     response_schema,
 )
-from marshmallow import fields
+from marshmallow import ValidationError, fields, validate, validates_schema
+
+from .activity import ActivityTracker, activity_middleware
+from .cache import GroupAwareProfileCache
+from .change_feed import GroupChangeFeed
+from .compression import compress_response, stream_response
+from .conditional import (
+    etag_matches,
+    not_modified,
+    wallet_record_etag,
+    wallet_records_etag,
+)
+from .config import get_config
+from .events import (
+    WALLET_CREATED,
+    WALLET_REMOVED,
+    WALLET_UPDATED,
+    notify_wallet_event,
+)
+from .idempotency import (
+    IDEMPOTENCY_KEY_HEADER,
+    IDEMPOTENT_REPLAYED_HEADER,
+    IdempotencyKeyInProgressError,
+    IdempotencyKeyMismatchError,
+    IdempotencyStore,
+)
+from .metrics import CONTENT_TYPE, METRICS, instrumented
+from .profiling import profiled
+from .query import (
+    QueryTimeoutError,
+    iter_wallet_records,
+    query_until_deadline,
+    run_query,
+)
+from .quotas import (
+    GroupQuotaExceededError,
+    GroupQuotas,
+    group_move_slot,
+    group_slot,
+    release_group_slot,
+)
+from .regroup import move_wallets
+from .search import GroupSearchIndex
+from .snapshot import GroupSnapshots, SnapshotNotFoundError
+from .tracing import start_span, traced
+from .validation import request_body, validated_body
 
 
 # Deduplicate GroupId field definition, to append to following OpenApiSchema classes
@@ -58,10 +112,52 @@ class CreateWalletRequestWithGroupIdSchema(CreateWalletRequestSchema):
 class CreateWalletResponseWithGroupIdSchema(CreateWalletResponseSchema, GroupId):
     """Response schema for creating a wallet."""
 
+    endorser_setup = fields.Str(
+        metadata={
+            "description": (
+                "State of the endorser setup, when it is deferred to the background"
+            ),
+            "example": "pending",
+        }
+    )
+
 
 class WalletListQueryStringWithGroupIdSchema(WalletListQueryStringSchema, GroupId):
     """Parameters and validators for wallet list request query string."""
 
+    q = fields.Str(
+        required=False,
+        validate=validate.Length(min=1),
+        metadata={
+            "description": (
+                "Case insensitive text to find in the wallet name or label. "
+                "Requires `group_id`; results are ordered by wallet name."
+            ),
+            "example": "acme",
+        },
+    )
+    allow_partial = fields.Bool(
+        required=False,
+        metadata={
+            "description": (
+                "Return the wallets read so far when the query deadline passes, "
+                "instead of failing"
+            ),
+            "example": False,
+        },
+    )
+    snapshot_id = fields.Str(
+        required=False,
+        metadata={
+            "description": (
+                "Page through a snapshot of a group, taken with "
+                "`POST /multitenancy/groups/{group_id}/snapshot`. Offsets count "
+                "the wallets of the snapshot, so advance them by `limit`."
+            ),
+            "example": "3fa85f6457174562b3fc2c963f66afa6",
+        },
+    )
+
 
 class UpdateWalletRequestWithGroupIdSchema(UpdateWalletRequestSchema, GroupId):
     """Request schema for updating a existing wallet."""
@@ -78,6 +174,278 @@ class WalletListWithGroupIdSchema(OpenAPISchema):
         fields.Nested(WalletRecordWithGroupIdSchema()),
         metadata={"description": "List of wallet records"},
     )
+    partial = fields.Bool(
+        metadata={
+            "description": (
+                "Set when the query deadline passed before the page was read, "
+                "with `allow_partial`"
+            )
+        }
+    )
+    next_offset = fields.Int(
+        metadata={
+            "description": "Offset to continue a partial page from",
+            "example": 100,
+        }
+    )
+    count = fields.Int(
+        metadata={
+            "description": "Number of wallets in the snapshot, with `snapshot_id`",
+            "example": 2500,
+        }
+    )
+
+
+class GroupIdMatchInfoSchema(OpenAPISchema):
+    """Path parameters and validators for request taking group id."""
+
+    group_id = fields.Str(
+        required=True,
+        metadata={"description": "Wallet group identifier.", "example": "some_group_id"},
+    )
+
+
+class GroupTokenResultSchema(OpenAPISchema):
+    """Result line of the group token stream."""
+
+    wallet_id = fields.Str(
+        metadata={
+            "description": "Subwallet identifier",
+            "example": "3fa85f64-5717-4562-b3fc-2c963f66afa6",
+        }
+    )
+    token = fields.Str(
+        metadata={"description": "Authorization token to authenticate wallet requests"}
+    )
+    error = fields.Str(
+        metadata={"description": "Reason the token could not be issued, if any"}
+    )
+
+
+class GroupEventsQueryStringSchema(OpenAPISchema):
+    """Parameters and validators for group events request query string."""
+
+    after = fields.Int(
+        required=False,
+        validate=validate.Range(min=0),
+        metadata={
+            "description": (
+                "Sequence number of the last event seen. Only later events are "
+                "returned. Server-Sent Events clients may use `Last-Event-ID`."
+            ),
+            "example": 0,
+        },
+    )
+    timeout = fields.Int(
+        required=False,
+        load_default=30,
+        validate=validate.Range(min=0, max=120),
+        metadata={
+            "description": "Seconds to wait for a new event when polling",
+            "example": 30,
+        },
+    )
+
+
+class GroupEventSchema(OpenAPISchema):
+    """Wallet event in a group change feed."""
+
+    sequence = fields.Int(metadata={"description": "Event sequence number"})
+    state = fields.Str(
+        metadata={
+            "description": "Change to the wallet",
+            "example": "created",
+        }
+    )
+    wallet_id = fields.Str(metadata={"description": "Subwallet identifier"})
+    group_id = fields.Str(metadata={"description": "Wallet group identifier."})
+    previous_group_id = fields.Str(
+        metadata={"description": "Group the wallet moved from, if any"}
+    )
+    timestamp = fields.Float(metadata={"description": "Event time, in epoch seconds"})
+
+
+class GroupEventsResultSchema(OpenAPISchema):
+    """Result schema for group events long-poll."""
+
+    events = fields.List(
+        fields.Nested(GroupEventSchema()),
+        metadata={"description": "Events after the requested sequence number"},
+    )
+    cursor = fields.Int(
+        metadata={"description": "Sequence number to pass as `after` in the next poll"}
+    )
+    truncated = fields.Bool(
+        metadata={
+            "description": (
+                "Whether events after the requested sequence number are no longer "
+                "retained, in which case the group should be listed again"
+            )
+        }
+    )
+
+
+class GroupProfileCacheStatsSchema(OpenAPISchema):
+    """Profile cache counters of a single group."""
+
+    group_id = fields.Str(
+        allow_none=True, metadata={"description": "Wallet group identifier."}
+    )
+    size = fields.Int(metadata={"description": "Number of cached profiles"})
+    pinned = fields.Bool(metadata={"description": "Whether profiles are never evicted"})
+    weight = fields.Float(metadata={"description": "Share of the cache capacity"})
+    hits = fields.Int(metadata={"description": "Requests served from the cache"})
+    misses = fields.Int(metadata={"description": "Profiles opened on request"})
+    evictions = fields.Int(metadata={"description": "Profiles evicted"})
+
+
+class GroupIdleQueryStringSchema(OpenAPISchema):
+    """Parameters and validators for idle wallets request query string."""
+
+    since = fields.Int(
+        required=True,
+        validate=validate.Range(min=0),
+        metadata={
+            "description": "Epoch seconds. Wallets not active since are idle.",
+            "example": 1700000000,
+        },
+    )
+    limit = fields.Int(
+        required=False,
+        load_default=100,
+        validate=validate.Range(min=1, max=10000),
+        metadata={"description": "Number of activity records to read", "example": 100},
+    )
+    offset = fields.Int(
+        required=False,
+        load_default=0,
+        validate=validate.Range(min=0),
+        metadata={"description": "Offset for pagination", "example": 0},
+    )
+
+
+class IdleWalletSchema(OpenAPISchema):
+    """Idle wallet of a group."""
+
+    wallet_id = fields.Str(metadata={"description": "Subwallet identifier"})
+    last_active = fields.Float(
+        metadata={"description": "Last recorded activity, in epoch seconds"}
+    )
+
+
+class GroupIdleResultSchema(OpenAPISchema):
+    """Result schema for idle wallets of a group."""
+
+    results = fields.List(
+        fields.Nested(IdleWalletSchema()),
+        metadata={"description": "Wallets without activity since the given time"},
+    )
+
+
+class GroupMoveRequestSchema(OpenAPISchema):
+    """Request schema for moving subwallets to a group."""
+
+    wallet_ids = fields.List(
+        fields.Str(),
+        required=False,
+        metadata={"description": "Subwallets to move"},
+    )
+    source_group_id = fields.Str(
+        required=False,
+        metadata={
+            "description": "Move every subwallet of this group instead",
+            "example": "some_group_id",
+        },
+    )
+
+    @validates_schema
+    def validate_fields(self, data, **kwargs):
+        """Validate that exactly one way of selecting wallets is given."""
+
+        if ("wallet_ids" in data) == ("source_group_id" in data):
+            raise ValidationError(
+                "Exactly one of wallet_ids or source_group_id is required"
+            )
+
+
+class GroupMoveProgressSchema(OpenAPISchema):
+    """Progress line of the group move stream."""
+
+    moved = fields.List(
+        fields.Str(), metadata={"description": "Subwallets moved by the chunk"}
+    )
+    errors = fields.List(
+        fields.Dict(),
+        metadata={"description": "Subwallets that could not be moved, with reason"},
+    )
+    total_moved = fields.Int(metadata={"description": "Subwallets moved so far"})
+    total_failed = fields.Int(
+        metadata={"description": "Subwallets that could not be moved so far"}
+    )
+    error = fields.Str(
+        metadata={"description": "Reason the move stopped early, if any"}
+    )
+
+
+class GroupQuotaSchema(OpenAPISchema):
+    """Result schema for the wallet count and quota of a group."""
+
+    group_id = fields.Str(metadata={"description": "Wallet group identifier."})
+    count = fields.Int(metadata={"description": "Number of wallets in the group"})
+    limit = fields.Int(
+        allow_none=True,
+        metadata={"description": "Maximum number of wallets, null if unlimited"},
+    )
+
+
+class GroupSnapshotSchema(OpenAPISchema):
+    """Result schema for a snapshot of the wallets of a group."""
+
+    snapshot_id = fields.Str(
+        metadata={
+            "description": "Snapshot identifier, to list with as `snapshot_id`",
+            "example": "3fa85f6457174562b3fc2c963f66afa6",
+        }
+    )
+    group_id = fields.Str(metadata={"description": "Wallet group identifier."})
+    count = fields.Int(metadata={"description": "Number of wallets captured"})
+    created_at = fields.Int(
+        metadata={"description": "Time the snapshot was taken, in epoch seconds"}
+    )
+    expires_at = fields.Int(
+        metadata={"description": "Time the snapshot expires, in epoch seconds"}
+    )
+
+
+class EndorserSetupStatusSchema(OpenAPISchema):
+    """Result schema for the deferred endorser setup status of a wallet."""
+
+    wallet_id = fields.Str(metadata={"description": "Subwallet identifier"})
+    state = fields.Str(
+        validate=validate.OneOf(["pending", "running", "completed", "failed"]),
+        metadata={"description": "State of the endorser setup", "example": "completed"},
+    )
+    submitted_at = fields.Float(
+        metadata={"description": "Time the setup was scheduled, in epoch seconds"}
+    )
+    started_at = fields.Float(
+        metadata={"description": "Time the setup started, in epoch seconds"}
+    )
+    finished_at = fields.Float(
+        metadata={"description": "Time the setup finished, in epoch seconds"}
+    )
+    error = fields.Str(metadata={"description": "Reason the setup failed, if any"})
+
+
+class ProfileCacheStatsSchema(OpenAPISchema):
+    """Result schema for the profile cache statistics."""
+
+    capacity = fields.Int(metadata={"description": "Capacity of the cache"})
+    size = fields.Int(metadata={"description": "Number of cached profiles"})
+    groups = fields.List(
+        fields.Nested(GroupProfileCacheStatsSchema()),
+        metadata={"description": "Cache counters per group"},
+    )
 
 
 def format_wallet_record(wallet_record: WalletRecord):
@@ -98,15 +466,28 @@ def format_wallet_record(wallet_record: WalletRecord):
 @docs(tags=["multitenancy"], summary="Query subwallets")
 @querystring_schema(WalletListQueryStringWithGroupIdSchema())
 @response_schema(WalletListWithGroupIdSchema(), 200, description="")
+@profiled
+@instrumented
+@traced
 async def wallets_list(request: web.BaseRequest):
     """Request handler for listing all internal subwallets.
 
+    Responds with `304 Not Modified` when the `If-None-Match` header matches
+    the entity tag of the requested page. When the query deadline passes,
+    responds with `504 Gateway Timeout`, or with `allow_partial=true`, with
+    the wallets read so far and the offset to continue from.
+
+    With `snapshot_id`, pages are cut from the wallets captured by the
+    snapshot, and read whole. Wallets removed since are left out of their
+    page, and an expired snapshot responds with `410 Gone`.
+
     Args:
         request: aiohttp request object
     """
 
     context: AdminRequestContext = request["context"]
     profile = context.profile
+    config = get_config(profile)
 
     query = {}
     wallet_name = request.query.get("wallet_name")
@@ -117,30 +498,139 @@ async def wallets_list(request: web.BaseRequest):
         query["group_id"] = group_id
 
     limit, offset, order_by, descending = get_paginated_query_params(request)
-
-    try:
+    allow_partial = request.query.get("allow_partial", "false").lower() == "true"
+
+    search_text = request.query.get("q")
+    search_index = profile.inject_or(GroupSearchIndex)
+    if search_text and not group_id:
+        raise web.HTTPBadRequest(reason="Searching with q requires a group_id")
+    if search_text and not search_index:
+        raise web.HTTPBadRequest(reason="Wallet search is not available")
+
+    snapshot_id = request.query.get("snapshot_id")
+    snapshots = profile.inject_or(GroupSnapshots)
+    if snapshot_id and not snapshots:
+        raise web.HTTPBadRequest(reason="Snapshot listings are not available")
+    if snapshot_id and (search_text or wallet_name):
+        raise web.HTTPBadRequest(reason="Snapshot listings cannot be filtered")
+    snapshot = None
+
+    # Served by the shards once they hold every wallet
+    shard_router = None
+    if config.shards:
+        from .sharding import ShardRouter
+
+        shard_router = profile.inject_or(ShardRouter)
+    sharded = bool(shard_router and shard_router.ready)
+
+    async def fetch(page_limit: int, page_offset: int) -> list:
+        nonlocal snapshot
+        if snapshot_id:
+            snapshot, records = await snapshots.page(
+                profile, snapshot_id, page_limit, page_offset
+            )
+            return records
+        if search_text:
+            return await search_index.query(
+                profile,
+                group_id,
+                search_text,
+                page_limit,
+                page_offset,
+                wallet_name or None,
+            )
+        if sharded:
+            return await shard_router.query(
+                query, page_limit, page_offset, order_by, descending
+            )
         async with profile.session() as session:
-            records = await WalletRecord.query(
+            return await WalletRecord.query(
                 session,
                 tag_filter=query,
-                limit=limit,
-                offset=offset,
+                limit=page_limit,
+                offset=page_offset,
                 order_by=order_by,
                 descending=descending,
             )
-        results = [format_wallet_record(record) for record in records]
+
+    partial = False
+    try:
+        with METRICS.storage("wallets_list"), start_span(
+            profile,
+            "wallet_records.query",
+            group_id=group_id,
+            limit=limit,
+            sharded=sharded,
+        ) as span:
+            # Pages of a snapshot may be short, so are not continued by length
+            if allow_partial and config.query_timeout and not snapshot_id:
+                records, partial = await query_until_deadline(
+                    fetch,
+                    limit,
+                    offset,
+                    config.query_timeout,
+                    config.group_page_size,
+                )
+            else:
+                records = await run_query(fetch(limit, offset), config.query_timeout)
+            span.set_attribute("record_count", len(records))
+            span.set_attribute("partial", partial)
+        METRICS.result_size.observe("wallets_list", value=len(records))
+
+        if snapshot and group_id and snapshot.group_id != group_id:
+            raise web.HTTPBadRequest(
+                reason=f"Snapshot {snapshot_id} is not of group {group_id}"
+            )
+
+        # A partial page is not the requested page, so it gets no entity tag
+        etag = None if partial else wallet_records_etag(records)
+        if etag and etag_matches(request, etag):
+            raise not_modified(etag)
+
+        with METRICS.serialization("wallets_list"):
+            results = [format_wallet_record(record) for record in records]
+    except QueryTimeoutError as err:
+        raise web.HTTPGatewayTimeout(reason=err.roll_up) from err
+    except SnapshotNotFoundError as err:
+        raise web.HTTPGone(reason=err.roll_up) from err
     except (StorageError, BaseModelError) as err:
         raise web.HTTPBadRequest(reason=err.roll_up) from err
 
-    return web.json_response({"results": results})
+    if partial:
+        response = web.json_response(
+            {
+                "results": results,
+                "partial": True,
+                "next_offset": offset + len(records),
+            }
+        )
+    elif snapshot:
+        response = web.json_response(
+            {
+                "results": results,
+                "snapshot_id": snapshot_id,
+                "count": snapshot.count,
+            }
+        )
+        response.headers["ETag"] = etag
+    else:
+        response = web.json_response({"results": results})
+        response.headers["ETag"] = etag
+    return await compress_response(request, response)
 
 
 @docs(tags=["multitenancy"], summary="Get a single subwallet")
 @match_info_schema(WalletIdMatchInfoSchema())
 @response_schema(WalletRecordWithGroupIdSchema(), 200, description="")
+@profiled
+@instrumented
+@traced
 async def wallet_get(request: web.BaseRequest):
     """Request handler for getting a single subwallet.
 
+    Responds with `304 Not Modified` when the `If-None-Match` header matches
+    the current entity tag of the wallet record.
+
     Args:
         request: aiohttp request object
 
@@ -153,32 +643,72 @@ async def wallet_get(request: web.BaseRequest):
     profile = context.profile
     wallet_id = request.match_info["wallet_id"]
 
-    try:
+    async def retrieve() -> WalletRecord:
         async with profile.session() as session:
-            wallet_record = await WalletRecord.retrieve_by_id(session, wallet_id)
-        result = format_wallet_record(wallet_record)
+            return await WalletRecord.retrieve_by_id(session, wallet_id)
+
+    try:
+        with METRICS.storage("wallet_get"), start_span(
+            profile, "wallet_record.retrieve", wallet_id=wallet_id
+        ) as span:
+            wallet_record = await run_query(
+                retrieve(), get_config(profile).query_timeout
+            )
+            span.set_attribute("group_id", wallet_record.group_id)
+
+        etag = wallet_record_etag(wallet_record)
+        if etag_matches(request, etag):
+            raise not_modified(etag)
+
+        with METRICS.serialization("wallet_get"):
+            result = format_wallet_record(wallet_record)
     except StorageNotFoundError as err:
         raise web.HTTPNotFound(reason=err.roll_up) from err
+    except QueryTimeoutError as err:
+        raise web.HTTPGatewayTimeout(reason=err.roll_up) from err
     except BaseModelError as err:
         raise web.HTTPBadRequest(reason=err.roll_up) from err
 
-    return web.json_response(result)
+    response = web.json_response(result)
+    response.headers["ETag"] = etag
+    return response
 
 
-@docs(tags=["multitenancy"], summary="Create a subwallet")
-@request_schema(CreateWalletRequestWithGroupIdSchema)
-@response_schema(CreateWalletResponseWithGroupIdSchema(), 200, description="")
-async def wallet_create(request: web.BaseRequest):
-    """Request handler for adding a new subwallet for handling by the agent.
+async def setup_wallet_endorser(
+    context: AdminRequestContext,
+    multitenant_mgr: BaseMultitenantManager,
+    wallet_record: WalletRecord,
+    settings: dict,
+):
+    """Open the profile of a new wallet and attempt the endorser setup."""
+
+    wallet_id = wallet_record.wallet_id
+    profile = context.profile
+
+    with start_span(profile, "multitenant.get_wallet_profile", wallet_id=wallet_id):
+        wallet_profile = await multitenant_mgr.get_wallet_profile(
+            context, wallet_record, extra_settings=settings
+        )
+
+    with start_span(profile, "endorser_setup", wallet_id=wallet_id):
+        await attempt_auto_author_with_endorser_setup(wallet_profile)
+
+
+async def create_subwallet(context: AdminRequestContext, body: dict) -> dict:
+    """Create a subwallet from a wallet create request body.
 
     Args:
-        request: aiohttp request object
+        context: the admin request context
+        body: the validated request body
+
+    Returns:
+        The wallet create response
+
     """
 
-    context: AdminRequestContext = request["context"]
-    body = await request.json()
+    profile = context.profile
 
-    base_wallet_type = context.profile.settings.get("wallet.type")
+    base_wallet_type = profile.settings.get("wallet.type")
     sub_wallet_type = body.get("wallet_type", base_wallet_type)
 
     key_management_mode = body.get("key_management_mode") or WalletRecord.MODE_MANAGED
@@ -215,40 +745,130 @@ async def wallet_create(request: web.BaseRequest):
         settings["wallet.group_id"] = group_id  # add group_id to wallet settings
 
     try:
-        multitenant_mgr = context.profile.inject(BaseMultitenantManager)
+        multitenant_mgr = profile.inject(BaseMultitenantManager)
+
+        # Rejects over quota requests before anything is provisioned. The slot
+        # covers only persisting the wallet with its group tag: once that is
+        # done the wallet counts against the group, even if a later step fails
+        async with group_slot(profile, group_id):
+            with start_span(profile, "multitenant.create_wallet", group_id=group_id):
+                wallet_record = await multitenant_mgr.create_wallet(
+                    settings, key_management_mode
+                )
+            wallet_id = wallet_record.wallet_id
+
+            # Set the custom group_id
+            if group_id:
+                wallet_record.group_id = group_id
+
+                # Save the record with the custom group_id
+                with METRICS.storage("wallet_create"), start_span(
+                    profile,
+                    "wallet_record.save",
+                    group_id=group_id,
+                    wallet_id=wallet_id,
+                ):
+                    async with profile.session() as session:
+                        await wallet_record.save(session)
+
+        with start_span(profile, "multitenant.create_auth_token", wallet_id=wallet_id):
+            token = await multitenant_mgr.create_auth_token(wallet_record, wallet_key)
+
+        from .endorser_setup import EndorserSetupQueue
+
+        endorser_setup = profile.inject_or(EndorserSetupQueue)
+        if endorser_setup:
+            # The wallet and token are usable before the setup completes
+            setup_status = endorser_setup.submit(
+                wallet_id,
+                functools.partial(
+                    setup_wallet_endorser,
+                    context,
+                    multitenant_mgr,
+                    wallet_record,
+                    settings,
+                ),
+            )
+        else:
+            await setup_wallet_endorser(
+                context, multitenant_mgr, wallet_record, settings
+            )
+    except GroupQuotaExceededError as err:
+        raise web.HTTPForbidden(reason=err.roll_up) from err
+    except BaseError as err:
+        raise web.HTTPBadRequest(reason=err.roll_up) from err
 
-        wallet_record = await multitenant_mgr.create_wallet(
-            settings, key_management_mode
-        )
+    await notify_wallet_event(profile, WALLET_CREATED, wallet_id, group_id)
 
-        # Set the custom group_id
-        if group_id:
-            wallet_record.group_id = group_id
+    result = {
+        **format_wallet_record(wallet_record),
+        "token": token,
+    }
+    if endorser_setup:
+        result["endorser_setup"] = setup_status.state
+    return result
+
+
+@validated_body
+@docs(
+    tags=["multitenancy"],
+    summary="Create a subwallet",
+    description=(
+        "Send an `Idempotency-Key` header to safely retry: a request repeating "
+        "the key and body of an earlier one gets the original response back, "
+        "marked with `Idempotent-Replayed: true`, without creating another wallet."
+    ),
+)
+@request_schema(CreateWalletRequestWithGroupIdSchema)
+@response_schema(CreateWalletResponseWithGroupIdSchema(), 200, description="")
+@profiled
+@instrumented
+@traced
+async def wallet_create(request: web.BaseRequest):
+    """Request handler for adding a new subwallet for handling by the agent.
 
-            # Save the record with the custom group_id
-            async with context.profile.session() as session:
-                await wallet_record.save(session)
+    Args:
+        request: aiohttp request object
+    """
 
-        token = await multitenant_mgr.create_auth_token(wallet_record, wallet_key)
+    context: AdminRequestContext = request["context"]
+    profile = context.profile
+    body = await request_body(request)
 
-        wallet_profile = await multitenant_mgr.get_wallet_profile(
-            context, wallet_record, extra_settings=settings
+    idempotency_key = request.headers.get(IDEMPOTENCY_KEY_HEADER)
+    idempotency = profile.inject_or(IdempotencyStore) if idempotency_key else None
+    if not idempotency:
+        return web.json_response(await create_subwallet(context, body))
+
+    try:
+        result, replayed = await idempotency.run(
+            profile,
+            "wallet_create",
+            idempotency_key,
+            body,
+            functools.partial(create_subwallet, context, body),
         )
-        await attempt_auto_author_with_endorser_setup(wallet_profile)
-    except BaseError as err:
+    except IdempotencyKeyMismatchError as err:
+        raise web.HTTPUnprocessableEntity(reason=err.roll_up) from err
+    except IdempotencyKeyInProgressError as err:
+        raise web.HTTPConflict(reason=err.roll_up) from err
+    except StorageError as err:
         raise web.HTTPBadRequest(reason=err.roll_up) from err
 
-    result = {
-        **format_wallet_record(wallet_record),
-        "token": token,
-    }
-    return web.json_response(result)
+    response = web.json_response(result)
+    if replayed:
+        response.headers[IDEMPOTENT_REPLAYED_HEADER] = "true"
+    return response
 
 
+@validated_body
 @docs(tags=["multitenancy"], summary="Update a subwallet")
 @match_info_schema(WalletIdMatchInfoSchema())
 @request_schema(UpdateWalletRequestWithGroupIdSchema)
 @response_schema(WalletRecordWithGroupIdSchema(), 200, description="")
+@profiled
+@instrumented
+@traced
 async def wallet_update(request: web.BaseRequest):
     """Request handler for updating a existing subwallet for handling by the agent.
 
@@ -257,9 +877,10 @@ async def wallet_update(request: web.BaseRequest):
     """
 
     context: AdminRequestContext = request["context"]
+    profile = context.profile
     wallet_id = request.match_info["wallet_id"]
 
-    body = await request.json()
+    body = await request_body(request)
     wallet_webhook_urls = body.get("wallet_webhook_urls")
     wallet_dispatch_type = body.get("wallet_dispatch_type")
     label = body.get("label")
@@ -304,28 +925,514 @@ async def wallet_update(request: web.BaseRequest):
     settings.update(extra_subwallet_setting)
 
     try:
-        multitenant_mgr = context.profile.inject(BaseMultitenantManager)
-        wallet_record = await multitenant_mgr.update_wallet(wallet_id, settings)
-
-        if group_id is not None:
-            wallet_record.group_id = group_id
-
-            # Save the record with the new custom group_id
-            async with context.profile.session() as session:
-                await wallet_record.save(session)
+        async with group_move_slot(profile, wallet_id, group_id):
+            multitenant_mgr = profile.inject(BaseMultitenantManager)
+            with start_span(profile, "multitenant.update_wallet", wallet_id=wallet_id):
+                wallet_record = await multitenant_mgr.update_wallet(wallet_id, settings)
+            previous_group_id = wallet_record.group_id
+
+            if group_id is not None:
+                wallet_record.group_id = group_id
+
+                # Save the record with the new custom group_id
+                with METRICS.storage("wallet_update"), start_span(
+                    profile,
+                    "wallet_record.save",
+                    group_id=group_id,
+                    previous_group_id=previous_group_id,
+                    wallet_id=wallet_id,
+                ):
+                    async with profile.session() as session:
+                        await wallet_record.save(session)
 
         result = format_wallet_record(wallet_record)
     except StorageNotFoundError as err:
         raise web.HTTPNotFound(reason=err.roll_up) from err
     except WalletSettingsError as err:
         raise web.HTTPBadRequest(reason=err.roll_up) from err
+    except GroupQuotaExceededError as err:
+        raise web.HTTPForbidden(reason=err.roll_up) from err
+
+    await notify_wallet_event(
+        profile,
+        WALLET_UPDATED,
+        wallet_id,
+        wallet_record.group_id,
+        previous_group_id,
+    )
 
     return web.json_response(result)
 
 
+@docs(tags=["multitenancy"], summary="Remove a subwallet")
+@match_info_schema(WalletIdMatchInfoSchema())
+@request_schema(RemoveWalletRequestSchema)
+@response_schema(MultitenantModuleResponseSchema(), 200, description="")
+@profiled
+@instrumented
+@traced
+async def wallet_remove(request: web.BaseRequest):
+    """Request handler to remove a subwallet from agent and storage.
+
+    Args:
+        request: aiohttp request object.
+
+    """
+
+    context: AdminRequestContext = request["context"]
+    wallet_id = request.match_info["wallet_id"]
+    wallet_key = None
+
+    if request.has_body:
+        body = await request.json()
+        wallet_key = body.get("wallet_key")
+
+    multitenant_mgr = context.profile.inject(BaseMultitenantManager)
+    try:
+        with METRICS.storage("wallet_remove"):
+            async with context.profile.session() as session:
+                wallet_record = await WalletRecord.retrieve_by_id(session, wallet_id)
+
+        if not wallet_record.requires_external_key and wallet_key:
+            raise web.HTTPBadRequest(
+                reason=f"Wallet {wallet_id} doesn't require the wallet key to be provided"
+            )
+
+        await multitenant_mgr.remove_wallet(wallet_id, wallet_key)
+    except StorageNotFoundError as err:
+        raise web.HTTPNotFound(reason=err.roll_up) from err
+    except WalletKeyMissingError as err:
+        raise web.HTTPUnauthorized(reason=err.roll_up) from err
+
+    await release_group_slot(context.profile, wallet_record.group_id)
+    await notify_wallet_event(
+        context.profile, WALLET_REMOVED, wallet_id, wallet_record.group_id
+    )
+
+    return web.json_response({})
+
+
+@docs(
+    tags=["multitenancy"],
+    summary="Get the status of a deferred subwallet endorser setup",
+)
+@match_info_schema(WalletIdMatchInfoSchema())
+@response_schema(EndorserSetupStatusSchema(), 200, description="")
+@instrumented
+async def wallet_endorser_setup_status(request: web.BaseRequest):
+    """Request handler for the deferred endorser setup status of a subwallet.
+
+    Args:
+        request: aiohttp request object
+
+    Raises:
+        HTTPNotFound: if deferred endorser setup is not enabled, or no setup
+            of the wallet is known to this agent instance
+    """
+
+    context: AdminRequestContext = request["context"]
+    wallet_id = request.match_info["wallet_id"]
+    from .endorser_setup import EndorserSetupQueue
+
+    endorser_setup = context.profile.inject_or(EndorserSetupQueue)
+    if not endorser_setup:
+        raise web.HTTPNotFound(reason="Deferred endorser setup is not enabled")
+
+    status = endorser_setup.status(wallet_id)
+    if not status:
+        raise web.HTTPNotFound(reason=f"No endorser setup known for wallet {wallet_id}")
+
+    return web.json_response(status.serialize())
+
+
+@docs(
+    tags=["multitenancy"],
+    summary="Take a snapshot of the subwallets in a group",
+    description=(
+        "Captures the wallets of the group in a single storage read. Listing "
+        "with the returned `snapshot_id` pages through the captured wallets, "
+        "unaffected by wallets created or removed since, until it expires."
+    ),
+)
+@match_info_schema(GroupIdMatchInfoSchema())
+@response_schema(GroupSnapshotSchema(), 200, description="")
+@instrumented
+async def group_snapshot_create(request: web.BaseRequest):
+    """Request handler for taking a snapshot of the subwallets in a group.
+
+    Args:
+        request: aiohttp request object
+    """
+
+    context: AdminRequestContext = request["context"]
+    group_id = request.match_info["group_id"]
+    snapshots = context.profile.inject_or(GroupSnapshots)
+    if not snapshots:
+        raise web.HTTPNotFound(reason="Snapshot listings are not enabled")
+
+    try:
+        snapshot = await snapshots.create(context.profile, group_id)
+    except StorageError as err:
+        raise web.HTTPBadRequest(reason=err.roll_up) from err
+
+    return web.json_response(snapshot.serialize())
+
+
+@docs(tags=["multitenancy"], summary="Get the wallet count and quota of a group")
+@match_info_schema(GroupIdMatchInfoSchema())
+@response_schema(GroupQuotaSchema(), 200, description="")
+@instrumented
+async def group_quota_get(request: web.BaseRequest):
+    """Request handler for the wallet count and quota of a group.
+
+    Args:
+        request: aiohttp request object
+    """
+
+    context: AdminRequestContext = request["context"]
+    group_id = request.match_info["group_id"]
+    quotas = context.profile.inject_or(GroupQuotas)
+    if not quotas:
+        raise web.HTTPNotFound(reason="Group quotas are not enabled")
+
+    try:
+        count = await quotas.count(context.profile, group_id)
+    except StorageError as err:
+        raise web.HTTPBadRequest(reason=err.roll_up) from err
+
+    return web.json_response(
+        {"group_id": group_id, "count": count, "limit": quotas.limit(group_id)}
+    )
+
+
+@docs(
+    tags=["multitenancy"],
+    summary="List idle subwallets in a group",
+    description=(
+        "Returns wallets of the group whose last recorded activity is older than "
+        "`since`. Only wallets created or used since activity tracking was "
+        "enabled are known."
+    ),
+)
+@match_info_schema(GroupIdMatchInfoSchema())
+@querystring_schema(GroupIdleQueryStringSchema())
+@response_schema(GroupIdleResultSchema(), 200, description="")
+@instrumented
+async def group_idle_wallets(request: web.BaseRequest):
+    """Request handler for listing the idle wallets of a group.
+
+    Args:
+        request: aiohttp request object
+    """
+
+    context: AdminRequestContext = request["context"]
+    group_id = request.match_info["group_id"]
+    tracker = context.profile.inject_or(ActivityTracker)
+    if not tracker:
+        raise web.HTTPNotFound(reason="Activity tracking is not enabled")
+
+    try:
+        since = int(request.query["since"])
+        limit = int(request.query.get("limit") or 100)
+        offset = int(request.query.get("offset") or 0)
+    except (KeyError, ValueError) as err:
+        raise web.HTTPBadRequest(reason="Invalid since, limit or offset") from err
+
+    try:
+        with METRICS.storage("group_idle_wallets"):
+            results = await tracker.idle_wallets(
+                context.profile, group_id, since, limit, offset
+            )
+    except StorageError as err:
+        raise web.HTTPBadRequest(reason=err.roll_up) from err
+
+    return web.json_response({"results": results})
+
+
+async def write_json_line(response: web.StreamResponse, data: dict):
+    """Write a single newline-delimited JSON object to a streamed response."""
+
+    await response.write(json.dumps(data).encode() + b"\n")
+
+
+@docs(
+    tags=["multitenancy"],
+    summary="Create auth tokens for all subwallets in a group",
+    description=(
+        "Tokens are streamed back as newline-delimited JSON, one object per "
+        "wallet. Unmanaged wallets are reported with an error, as their wallet "
+        "key is required to issue a token."
+    ),
+)
+@match_info_schema(GroupIdMatchInfoSchema())
+@response_schema(GroupTokenResultSchema(), 200, description="")
+@instrumented
+async def group_tokens_create(request: web.BaseRequest):
+    """Request handler for creating auth tokens for every wallet in a group.
+
+    Args:
+        request: aiohttp request object
+    """
+
+    context: AdminRequestContext = request["context"]
+    profile = context.profile
+    group_id = request.match_info["group_id"]
+    config = get_config(profile)
+
+    multitenant_mgr = profile.inject(BaseMultitenantManager)
+    semaphore = asyncio.Semaphore(config.token_batch_concurrency)
+
+    async def create_token(wallet_record: WalletRecord) -> dict:
+        result = {"wallet_id": wallet_record.wallet_id}
+        if wallet_record.requires_external_key:
+            result["error"] = "Wallet key required to create token for unmanaged wallet"
+            return result
+
+        async with semaphore:
+            try:
+                result["token"] = await multitenant_mgr.create_auth_token(
+                    wallet_record
+                )
+            except BaseError as err:
+                result["error"] = err.roll_up
+        return result
+
+    response = stream_response(
+        request, headers={"Content-Type": "application/x-ndjson"}
+    )
+    await response.prepare(request)
+
+    try:
+        async for records in iter_wallet_records(
+            profile,
+            {"group_id": group_id},
+            config.group_page_size,
+            config.query_timeout,
+        ):
+            for result in asyncio.as_completed(
+                [create_token(record) for record in records]
+            ):
+                await write_json_line(response, await result)
+    except (QueryTimeoutError, StorageError, BaseModelError) as err:
+        # The status line has already been sent, so report the failure in-band
+        await write_json_line(response, {"error": err.roll_up})
+
+    await response.write_eof()
+    return response
+
+
+@docs(
+    tags=["multitenancy"],
+    summary="Move subwallets to a group",
+    description=(
+        "Moves the listed subwallets, or every subwallet of `source_group_id`, "
+        "in chunks of one transaction each. Progress is streamed back as "
+        "newline-delimited JSON, one object per chunk. A chunk that does not "
+        "fit in the group quota stops the move; earlier chunks stay moved."
+    ),
+)
+@match_info_schema(GroupIdMatchInfoSchema())
+@request_schema(GroupMoveRequestSchema())
+@response_schema(GroupMoveProgressSchema(), 200, description="")
+@instrumented
+async def group_move(request: web.BaseRequest):
+    """Request handler for moving subwallets to a group.
+
+    Args:
+        request: aiohttp request object
+    """
+
+    context: AdminRequestContext = request["context"]
+    profile = context.profile
+    group_id = request.match_info["group_id"]
+    config = get_config(profile)
+
+    body = await request.json()
+    wallet_ids = body.get("wallet_ids")
+    source_group_id = body.get("source_group_id")
+    if (wallet_ids is None) == (source_group_id is None):
+        raise web.HTTPBadRequest(
+            reason="Exactly one of wallet_ids or source_group_id is required"
+        )
+    if source_group_id == group_id:
+        raise web.HTTPBadRequest(reason="Source and target group are the same")
+
+    response = stream_response(
+        request, headers={"Content-Type": "application/x-ndjson"}
+    )
+    await response.prepare(request)
+
+    try:
+        async for progress in move_wallets(
+            profile,
+            group_id,
+            wallet_ids=wallet_ids,
+            source_group_id=source_group_id,
+            chunk_size=config.group_move_chunk_size,
+            timeout=config.query_timeout,
+        ):
+            await write_json_line(response, progress.serialize())
+    except (
+        GroupQuotaExceededError,
+        QueryTimeoutError,
+        StorageError,
+        BaseModelError,
+    ) as err:
+        # The status line has already been sent, so report the failure in-band
+        await write_json_line(response, {"error": err.roll_up})
+
+    await response.write_eof()
+    return response
+
+
+def format_server_sent_event(event) -> bytes:
+    """Encode a group event as a Server-Sent Event."""
+
+    return (
+        f"id: {event.sequence}\n"
+        f"event: {event.state}\n"
+        f"data: {json.dumps(event.serialize())}\n\n"
+    ).encode()
+
+
+@docs(
+    tags=["multitenancy"],
+    summary="Follow wallet changes in a group",
+    description=(
+        "Long-polls for wallet created, updated and removed events in the group. "
+        "With `Accept: text/event-stream`, events are pushed as Server-Sent Events "
+        "instead, resuming after `Last-Event-ID` when given."
+    ),
+)
+@match_info_schema(GroupIdMatchInfoSchema())
+@querystring_schema(GroupEventsQueryStringSchema())
+@response_schema(GroupEventsResultSchema(), 200, description="")
+@instrumented
+async def group_events(request: web.BaseRequest):
+    """Request handler for following the change feed of a group.
+
+    Args:
+        request: aiohttp request object
+    """
+
+    context: AdminRequestContext = request["context"]
+    group_id = request.match_info["group_id"]
+    change_feed = context.profile.inject_or(GroupChangeFeed)
+    if not change_feed:
+        raise web.HTTPServiceUnavailable(reason="Group change feed is not enabled")
+
+    try:
+        after = int(
+            request.headers.get("Last-Event-ID") or request.query.get("after") or 0
+        )
+        timeout = int(request.query.get("timeout") or 30)
+    except ValueError as err:
+        raise web.HTTPBadRequest(reason="Invalid event cursor or timeout") from err
+
+    if "text/event-stream" in request.headers.get("Accept", ""):
+        return await _stream_group_events(request, change_feed, group_id, after)
+
+    truncated = change_feed.is_truncated(group_id, after)
+    events = await change_feed.wait_for_events(group_id, after, timeout)
+
+    return web.json_response(
+        {
+            "events": [event.serialize() for event in events],
+            "cursor": events[-1].sequence if events else max(after, change_feed.sequence),
+            "truncated": truncated,
+        }
+    )
+
+
+async def _stream_group_events(
+    request: web.BaseRequest,
+    change_feed: GroupChangeFeed,
+    group_id: str,
+    after: int,
+) -> web.StreamResponse:
+    """Push the change feed of a group as Server-Sent Events until disconnected."""
+
+    heartbeat = get_config(request["context"].profile).change_feed_heartbeat
+
+    response = web.StreamResponse(
+        headers={"Content-Type": "text/event-stream", "Cache-Control": "no-cache"}
+    )
+    await response.prepare(request)
+
+    try:
+        if change_feed.is_truncated(group_id, after):
+            await response.write(b"event: truncated\ndata: {}\n\n")
+
+        while True:
+            events = await change_feed.wait_for_events(group_id, after, heartbeat)
+            if not events:
+                await response.write(b": keep-alive\n\n")
+                continue
+
+            for event in events:
+                await response.write(format_server_sent_event(event))
+            after = events[-1].sequence
+    except ConnectionResetError:
+        pass
+
+    return response
+
+
+@docs(tags=["multitenancy"], summary="Get profile cache statistics per group")
+@response_schema(ProfileCacheStatsSchema(), 200, description="")
+@instrumented
+async def profile_cache_stats(request: web.BaseRequest):
+    """Request handler for the group aware profile cache statistics.
+
+    Args:
+        request: aiohttp request object
+    """
+
+    context: AdminRequestContext = request["context"]
+    cache = context.profile.inject_or(GroupAwareProfileCache)
+    if not cache:
+        raise web.HTTPNotFound(reason="Group aware profile cache is not enabled")
+
+    return web.json_response(cache.stats())
+
+
+@docs(
+    tags=["multitenancy"],
+    summary="Get plugin metrics in Prometheus text format",
+    produces=["text/plain"],
+)
+async def metrics_get(request: web.BaseRequest):
+    """Request handler for the Prometheus metrics of the plugin routes.
+
+    Wallet counts per group are only reported when `metrics_group_counts` is
+    enabled, as counting reads every wallet record.
+
+    Args:
+        request: aiohttp request object
+    """
+
+    context: AdminRequestContext = request["context"]
+    config = get_config(context.profile)
+
+    if config.metrics_group_counts:
+        try:
+            await METRICS.refresh_group_wallets(
+                context.profile, config.metrics_group_counts_ttl
+            )
+        except StorageError as err:
+            raise web.HTTPInternalServerError(reason=err.roll_up) from err
+
+    return web.Response(
+        body=METRICS.render().encode(), headers={"Content-Type": CONTENT_TYPE}
+    )
+
+
 async def register(app: web.Application):
     """Register routes."""
 
+    # Records tenant activity when activity tracking is enabled
+    app.middlewares.append(activity_middleware)
+
     app.add_routes(
         [
             web.get("/multitenancy/wallets", wallets_list, allow_head=False),
@@ -334,6 +1441,31 @@ async def register(app: web.Application):
             web.put("/multitenancy/wallet/{wallet_id}", wallet_update),
             web.post("/multitenancy/wallet/{wallet_id}/token", wallet_create_token),
             web.post("/multitenancy/wallet/{wallet_id}/remove", wallet_remove),
+            web.get(
+                "/multitenancy/wallet/{wallet_id}/endorser-setup",
+                wallet_endorser_setup_status,
+                allow_head=False,
+            ),
+            web.post("/multitenancy/groups/{group_id}/tokens", group_tokens_create),
+            web.post("/multitenancy/groups/{group_id}/move", group_move),
+            web.post("/multitenancy/groups/{group_id}/snapshot", group_snapshot_create),
+            web.get(
+                "/multitenancy/groups/{group_id}/events", group_events, allow_head=False
+            ),
+            web.get(
+                "/multitenancy/groups/{group_id}/idle",
+                group_idle_wallets,
+                allow_head=False,
+            ),
+            web.get(
+                "/multitenancy/groups/{group_id}/quota",
+                group_quota_get,
+                allow_head=False,
+            ),
+            web.get(
+                "/multitenancy/profile-cache", profile_cache_stats, allow_head=False
+            ),
+            web.get("/metrics", metrics_get, allow_head=False),
         ]
     )
 
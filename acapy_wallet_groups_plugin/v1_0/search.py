@@ -0,0 +1,254 @@
+"""In-memory search of wallets by label or wallet name, per wallet group.
+
+Storage only matches tags exactly, so finding tenants by part of their label
+means reading the whole group. The search index keeps the wallet name and
+label of every wallet of a group, with a trigram index over them, and answers
+case-insensitive substring searches from memory.
+
+A group is indexed from storage on its first search, and kept current by the
+wallet events of the plugin routes, which includes events relayed from other
+agent instances. The least recently searched groups are dropped beyond
+`max_groups`, and indexed again when searched.
+"""
+
+import asyncio
+from collections import OrderedDict, defaultdict
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set
+
+from acapy_agent.core.event_bus import Event
+from acapy_agent.core.profile import Profile
+from acapy_agent.storage.error import StorageNotFoundError
+from acapy_agent.wallet.models.wallet_record import WalletRecord
+
+from .events import WALLET_EVENT_TOPIC_PREFIX, WALLET_REMOVED
+from .query import iter_wallet_records
+
+NGRAM_SIZE = 3
+
+
+def _ngrams(text: str) -> Set[str]:
+    return {text[i : i + NGRAM_SIZE] for i in range(len(text) - NGRAM_SIZE + 1)}
+
+
+class SearchEntry(NamedTuple):
+    """Searchable fields of a wallet."""
+
+    wallet_name: str
+    label: str
+
+    @classmethod
+    def from_record(cls, wallet_record: WalletRecord) -> "SearchEntry":
+        """Return the entry of a wallet record."""
+        settings = wallet_record.settings
+        return cls(
+            settings.get("wallet.name") or "", settings.get("default_label") or ""
+        )
+
+    @property
+    def text(self) -> str:
+        """Lower case text matched by searches."""
+        return f"{self.wallet_name}\n{self.label}".lower()
+
+
+class GroupIndex:
+    """Search entries of the wallets of one group, with their trigrams."""
+
+    def __init__(self):
+        """Initialize an empty index."""
+        self.entries: Dict[str, SearchEntry] = {}
+        self.ngrams: Dict[str, Set[str]] = defaultdict(set)
+
+    def put(self, wallet_id: str, entry: SearchEntry):
+        """Add or replace the entry of a wallet."""
+
+        self.discard(wallet_id)
+        self.entries[wallet_id] = entry
+        for ngram in _ngrams(entry.text):
+            self.ngrams[ngram].add(wallet_id)
+
+    def discard(self, wallet_id: str):
+        """Remove the entry of a wallet, if indexed."""
+
+        entry = self.entries.pop(wallet_id, None)
+        if not entry:
+            return
+        for ngram in _ngrams(entry.text):
+            wallet_ids = self.ngrams[ngram]
+            wallet_ids.discard(wallet_id)
+            if not wallet_ids:
+                del self.ngrams[ngram]
+
+    def search(self, text: str) -> List[str]:
+        """Return the wallets whose name or label contains the text.
+
+        Returns:
+            The matching wallet ids, ordered by wallet name
+
+        """
+
+        text = text.lower()
+        ngrams = _ngrams(text)
+        if ngrams:
+            postings = sorted(
+                (self.ngrams.get(ngram, set()) for ngram in ngrams), key=len
+            )
+            candidates: Iterable[str] = set.intersection(*postings)
+        else:
+            candidates = self.entries
+
+        matches = [
+            wallet_id
+            for wallet_id in candidates
+            if text in self.entries[wallet_id].text
+        ]
+        return sorted(
+            matches,
+            key=lambda wallet_id: (self.entries[wallet_id].wallet_name, wallet_id),
+        )
+
+
+class GroupSearchIndex:
+    """Lazily built search indexes of the most recently searched groups."""
+
+    def __init__(self, max_groups: int = 100, page_size: int = 100):
+        """Initialize the index.
+
+        Args:
+            max_groups: number of group indexes kept in memory
+            page_size: number of wallet records read per page when indexing
+        """
+        self.max_groups = max_groups
+        self.page_size = page_size
+        self.groups: "OrderedDict[str, GroupIndex]" = OrderedDict()
+        self._building: Dict[str, asyncio.Task] = {}
+        # Wallets changed in groups being indexed, refreshed once read
+        self._changed: Dict[str, Set[str]] = {}
+
+    async def search(
+        self,
+        profile: Profile,
+        group_id: str,
+        text: str,
+        wallet_name: Optional[str] = None,
+    ) -> List[str]:
+        """Return the wallets of a group whose name or label contains the text.
+
+        Args:
+            profile: the base profile
+            group_id: the group to search
+            text: the text to find, case insensitive
+            wallet_name: only match the wallet with this exact name
+
+        Returns:
+            The matching wallet ids, ordered by wallet name
+
+        """
+
+        index = await self._group_index(profile, group_id)
+        wallet_ids = index.search(text)
+        if wallet_name is not None:
+            wallet_ids = [
+                wallet_id
+                for wallet_id in wallet_ids
+                if index.entries[wallet_id].wallet_name == wallet_name
+            ]
+        return wallet_ids
+
+    async def query(
+        self,
+        profile: Profile,
+        group_id: str,
+        text: str,
+        limit: int,
+        offset: int,
+        wallet_name: Optional[str] = None,
+    ) -> List[WalletRecord]:
+        """Return a page of the wallet records matching a search."""
+
+        wallet_ids = await self.search(profile, group_id, text, wallet_name)
+        records = []
+        async with profile.session() as session:
+            for wallet_id in wallet_ids[offset : offset + limit]:
+                try:
+                    records.append(
+                        await WalletRecord.retrieve_by_id(session, wallet_id)
+                    )
+                except StorageNotFoundError:
+                    # Removed since the search, its event will follow
+                    pass
+        return records
+
+    async def _group_index(self, profile: Profile, group_id: str) -> GroupIndex:
+        index = self.groups.get(group_id)
+        if index:
+            self.groups.move_to_end(group_id)
+            return index
+
+        task = self._building.get(group_id)
+        if not task:
+            task = asyncio.ensure_future(self._build(profile, group_id))
+            self._building[group_id] = task
+            task.add_done_callback(lambda _: self._building.pop(group_id, None))
+        # A cancelled search does not cancel the indexing others wait for
+        return await asyncio.shield(task)
+
+    async def _build(self, profile: Profile, group_id: str) -> GroupIndex:
+        """Index the wallets of a group from storage."""
+
+        index = GroupIndex()
+        changed = self._changed[group_id] = set()
+        try:
+            async for records in iter_wallet_records(
+                profile, {"group_id": group_id}, self.page_size
+            ):
+                for wallet_record in records:
+                    index.put(
+                        wallet_record.wallet_id, SearchEntry.from_record(wallet_record)
+                    )
+            # Pages read before a change may hold the wallet's previous state
+            while changed:
+                await self._refresh(profile, index, group_id, changed.pop())
+        finally:
+            del self._changed[group_id]
+
+        self.groups[group_id] = index
+        while len(self.groups) > self.max_groups:
+            self.groups.popitem(last=False)
+        return index
+
+    async def _refresh(
+        self, profile: Profile, index: GroupIndex, group_id: str, wallet_id: str
+    ):
+        """Bring the entry of a wallet in line with its record."""
+
+        try:
+            async with profile.session() as session:
+                wallet_record = await WalletRecord.retrieve_by_id(session, wallet_id)
+        except StorageNotFoundError:
+            wallet_record = None
+
+        if wallet_record and wallet_record.group_id == group_id:
+            index.put(wallet_id, SearchEntry.from_record(wallet_record))
+        else:
+            index.discard(wallet_id)
+
+    async def on_wallet_event(self, profile: Profile, event: Event):
+        """Event bus handler keeping the indexed groups current."""
+
+        wallet_id = event.payload["wallet_id"]
+        removed = event.topic == f"{WALLET_EVENT_TOPIC_PREFIX}{WALLET_REMOVED}"
+        group_ids = {
+            event.payload.get("group_id"),
+            event.payload.get("previous_group_id"),
+        }
+
+        for group_id in group_ids:
+            if group_id in self._changed:
+                self._changed[group_id].add(wallet_id)
+            elif group_id in self.groups:
+                if removed:
+                    self.groups[group_id].discard(wallet_id)
+                else:
+                    await self._refresh(
+                        profile, self.groups[group_id], group_id, wallet_id
+                    )
@@ -0,0 +1,381 @@
+"""Serve group listings from several storage backends.
+
+With many tenants in one base wallet, every `WalletRecord.query` by group
+competes on a single store. With sharding, each group is assigned to one of
+several shard stores, explicitly or by a hash of its id, and a replica of
+its wallet records is kept there. Listings are answered by the group's shard,
+or by all shards merged when not filtered by group.
+
+The base wallet stays authoritative: ACA-Py's multitenant manager and token
+authentication read wallet records from it, so creates, reads, updates and
+removes keep going there and the replicas follow the wallet events. Wallet
+keys are not replicated. At start up the shards are filled from the base
+wallet, or verified against it when already filled with the same assignment,
+since replica writes may have been lost while the agent was down. Until then,
+listings are answered by the base wallet.
+"""
+
+import asyncio
+import hashlib
+import heapq
+import itertools
+import json
+import logging
+from typing import Dict, List, Optional, Set
+
+from acapy_agent.config.injection_context import InjectionContext
+from acapy_agent.core.error import ProfileNotFoundError
+from acapy_agent.core.event_bus import Event
+from acapy_agent.core.profile import Profile, ProfileManager
+from acapy_agent.storage.base import BaseStorage
+from acapy_agent.storage.error import (
+    StorageDuplicateError,
+    StorageError,
+    StorageNotFoundError,
+)
+from acapy_agent.storage.record import StorageRecord
+from acapy_agent.wallet.models.wallet_record import WalletRecord
+
+from .events import WALLET_EVENT_TOPIC_PREFIX, WALLET_REMOVED
+from .query import iter_wallet_records
+
+LOGGER = logging.getLogger(__name__)
+
+SHARD_STATE_RECORD_TYPE = "wallet_groups_shard_state"
+SHARD_STATE_RECORD_ID = "backfill"
+
+
+def replica_record(wallet_record: WalletRecord) -> StorageRecord:
+    """Return the storage record of a wallet replica, without its wallet key."""
+
+    stored = wallet_record.storage_record
+    value = json.loads(stored.value)
+    value.get("settings", {}).pop("wallet.key", None)
+    return StorageRecord(stored.type, json.dumps(value), stored.tags, stored.id)
+
+
+def _order_key(order_by: str):
+    # Stores order by "id" in insertion order, which only creation time
+    # approximates across stores
+    if order_by == "id":
+        return lambda record: (record.created_at or "", record.wallet_id)
+    return lambda record: (getattr(record, order_by, None) or "", record.wallet_id)
+
+
+class ShardRouter:
+    """Assigns groups to shard stores and keeps their wallet replicas."""
+
+    def __init__(
+        self,
+        shard_configs: Optional[Dict[str, dict]] = None,
+        group_shards: Optional[Dict[str, str]] = None,
+        *,
+        page_size: int = 100,
+        shared: bool = False,
+    ):
+        """Initialize the router.
+
+        Args:
+            shard_configs: wallet config of each shard store, by shard name
+            group_shards: shard name by group, other groups are hashed
+            page_size: number of wallet records copied per page when filling
+            shared: whether all agent instances use the same shard stores
+        """
+        self.shard_configs = shard_configs or {}
+        self.group_shards = group_shards or {}
+        self.page_size = page_size
+        self.shared = shared
+        self.shards: Dict[str, Profile] = {}
+        self.ready = False
+        self.task: Optional[asyncio.Task] = None
+        # Wallets removed, and replicas written by events, while the shards
+        # are filled
+        self._removed: set = set()
+        self._written: set = set()
+
+    @property
+    def layout(self) -> str:
+        """Fingerprint of the shard assignment, stored with filled shards."""
+
+        layout = json.dumps([sorted(self.shards), self.group_shards], sort_keys=True)
+        return hashlib.sha256(layout.encode()).hexdigest()
+
+    def shard_for(self, group_id: Optional[str]) -> str:
+        """Return the name of the shard holding the group's wallets."""
+
+        if group_id in self.group_shards:
+            return self.group_shards[group_id]
+        names = sorted(self.shards)
+        digest = hashlib.sha256((group_id or "").encode()).digest()
+        return names[int.from_bytes(digest[:8], "big") % len(names)]
+
+    async def open(self, context: InjectionContext):
+        """Open the shard stores, provisioning those that do not exist yet."""
+
+        profile_manager = context.inject(ProfileManager)
+        for name, config in self.shard_configs.items():
+            config = {"name": f"wallet_groups_shard_{name}", **config}
+            try:
+                self.shards[name] = await profile_manager.open(context, config)
+            except ProfileNotFoundError:
+                self.shards[name] = await profile_manager.provision(context, config)
+            LOGGER.info("Opened wallet groups shard %s", name)
+
+        unknown = set(self.group_shards.values()) - set(self.shards)
+        if unknown:
+            raise ValueError(f"Groups assigned to unknown shards: {sorted(unknown)}")
+
+    async def query(
+        self,
+        tag_filter: dict,
+        limit: int,
+        offset: int,
+        order_by: str = "id",
+        descending: bool = False,
+    ) -> List[WalletRecord]:
+        """Query the wallet replicas, across shards unless filtered by group.
+
+        Listings across shards read `offset + limit` records from each shard
+        and merge them, so deep pages cost more than on a single store.
+        """
+
+        group_id = tag_filter.get("group_id")
+        if group_id is not None:
+            name = self.shard_for(group_id)
+            return await self._query_shard(
+                name, tag_filter, limit, offset, order_by, descending
+            )
+
+        pages = await asyncio.gather(
+            *(
+                self._query_shard(
+                    name, tag_filter, offset + limit, 0, order_by, descending
+                )
+                for name in self.shards
+            )
+        )
+        merged = heapq.merge(*pages, key=_order_key(order_by), reverse=descending)
+        return list(itertools.islice(merged, offset, offset + limit))
+
+    async def _query_shard(
+        self,
+        name: str,
+        tag_filter: dict,
+        limit: int,
+        offset: int,
+        order_by: str,
+        descending: bool,
+    ) -> List[WalletRecord]:
+        async with self.shards[name].session() as session:
+            return await WalletRecord.query(
+                session,
+                tag_filter=tag_filter,
+                limit=limit,
+                offset=offset,
+                order_by=order_by,
+                descending=descending,
+            )
+
+    async def put(self, wallet_record: WalletRecord):
+        """Write the replica of a wallet to the shard of its group."""
+
+        record = replica_record(wallet_record)
+        shard = self.shards[self.shard_for(wallet_record.group_id)]
+        async with shard.session() as session:
+            storage = session.inject(BaseStorage)
+            try:
+                await storage.add_record(record)
+            except StorageDuplicateError:
+                existing = await storage.get_record(record.type, record.id)
+                # An event may have written a newer replica while filling
+                existing_updated_at = json.loads(existing.value).get("updated_at")
+                if (existing_updated_at or "") <= (wallet_record.updated_at or ""):
+                    await storage.update_record(existing, record.value, record.tags)
+
+    async def delete(self, wallet_id: str, group_id: Optional[str]):
+        """Delete the replica of a wallet from the shard of the group."""
+
+        async with self.shards[self.shard_for(group_id)].session() as session:
+            storage = session.inject(BaseStorage)
+            try:
+                record = await storage.get_record(WalletRecord.RECORD_TYPE, wallet_id)
+            except StorageNotFoundError:
+                return
+            await storage.delete_record(record)
+
+    async def on_wallet_event(self, profile: Profile, event: Event):
+        """Event bus handler keeping the replicas in line with the base wallet."""
+
+        if not self.shards:
+            return
+        # Shared shards are written by the agent instance that changed the
+        # wallet. Shards of each instance follow relayed events as well, which
+        # rewrite the replica from the base wallet, so applying one twice is
+        # harmless.
+        if self.shared and event.payload.get("origin"):
+            return
+
+        state = event.topic[len(WALLET_EVENT_TOPIC_PREFIX) :]
+        wallet_id = event.payload["wallet_id"]
+        group_id = event.payload.get("group_id")
+        previous_group_id = event.payload.get("previous_group_id")
+
+        try:
+            if state == WALLET_REMOVED:
+                self._removed.add(wallet_id)
+                await self.delete(wallet_id, group_id)
+                return
+
+            async with profile.session() as session:
+                wallet_record = await WalletRecord.retrieve_by_id(session, wallet_id)
+            await self.put(wallet_record)
+            if not self.ready:
+                self._written.add(wallet_id)
+            moved_shard = previous_group_id is not None and self.shard_for(
+                previous_group_id
+            ) != self.shard_for(group_id)
+            if moved_shard:
+                await self.delete(wallet_id, previous_group_id)
+        except StorageError:
+            LOGGER.exception("Failed to update shard replica of wallet %s", wallet_id)
+
+    async def fill(self, profile: Profile) -> int:
+        """Bring the shards in line with the wallet records of the base wallet.
+
+        Shards not filled with the current assignment are emptied and copied
+        to. Shards filled with it are verified instead: replicas missing or
+        differing from their wallet record, e.g. after writes lost to a crash
+        or made outside the plugin routes, are written again, and replicas of
+        wallets no longer in their shard's groups are deleted.
+
+        Returns:
+            The number of replicas written
+        """
+
+        layout = self.layout
+        filled = [await self._filled_layout(shard) for shard in self.shards.values()]
+        verify = all(shard_layout == layout for shard_layout in filled)
+
+        if not verify:
+            # Replicas may sit in the wrong shard after a change of assignment
+            for shard in self.shards.values():
+                async with shard.session() as session:
+                    storage = session.inject(BaseStorage)
+                    await storage.delete_all_records(WalletRecord.RECORD_TYPE)
+                    await storage.delete_all_records(SHARD_STATE_RECORD_TYPE)
+
+        self._removed.clear()
+        self._written.clear()
+        expected: Dict[str, Set[str]] = {name: set() for name in self.shards}
+        copied = 0
+        async for records in iter_wallet_records(profile, {}, self.page_size):
+            for wallet_record in records:
+                if wallet_record.wallet_id in self._removed:
+                    continue
+                name = self.shard_for(wallet_record.group_id)
+                expected[name].add(wallet_record.wallet_id)
+                if not verify or not await self._replica_matches(name, wallet_record):
+                    await self.put(wallet_record)
+                    copied += 1
+
+        if verify:
+            deleted = await self._delete_stale(expected)
+            LOGGER.info(
+                "Verified %d shards: wrote %d and deleted %d wallet replicas",
+                len(self.shards),
+                copied,
+                deleted,
+            )
+        else:
+            for shard in self.shards.values():
+                async with shard.session() as session:
+                    await session.inject(BaseStorage).add_record(
+                        StorageRecord(
+                            SHARD_STATE_RECORD_TYPE,
+                            json.dumps({"layout": layout}),
+                            {},
+                            SHARD_STATE_RECORD_ID,
+                        )
+                    )
+            LOGGER.info(
+                "Copied %d wallet records to %d shards", copied, len(self.shards)
+            )
+
+        self.ready = True
+        self._written.clear()
+        return copied
+
+    async def _replica_matches(self, name: str, wallet_record: WalletRecord) -> bool:
+        """Whether the shard holds the current replica of a wallet."""
+
+        record = replica_record(wallet_record)
+        async with self.shards[name].session() as session:
+            try:
+                replica = await session.inject(BaseStorage).get_record(
+                    record.type, record.id
+                )
+            except StorageNotFoundError:
+                return False
+        return replica.value == record.value and replica.tags == record.tags
+
+    async def _delete_stale(self, expected: Dict[str, Set[str]]) -> int:
+        """Delete replicas of wallets not expected in their shard.
+
+        Returns:
+            The number of replicas deleted
+        """
+
+        deleted = 0
+        for name, shard in self.shards.items():
+            # Collected first, deleting while paging would shift the pages
+            stale = [
+                wallet_record.wallet_id
+                async for records in iter_wallet_records(shard, {}, self.page_size)
+                for wallet_record in records
+                if wallet_record.wallet_id not in expected[name]
+                and wallet_record.wallet_id not in self._written
+            ]
+            async with shard.session() as session:
+                storage = session.inject(BaseStorage)
+                for wallet_id in stale:
+                    try:
+                        record = await storage.get_record(
+                            WalletRecord.RECORD_TYPE, wallet_id
+                        )
+                    except StorageNotFoundError:
+                        continue
+                    await storage.delete_record(record)
+                    deleted += 1
+        return deleted
+
+    async def _filled_layout(self, shard: Profile) -> Optional[str]:
+        async with shard.session() as session:
+            try:
+                record = await session.inject(BaseStorage).get_record(
+                    SHARD_STATE_RECORD_TYPE, SHARD_STATE_RECORD_ID
+                )
+            except StorageNotFoundError:
+                return None
+        return json.loads(record.value)["layout"]
+
+    async def _start(self, profile: Profile):
+        try:
+            await self.open(profile.context)
+            await self.fill(profile)
+        except Exception:
+            LOGGER.exception("Wallet groups shards unavailable, listing from base")
+
+    async def on_startup(self, profile: Profile, event: Event):
+        """Event bus handler opening and filling the shards in the background."""
+
+        if not self.task:
+            self.task = asyncio.create_task(self._start(profile))
+
+    async def on_shutdown(self, profile: Profile, event: Event):
+        """Event bus handler closing the shard stores."""
+
+        if self.task and not self.task.done():
+            self.task.cancel()
+        self.ready = False
+        for shard in self.shards.values():
+            await shard.close()
@@ -0,0 +1,227 @@
+"""Snapshots of the wallets of a group, for consistent listings.
+
+Paging through a group with `limit` and `offset` while wallets are created
+and removed shifts the pages under the client: a long export sees some
+wallets twice and misses others. A snapshot captures the ids of the group's
+wallets once, in a single storage scan, and keeps them in the base wallet, in
+chunks, with a TTL. Pages of a snapshot are cut from those ids, so they
+neither overlap nor leave gaps, on any agent instance sharing the base wallet.
+
+Only the ids are captured. The wallet records of a page are read when the
+page is requested: a wallet removed since the snapshot is left out of its
+page, and a wallet changed since is returned as it is now.
+"""
+
+import json
+import logging
+import time
+import uuid
+from typing import List, NamedTuple, Tuple
+
+from acapy_agent.core.error import BaseError
+from acapy_agent.core.profile import Profile
+from acapy_agent.storage.base import BaseStorage, BaseStorageSearch
+from acapy_agent.storage.error import StorageError, StorageNotFoundError
+from acapy_agent.storage.record import StorageRecord
+from acapy_agent.wallet.models.wallet_record import WalletRecord
+
+LOGGER = logging.getLogger(__name__)
+
+SNAPSHOT_RECORD_TYPE = "wallet_groups_snapshot"
+
+
+class SnapshotNotFoundError(BaseError):
+    """The snapshot does not exist, or expired."""
+
+
+def _expiry_tag(expires_at: float) -> str:
+    # Zero padded, so that the plaintext tag orders like the number
+    return f"{int(expires_at):012d}"
+
+
+def _chunk_id(snapshot_id: str, index: int) -> str:
+    return f"{snapshot_id}:{index}"
+
+
+class Snapshot(NamedTuple):
+    """A captured list of the wallets of a group."""
+
+    snapshot_id: str
+    group_id: str
+    # Number of wallets captured
+    count: int
+    # Number of wallet ids per chunk record
+    chunk_size: int
+    created_at: float
+    expires_at: float
+
+    def to_json(self) -> str:
+        """Serialize the snapshot, without its id."""
+        value = self._asdict()
+        del value["snapshot_id"]
+        return json.dumps(value)
+
+    def serialize(self) -> dict:
+        """Return the snapshot as returned by the admin API."""
+        return {
+            "snapshot_id": self.snapshot_id,
+            "group_id": self.group_id,
+            "count": self.count,
+            "created_at": int(self.created_at),
+            "expires_at": int(self.expires_at),
+        }
+
+
+class GroupSnapshots:
+    """Captures the wallets of groups and serves pages of the captures."""
+
+    def __init__(self, ttl: float, page_size: int = 100, chunk_size: int = 1000):
+        """Initialize the snapshots.
+
+        Args:
+            ttl: seconds a snapshot can be paged through
+            page_size: page size of the storage search while capturing
+            chunk_size: number of wallet ids stored per chunk record
+        """
+        self.ttl = ttl
+        self.page_size = page_size
+        self.chunk_size = chunk_size
+        self._purged_at = 0.0
+
+    async def create(self, profile: Profile, group_id: str) -> Snapshot:
+        """Capture the wallets of a group.
+
+        Args:
+            profile: the base profile
+            group_id: the group to capture
+
+        Returns:
+            The snapshot, to page through with `page`
+
+        """
+
+        wallet_ids = await self._scan(profile, group_id)
+
+        now = time.time()
+        snapshot = Snapshot(
+            snapshot_id=uuid.uuid4().hex,
+            group_id=group_id,
+            count=len(wallet_ids),
+            chunk_size=self.chunk_size,
+            created_at=now,
+            expires_at=now + self.ttl,
+        )
+        tags = {
+            "snapshot_id": snapshot.snapshot_id,
+            "~expires_at": _expiry_tag(snapshot.expires_at),
+        }
+
+        async with profile.transaction() as txn:
+            storage = txn.inject(BaseStorage)
+            await self._purge_expired(storage, now)
+            await storage.add_record(
+                StorageRecord(
+                    SNAPSHOT_RECORD_TYPE, snapshot.to_json(), tags, snapshot.snapshot_id
+                )
+            )
+            for index, start in enumerate(range(0, len(wallet_ids), self.chunk_size)):
+                chunk = wallet_ids[start : start + self.chunk_size]
+                await storage.add_record(
+                    StorageRecord(
+                        SNAPSHOT_RECORD_TYPE,
+                        json.dumps(chunk),
+                        tags,
+                        _chunk_id(snapshot.snapshot_id, index),
+                    )
+                )
+            await txn.commit()
+
+        return snapshot
+
+    async def _scan(self, profile: Profile, group_id: str) -> List[str]:
+        """Return the ids of the wallets of a group, read in a single scan.
+
+        Unlike pages read with `limit` and `offset`, the scan is not shifted
+        by wallets created or removed while it runs.
+        """
+
+        search = profile.inject(BaseStorageSearch).search_records(
+            WalletRecord.RECORD_TYPE, {"group_id": group_id}, self.page_size
+        )
+        try:
+            # Iterated rather than fetched page by page: askar limits the
+            # whole scan to the size of the first fetch
+            return [record.id async for record in search]
+        finally:
+            await search.close()
+
+    async def page(
+        self, profile: Profile, snapshot_id: str, limit: int, offset: int
+    ) -> Tuple[Snapshot, List[WalletRecord]]:
+        """Return a page of the wallet records of a snapshot.
+
+        Only the chunks holding the page are read. Wallets removed since the
+        snapshot was taken are left out, so a page may be short.
+
+        Raises:
+            SnapshotNotFoundError: if the snapshot does not exist, or expired
+
+        """
+
+        async with profile.session() as session:
+            storage = session.inject(BaseStorage)
+            try:
+                record = await storage.get_record(SNAPSHOT_RECORD_TYPE, snapshot_id)
+            except StorageNotFoundError as err:
+                raise SnapshotNotFoundError(
+                    f"Snapshot {snapshot_id} not found"
+                ) from err
+            snapshot = Snapshot(snapshot_id, **json.loads(record.value))
+            if snapshot.expires_at <= time.time():
+                raise SnapshotNotFoundError(f"Snapshot {snapshot_id} expired")
+
+            records = []
+            for wallet_id in await self._wallet_ids(storage, snapshot, limit, offset):
+                try:
+                    records.append(
+                        await WalletRecord.retrieve_by_id(session, wallet_id)
+                    )
+                except StorageNotFoundError:
+                    # Removed since the snapshot was taken
+                    pass
+        return snapshot, records
+
+    async def _wallet_ids(
+        self, storage: BaseStorage, snapshot: Snapshot, limit: int, offset: int
+    ) -> List[str]:
+        """Return a page of the wallet ids of a snapshot, from its chunks."""
+
+        end = min(offset + limit, snapshot.count)
+        if end <= offset:
+            return []
+
+        first_chunk = offset // snapshot.chunk_size
+        last_chunk = (end - 1) // snapshot.chunk_size
+        wallet_ids = []
+        for index in range(first_chunk, last_chunk + 1):
+            chunk = await storage.get_record(
+                SNAPSHOT_RECORD_TYPE, _chunk_id(snapshot.snapshot_id, index)
+            )
+            wallet_ids.extend(json.loads(chunk.value))
+
+        start = offset - first_chunk * snapshot.chunk_size
+        return wallet_ids[start : start + end - offset]
+
+    async def _purge_expired(self, storage: BaseStorage, now: float):
+        """Delete the records of expired snapshots, at most once per TTL."""
+
+        if now - self._purged_at < self.ttl:
+            return
+        self._purged_at = now
+
+        try:
+            await storage.delete_all_records(
+                SNAPSHOT_RECORD_TYPE, {"~expires_at": {"$lt": _expiry_tag(now)}}
+            )
+        except StorageError as err:
+            LOGGER.warning("Could not purge wallet group snapshots: %s", err.roll_up)
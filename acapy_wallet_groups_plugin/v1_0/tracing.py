@@ -0,0 +1,210 @@
+"""OpenTelemetry style tracing of the plugin routes.
+
+Spans wrap the storage sessions and multitenant manager calls made by the
+routes, carrying attributes such as the group id and record counts. Finished
+spans are handed to a pluggable `SpanExporter`. Tracing is disabled unless an
+exporter is configured, in which case `start_span` yields a no-op span.
+"""
+
+import functools
+import importlib
+import logging
+import secrets
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, Iterator, List, Optional
+
+from acapy_agent.core.profile import Profile
+from aiohttp import web
+
+LOGGER = logging.getLogger(__name__)
+
+STATUS_OK = "ok"
+STATUS_ERROR = "error"
+
+
+@dataclass
+class Span:
+    """A timed operation within a trace."""
+
+    name: str
+    trace_id: str
+    span_id: str
+    parent_id: Optional[str] = None
+    start_time: int = 0
+    end_time: Optional[int] = None
+    attributes: Dict[str, Any] = field(default_factory=dict)
+    status: str = STATUS_OK
+    error: Optional[str] = None
+
+    def set_attribute(self, key: str, value: Any):
+        """Set an attribute on the span."""
+        self.attributes[key] = value
+
+    @property
+    def duration(self) -> Optional[float]:
+        """Duration of the span in seconds, once ended."""
+        if self.end_time is None:
+            return None
+        return (self.end_time - self.start_time) / 1e9
+
+    def serialize(self) -> dict:
+        """Serialize the span."""
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start_time": self.start_time,
+            "end_time": self.end_time,
+            "attributes": self.attributes,
+            "status": self.status,
+            "error": self.error,
+        }
+
+
+class NoopSpan:
+    """Span yielded when tracing is disabled."""
+
+    def set_attribute(self, key: str, value: Any):
+        """Ignore the attribute."""
+
+
+NOOP_SPAN = NoopSpan()
+
+
+class SpanExporter(ABC):
+    """Receives finished spans."""
+
+    @abstractmethod
+    def export(self, span: Span):
+        """Export a finished span."""
+
+
+class InMemorySpanExporter(SpanExporter):
+    """Keeps finished spans in memory, for tests."""
+
+    def __init__(self):
+        """Initialize the exporter."""
+        self.spans: List[Span] = []
+
+    def export(self, span: Span):
+        """Keep the span."""
+        self.spans.append(span)
+
+    def clear(self):
+        """Forget all spans."""
+        self.spans = []
+
+    def by_name(self, name: str) -> List[Span]:
+        """Return the finished spans with the name."""
+        return [span for span in self.spans if span.name == name]
+
+
+class LoggingSpanExporter(SpanExporter):
+    """Logs finished spans."""
+
+    def export(self, span: Span):
+        """Log the span."""
+        LOGGER.info(
+            "span %s %.3fms trace=%s span=%s parent=%s status=%s %s",
+            span.name,
+            span.duration * 1000,
+            span.trace_id,
+            span.span_id,
+            span.parent_id,
+            span.status,
+            span.attributes,
+        )
+
+
+EXPORTERS = {"logging": LoggingSpanExporter, "memory": InMemorySpanExporter}
+
+
+def load_exporter(name: str) -> SpanExporter:
+    """Create the exporter registered under a name, or given as `module:Class`."""
+
+    if name in EXPORTERS:
+        return EXPORTERS[name]()
+
+    module_name, _, class_name = name.partition(":")
+    if not class_name:
+        raise ValueError(f"Unknown span exporter: {name}")
+    return getattr(importlib.import_module(module_name), class_name)()
+
+
+_current_span: ContextVar[Optional[Span]] = ContextVar(
+    "wallet_groups_current_span", default=None
+)
+
+
+class Tracer:
+    """Creates spans and hands them to the exporter when they end."""
+
+    def __init__(self, exporter: SpanExporter):
+        """Initialize the tracer."""
+        self.exporter = exporter
+
+    @contextmanager
+    def start_span(self, name: str, **attributes: Any) -> Iterator[Span]:
+        """Time the block in a span, as a child of the current span if any."""
+
+        parent = _current_span.get()
+        span = Span(
+            name=name,
+            trace_id=parent.trace_id if parent else secrets.token_hex(16),
+            span_id=secrets.token_hex(8),
+            parent_id=parent.span_id if parent else None,
+            start_time=time.time_ns(),
+            attributes={
+                key: value for key, value in attributes.items() if value is not None
+            },
+        )
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as err:
+            # Redirects and `304 Not Modified` are raised, but are not errors
+            if not isinstance(err, web.HTTPException) or err.status >= 400:
+                span.status = STATUS_ERROR
+                span.error = type(err).__name__
+            raise
+        finally:
+            _current_span.reset(token)
+            span.end_time = time.time_ns()
+            try:
+                self.exporter.export(span)
+            except Exception:
+                LOGGER.exception("Failed to export span %s", span.name)
+
+
+@contextmanager
+def start_span(profile: Profile, name: str, **attributes: Any) -> Iterator[Span]:
+    """Time the block in a span, if a tracer is bound to the profile.
+
+    Attributes that are None are left out.
+    """
+
+    tracer = profile.inject_or(Tracer)
+    if not tracer:
+        yield NOOP_SPAN
+        return
+
+    with tracer.start_span(name, **attributes) as span:
+        yield span
+
+
+def traced(
+    handler: Callable[[web.BaseRequest], Awaitable[web.StreamResponse]],
+) -> Callable[[web.BaseRequest], Awaitable[web.StreamResponse]]:
+    """Wrap a route handler in a root span, named after the handler."""
+
+    @functools.wraps(handler)
+    async def wrapper(request: web.BaseRequest):
+        with start_span(request["context"].profile, handler.__name__):
+            return await handler(request)
+
+    return wrapper
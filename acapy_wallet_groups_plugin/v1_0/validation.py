@@ -0,0 +1,281 @@
+"""Validate request bodies once, with checks compiled from their schemas.
+
+aiohttp-apispec's validation middleware loads the JSON body of a request with
+the marshmallow schema of its route, then handlers decode the body again with
+`request.json()`. Handlers decorated with `validated_body` take their body
+out of the middleware instead. With `fast_body_validation` enabled, the body
+is decoded once, checked by a `CompiledValidator` built from the schema on
+the first such request, and handed to the handler by `request_body`.
+
+Bodies the compiled checks do not accept are loaded by the apispec parser,
+as by the middleware, so invalid bodies get the same errors. Schemas with
+fields or load hooks the checks do not cover always take that path. The
+`validates` and `validates_schema` hooks only run through marshmallow, which
+checks the fields too, so bodies of schemas with such hooks are loaded by the
+schema itself instead of the compiled checks: validated once, and decoded
+once.
+"""
+
+import functools
+from typing import Any, Awaitable, Callable, List, NamedTuple, Optional
+
+from aiohttp import web
+from marshmallow import INCLUDE, RAISE, Schema, ValidationError, fields, missing
+from marshmallow.decorators import POST_LOAD, PRE_LOAD, VALIDATES, VALIDATES_SCHEMA
+
+from .config import get_config
+
+BODY_KEY = "wallet_groups_body"
+JSON_CONTENT_TYPE = "application/json"
+
+# Fields whose loaded value is the JSON value itself, once its type is checked
+STRING_FIELDS = (fields.String, fields.Url, fields.Email)
+
+Check = Callable[[Any], bool]
+
+
+def _accept_any(value: Any) -> bool:
+    return True
+
+
+class FieldCheck(NamedTuple):
+    """Compiled check of a schema field."""
+
+    data_key: str
+    attribute: str
+    required: bool
+    load_default: Any
+    accepts: Check
+
+
+def _type_check(field: fields.Field) -> Optional[Check]:
+    """Return the type check of a field, None if the field is not supported."""
+
+    field_type = type(field)
+    if field_type in STRING_FIELDS:
+        return lambda value: isinstance(value, str)
+    if field_type is fields.Boolean:
+        return lambda value: isinstance(value, bool)
+    if field_type is fields.Integer:
+        return lambda value: type(value) is int
+    if field_type is fields.Raw:
+        return _accept_any
+
+    if field_type is fields.List:
+        inner = compile_field(field.inner)
+        if not inner:
+            return None
+        return lambda value: isinstance(value, list) and all(map(inner, value))
+
+    if field_type is fields.Dict:
+        keys = compile_field(field.key_field) if field.key_field else _accept_any
+        values = compile_field(field.value_field) if field.value_field else _accept_any
+        if not keys or not values:
+            return None
+        return lambda value: isinstance(value, dict) and all(
+            keys(key) and values(item) for key, item in value.items()
+        )
+
+    return None
+
+
+def compile_field(field: fields.Field) -> Optional[Check]:
+    """Return a check accepting the values the field loads as they are.
+
+    Returns:
+        The check, None if the field is not supported
+
+    """
+
+    type_check = _type_check(field)
+    if not type_check:
+        return None
+    allow_none = field.allow_none
+    validators = list(field.validators)
+
+    def accepts(value: Any) -> bool:
+        if value is None:
+            return allow_none
+        if not type_check(value):
+            return False
+        try:
+            return all(validator(value) is not False for validator in validators)
+        except ValidationError:
+            return False
+
+    return accepts
+
+
+class CompiledValidator:
+    """Loads the bodies a schema accepts, checked field by field.
+
+    `load` returns None, rather than raising, for any body it cannot accept:
+    such bodies are left to the schema itself.
+    """
+
+    def __init__(self, schema: Schema):
+        """Initialize the validator; the checks are compiled on first use."""
+        self.schema = schema
+
+    @functools.cached_property
+    def checks(self) -> Optional[List[FieldCheck]]:
+        """The checks of the schema's fields, None if the schema is unsupported."""
+        return self._compile(self.schema)
+
+    @functools.cached_property
+    def data_keys(self) -> set:
+        """Keys of the body the schema loads."""
+        return {check.data_key for check in self.checks or ()}
+
+    @functools.cached_property
+    def has_validators(self) -> bool:
+        """Whether the schema has `validates` or `validates_schema` hooks."""
+        return any(self.schema._hooks[tag] for tag in (VALIDATES, VALIDATES_SCHEMA))
+
+    @staticmethod
+    def _compile(schema: Schema) -> Optional[List[FieldCheck]]:
+        # Load hooks may change or reject data after the field checks
+        if schema.many or schema.partial or any(
+            schema._hooks[tag] for tag in (PRE_LOAD, POST_LOAD)
+        ):
+            return None
+
+        checks = []
+        for name, field in schema.load_fields.items():
+            accepts = compile_field(field)
+            if not accepts:
+                return None
+            checks.append(
+                FieldCheck(
+                    data_key=field.data_key if field.data_key is not None else name,
+                    attribute=field.attribute or name,
+                    required=field.required,
+                    load_default=field.load_default,
+                    accepts=accepts,
+                )
+            )
+        return checks
+
+    @property
+    def supported(self) -> bool:
+        """Whether the schema's fields and hooks are covered by the checks."""
+        return self.checks is not None
+
+    def load(self, body: Any) -> Optional[dict]:
+        """Return the data the schema would load from the body.
+
+        Returns:
+            The loaded data, None if the body is left to the schema
+
+        """
+
+        if self.checks is None or not isinstance(body, dict):
+            return None
+        if self.has_validators:
+            # The hooks need the schema, which checks the fields as well
+            return self._schema_load(body)
+        if self.schema.unknown == RAISE and not self.data_keys.issuperset(body):
+            return None
+
+        data = {}
+        for check in self.checks:
+            if check.data_key in body:
+                value = body[check.data_key]
+                if not check.accepts(value):
+                    return None
+                data[check.attribute] = value
+            elif check.required:
+                return None
+            elif check.load_default is not missing:
+                default = check.load_default
+                data[check.attribute] = default() if callable(default) else default
+
+        if self.schema.unknown == INCLUDE:
+            data.update(
+                (key, value) for key, value in body.items() if key not in self.data_keys
+            )
+
+        return data
+
+    def _schema_load(self, body: dict) -> Optional[dict]:
+        """Load the body with the schema, including its validation hooks."""
+
+        try:
+            return self.schema.load(body)
+        except Exception:
+            # Whatever the hooks make of the body, the parser reports it
+            return None
+
+
+async def request_body(request: web.BaseRequest) -> dict:
+    """Return the JSON body of a request, as decoded by `validated_body`."""
+
+    if BODY_KEY in request:
+        return request[BODY_KEY]
+    return await request.json()
+
+
+async def _load_body(
+    request: web.BaseRequest, schema: dict, validator: CompiledValidator
+) -> Any:
+    """Load the body with the compiled checks, or with the apispec parser."""
+
+    # The checks are only compiled once the fast path is taken
+    if (
+        request.body_exists
+        and request.content_type == JSON_CONTENT_TYPE
+        and get_config(request["context"].profile).fast_body_validation
+        and validator.supported
+    ):
+        try:
+            body = await request.json()
+        except ValueError:
+            body = None
+        data = validator.load(body)
+        if data is not None:
+            request[BODY_KEY] = body
+            return data
+
+    return await request.app["_apispec_parser"].parse(
+        schema["schema"], request, location=schema["location"], unknown=None
+    )
+
+
+def validated_body(
+    handler: Callable[[web.BaseRequest], Awaitable[web.StreamResponse]],
+) -> Callable[[web.BaseRequest], Awaitable[web.StreamResponse]]:
+    """Validate the JSON body of a route handler before calling it.
+
+    Applied above the apispec decorators: the body schemas are left to the
+    wrapper, other schemas to the validation middleware. Without the apispec
+    parser, as when handlers are called directly, bodies are not validated.
+    """
+
+    schemas = getattr(handler, "__schemas__", [])
+    body_schemas = [
+        (schema, CompiledValidator(schema["schema"]))
+        for schema in schemas
+        if schema["location"] == "json"
+    ]
+
+    @functools.wraps(handler)
+    async def wrapper(request: web.BaseRequest):
+        if "_apispec_parser" not in request.app:
+            return await handler(request)
+
+        data_name = request.app["_apispec_request_data_name"]
+        for schema, validator in body_schemas:
+            data = await _load_body(request, schema, validator)
+            if schema["put_into"]:
+                request[schema["put_into"]] = data
+            elif data:
+                # Merged with the data the middleware loaded with the other
+                # schemas, as body schemas come first
+                loaded = request.get(data_name)
+                request[data_name] = (
+                    {**data, **loaded} if isinstance(loaded, dict) else data
+                )
+        return await handler(request)
+
+    wrapper.__schemas__ = [schema for schema in schemas if schema["location"] != "json"]
+    return wrapper
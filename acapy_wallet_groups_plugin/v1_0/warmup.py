@@ -0,0 +1,135 @@
+"""Warm the multitenant profile cache for priority groups after start up.
+
+Opening a wallet profile is expensive, so without warming the first request
+of every tenant pays for it. The warmer runs in the background once the agent
+has started, opening the profiles of the configured groups with bounded
+concurrency, up to the capacity of the profile cache.
+"""
+
+import asyncio
+import logging
+import time
+from typing import Optional, Sequence
+
+from acapy_agent.core.event_bus import Event
+from acapy_agent.core.profile import Profile
+from acapy_agent.multitenant.base import BaseMultitenantManager
+from acapy_agent.wallet.models.wallet_record import WalletRecord
+
+from .query import iter_wallet_records
+
+LOGGER = logging.getLogger(__name__)
+
+DEFAULT_CACHE_SIZE = 100
+
+
+class ProfileWarmer:
+    """Opens the wallet profiles of priority groups in the background."""
+
+    def __init__(
+        self,
+        group_ids: Sequence[str],
+        *,
+        concurrency: int = 5,
+        limit: int = 0,
+        page_size: int = 100,
+    ):
+        """Initialize the warmer.
+
+        Args:
+            group_ids: groups to warm, in order of priority
+            concurrency: number of profiles opened at once
+            limit: maximum number of profiles to open, defaults to the
+                `multitenant.cache_size` setting when 0
+            page_size: number of wallet records read per storage page
+        """
+        self.group_ids = list(group_ids)
+        self.concurrency = concurrency
+        self.limit = limit
+        self.page_size = page_size
+        self.task: Optional[asyncio.Task] = None
+
+    async def on_startup(self, profile: Profile, event: Event):
+        """Event bus handler starting the warm up once the agent has started."""
+
+        if self.group_ids and not self.task:
+            self.task = asyncio.create_task(self.warm(profile))
+
+    async def on_shutdown(self, profile: Profile, event: Event):
+        """Event bus handler cancelling an unfinished warm up."""
+
+        if self.task and not self.task.done():
+            self.task.cancel()
+
+    async def warm(self, profile: Profile) -> int:
+        """Open the wallet profiles of the configured groups.
+
+        Args:
+            profile: the base profile
+
+        Returns:
+            The number of wallet profiles opened
+        """
+
+        multitenant_mgr = profile.inject_or(BaseMultitenantManager)
+        if not multitenant_mgr:
+            LOGGER.warning("Profile warm up skipped: multitenancy is not enabled")
+            return 0
+
+        limit = self.limit or int(
+            profile.settings.get("multitenant.cache_size") or DEFAULT_CACHE_SIZE
+        )
+        semaphore = asyncio.Semaphore(self.concurrency)
+        started = time.perf_counter()
+        warmed = failed = 0
+
+        async def open_profile(wallet_record: WalletRecord) -> bool:
+            async with semaphore:
+                try:
+                    await multitenant_mgr.get_wallet_profile(
+                        profile.context, wallet_record
+                    )
+                except Exception:
+                    LOGGER.exception(
+                        "Failed to open profile of wallet %s", wallet_record.wallet_id
+                    )
+                    return False
+            return True
+
+        LOGGER.info(
+            "Warming up to %d wallet profiles of groups: %s",
+            limit,
+            ", ".join(self.group_ids),
+        )
+
+        for group_id in self.group_ids:
+            async for records in iter_wallet_records(
+                profile, {"group_id": group_id}, self.page_size
+            ):
+                # Unmanaged wallets can't be opened without their key
+                records = [r for r in records if not r.requires_external_key]
+                records = records[: limit - warmed - failed]
+
+                results = await asyncio.gather(*map(open_profile, records))
+                warmed += sum(results)
+                failed += len(results) - sum(results)
+
+                LOGGER.info(
+                    "Profile warm up progress: %d opened, %d failed (group %s, %.1fs)",
+                    warmed,
+                    failed,
+                    group_id,
+                    time.perf_counter() - started,
+                )
+                if warmed + failed >= limit:
+                    break
+            if warmed + failed >= limit:
+                break
+
+        LOGGER.info(
+            "Profile warm up finished: %d opened, %d failed in %.1fs",
+            warmed,
+            failed,
+            time.perf_counter() - started,
+        )
+        return warmed
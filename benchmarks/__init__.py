@@ -0,0 +1 @@
+"""Benchmarks for the wallet groups plugin routes."""
@@ -0,0 +1,147 @@
+"""Benchmark the import time of the plugin.
+
+ACA-Py imports the plugin package, and its routes, while the agent starts.
+Each run imports the routes in a fresh interpreter with `python -X importtime`
+and splits the time spent into the plugin's own modules and everything they
+pull in (ACA-Py, aiohttp, marshmallow, ...). Modules the interpreter imports
+to start are left out. Results are written as JSON, to be compared across
+commits with `python -m benchmarks.compare`.
+
+Usage:
+
+    python -m benchmarks.bench_import --runs 10 --output import.json
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from typing import Dict, List, NamedTuple, Optional
+
+from .bench_routes import environment
+
+PLUGIN_PACKAGE = "acapy_wallet_groups_plugin"
+ROUTES_MODULE = f"{PLUGIN_PACKAGE}.v1_0.routes"
+
+
+class ImportTime(NamedTuple):
+    """Time spent importing a module, in microseconds."""
+
+    self_us: int
+    cumulative_us: int
+
+
+def import_times(statement: str) -> Dict[str, ImportTime]:
+    """Run a statement in a fresh interpreter and time each module it imports.
+
+    Returns:
+        The import time of each module, in import order, including the modules
+        imported by the interpreter itself
+
+    """
+
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+    times = {}
+    for line in process.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        self_us, cumulative_us, name = line[len("import time:") :].split("|")
+        # Skips the header line
+        if self_us.strip().isdigit():
+            times[name.strip()] = ImportTime(int(self_us), int(cumulative_us))
+    return times
+
+
+def is_plugin_module(name: str) -> bool:
+    """Whether the module belongs to the plugin."""
+    return name == PLUGIN_PACKAGE or name.startswith(f"{PLUGIN_PACKAGE}.")
+
+
+def measure_import(module: str = ROUTES_MODULE) -> dict:
+    """Time importing a module, split into the plugin and its dependencies.
+
+    Returns:
+        The milliseconds spent in plugin modules and in total, and the self
+        time of each module imported
+
+    """
+
+    startup = import_times("pass")
+    times = {
+        name: time
+        for name, time in import_times(f"import {module}").items()
+        if name not in startup
+    }
+
+    plugin_us = sum(
+        time.self_us for name, time in times.items() if is_plugin_module(name)
+    )
+    total_us = sum(time.self_us for time in times.values())
+    return {
+        "plugin_ms": plugin_us / 1000,
+        "total_ms": total_us / 1000,
+        "modules": {name: time.self_us / 1000 for name, time in times.items()},
+    }
+
+
+def summarize(runs: List[dict]) -> dict:
+    """Return the median import times of several runs."""
+
+    return {
+        "plugin_ms": statistics.median(run["plugin_ms"] for run in runs),
+        "total_ms": statistics.median(run["total_ms"] for run in runs),
+        "plugin_share": statistics.median(
+            run["plugin_ms"] / run["total_ms"] for run in runs
+        ),
+    }
+
+
+def main(argv: Optional[List[str]] = None):
+    """Run the import benchmark."""
+
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument("--module", default=ROUTES_MODULE)
+    arg_parser.add_argument("--runs", type=int, default=10)
+    arg_parser.add_argument("--top", type=int, default=10)
+    arg_parser.add_argument("--output", default="bench_import_output.json")
+    args = arg_parser.parse_args(argv)
+
+    # The first import writes the bytecode caches, unless PYTHONDONTWRITEBYTECODE
+    # is set, in which case every run includes compiling the plugin
+    measure_import(args.module)
+    runs = [measure_import(args.module) for _ in range(args.runs)]
+    summary = summarize(runs)
+
+    print(
+        f"plugin={summary['plugin_ms']:.2f}ms total={summary['total_ms']:.2f}ms "
+        f"share={summary['plugin_share']:.1%}"
+    )
+    plugin_modules = sorted(
+        (
+            (statistics.median(run["modules"].get(name, 0.0) for run in runs), name)
+            for name in runs[-1]["modules"]
+            if is_plugin_module(name)
+        ),
+        reverse=True,
+    )
+    for self_ms, name in plugin_modules[: args.top]:
+        print(f"  {name:<56} {self_ms:.3f}ms")
+
+    results = [
+        {"name": "import[plugin]", "size": 0, "p50_ms": summary["plugin_ms"]},
+        {"name": "import[total]", "size": 0, "p50_ms": summary["total_ms"]},
+    ]
+    with open(args.output, "w") as output:
+        json.dump({"environment": environment(), "results": results}, output, indent=2)
+    print(f"Wrote {len(results)} results to {args.output}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
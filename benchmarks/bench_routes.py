@@ -0,0 +1,218 @@
+"""Benchmark the wallet groups admin routes against an in-memory askar store.
+
+Seeds wallet records spread over many groups, then measures the latency and
+throughput of `wallets_list`, `wallet_get`, `wallet_create` and
+`wallet_update` per store size and page size. Results are written as JSON,
+to be compared across commits with `python -m benchmarks.compare`.
+
+Usage:
+
+    python -m benchmarks.bench_routes --sizes 1000 10000 --output bench.json
+"""
+
+import argparse
+import asyncio
+import json
+import platform
+import subprocess
+import sys
+import time
+from importlib import metadata
+from typing import List, Optional
+
+from acapy_agent.admin.request_context import AdminRequestContext
+from acapy_agent.core.profile import Profile
+
+from acapy_wallet_groups_plugin.v1_0 import routes
+
+from .harness import (
+    BenchRequest,
+    create_bench_profile,
+    group_name,
+    measure,
+    seed_wallets,
+)
+
+DEFAULT_SIZES = [1_000, 10_000, 100_000]
+DEFAULT_PAGE_SIZES = [10, 100, 1000]
+
+
+async def bench_wallets_list(
+    profile: Profile,
+    iterations: int,
+    limit: int,
+    group_id: Optional[str] = None,
+) -> dict:
+    """Measure listing a page of wallets, optionally filtered by group."""
+
+    context = AdminRequestContext.test_context({}, profile)
+    query = {"limit": str(limit)}
+    if group_id:
+        query["group_id"] = group_id
+
+    async def operation(_: int):
+        await routes.wallets_list(BenchRequest(context, query=query))
+
+    return await measure(operation, iterations)
+
+
+async def bench_wallet_get(
+    profile: Profile, iterations: int, wallet_ids: List[str]
+) -> dict:
+    """Measure getting wallets by id."""
+
+    context = AdminRequestContext.test_context({}, profile)
+
+    async def operation(iteration: int):
+        wallet_id = wallet_ids[(iteration * 7919) % len(wallet_ids)]
+        await routes.wallet_get(
+            BenchRequest(context, match_info={"wallet_id": wallet_id})
+        )
+
+    return await measure(operation, iterations)
+
+
+async def bench_wallet_create(profile: Profile, iterations: int, groups: int) -> dict:
+    """Measure creating wallets with a group id."""
+
+    context = AdminRequestContext.test_context({}, profile)
+    run_id = time.monotonic_ns()
+
+    async def operation(iteration: int):
+        body = {
+            "wallet_name": f"created-{run_id}-{iteration}",
+            "wallet_key": "benchmark-wallet-key",
+            "label": f"Created {iteration}",
+            "group_id": group_name(iteration % groups),
+        }
+        await routes.wallet_create(BenchRequest(context, body=body))
+
+    return await measure(operation, iterations)
+
+
+async def bench_wallet_update(
+    profile: Profile,
+    iterations: int,
+    wallet_ids: List[str],
+    groups: int,
+    move_group: bool = False,
+) -> dict:
+    """Measure updating wallets, either their label or their group."""
+
+    context = AdminRequestContext.test_context({}, profile)
+
+    async def operation(iteration: int):
+        wallet_id = wallet_ids[(iteration * 7919) % len(wallet_ids)]
+        if move_group:
+            body = {"group_id": group_name((iteration + 1) % groups)}
+        else:
+            body = {"label": f"Updated {iteration}"}
+        await routes.wallet_update(
+            BenchRequest(context, match_info={"wallet_id": wallet_id}, body=body)
+        )
+
+    return await measure(operation, iterations)
+
+
+async def run_size(
+    size: int, groups: int, page_sizes: List[int], iterations: int
+) -> List[dict]:
+    """Seed a fresh store with `size` wallets and run all route benchmarks."""
+
+    profile = await create_bench_profile()
+    started = time.perf_counter()
+    wallet_ids = await seed_wallets(profile, size, groups)
+    print(f"Seeded {size} wallets in {time.perf_counter() - started:.1f}s")
+
+    write_iterations = max(10, iterations // 4)
+    cases = []
+    for limit in page_sizes:
+        cases.append(
+            (
+                f"wallets_list[group_id,limit={limit}]",
+                bench_wallets_list(profile, iterations, limit, group_name(0)),
+            )
+        )
+        cases.append(
+            (
+                f"wallets_list[all,limit={limit}]",
+                bench_wallets_list(profile, iterations, limit),
+            )
+        )
+    cases += [
+        ("wallet_get", bench_wallet_get(profile, iterations, wallet_ids)),
+        (
+            "wallet_update[label]",
+            bench_wallet_update(profile, write_iterations, wallet_ids, groups),
+        ),
+        (
+            "wallet_update[group_id]",
+            bench_wallet_update(
+                profile, write_iterations, wallet_ids, groups, move_group=True
+            ),
+        ),
+        (
+            "wallet_create[group_id]",
+            bench_wallet_create(profile, write_iterations, groups),
+        ),
+    ]
+
+    results = []
+    for name, benchmark in cases:
+        result = {"name": name, "size": size, "groups": groups, **await benchmark}
+        print(
+            f"{name:<36} size={size:<7} p50={result['p50_ms']:.3f}ms "
+            f"p95={result['p95_ms']:.3f}ms {result['ops_per_sec']:.1f} ops/s"
+        )
+        results.append(result)
+
+    await profile.close()
+    return results
+
+
+def environment() -> dict:
+    """Describe the environment the benchmarks ran in."""
+
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+
+    try:
+        acapy_version = metadata.version("acapy-agent")
+    except metadata.PackageNotFoundError:
+        acapy_version = None
+
+    return {
+        "commit": commit,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "acapy_version": acapy_version,
+    }
+
+
+async def main(argv: Optional[List[str]] = None):
+    """Run the benchmark suite."""
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--page-sizes", type=int, nargs="+", default=DEFAULT_PAGE_SIZES)
+    parser.add_argument("--groups", type=int, default=100)
+    parser.add_argument("--iterations", type=int, default=100)
+    parser.add_argument("--output", default="bench_output.json")
+    args = parser.parse_args(argv)
+
+    results = []
+    for size in args.sizes:
+        results += await run_size(size, args.groups, args.page_sizes, args.iterations)
+
+    with open(args.output, "w") as output:
+        json.dump({"environment": environment(), "results": results}, output, indent=2)
+    print(f"Wrote {len(results)} results to {args.output}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
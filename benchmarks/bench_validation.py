@@ -0,0 +1,214 @@
+"""Benchmark validating create and update bodies.
+
+Compares, per route schema and number of webhook URLs in the body, loading
+the body with the apispec parser and decoding it again in the handler, as
+the validation middleware does, against the compiled checks enabled with
+`fast_body_validation`. Invalid bodies are measured too: the compiled path
+checks them before handing them to the parser. Valid bodies are also loaded
+on their own, already decoded, which leaves out the request around them:
+`*_load` results compare the schema's `load` with the compiled validator's.
+Results are written as JSON, to be compared across commits with
+`python -m benchmarks.compare`.
+
+Usage:
+
+    python -m benchmarks.bench_validation --url-counts 0 10 100 --output val.json
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+from typing import List, Optional
+from unittest import mock
+
+from acapy_agent.admin.request_context import AdminRequestContext
+from aiohttp import web
+from aiohttp.streams import StreamReader
+from aiohttp.test_utils import make_mocked_request
+from aiohttp_apispec import request_schema
+from marshmallow import ValidationError
+from webargs.aiohttpparser import parser
+
+from acapy_wallet_groups_plugin.v1_0 import routes
+from acapy_wallet_groups_plugin.v1_0.config import PLUGIN_CONFIG_KEY
+from acapy_wallet_groups_plugin.v1_0.validation import (
+    CompiledValidator,
+    request_body,
+    validated_body,
+)
+
+from .bench_routes import environment
+from .harness import create_bench_profile, measure
+
+DEFAULT_URL_COUNTS = [0, 10, 100]
+PATHS = {"apispec": False, "compiled": True}
+
+
+def create_body(urls: int) -> dict:
+    """Return a valid `wallet_create` body with the given number of webhooks."""
+
+    return {
+        "wallet_name": "benchmark-wallet",
+        "wallet_key": "benchmark-wallet-key",
+        "wallet_type": "askar",
+        "wallet_dispatch_type": "default",
+        "wallet_webhook_urls": [f"http://localhost:{8000 + i}" for i in range(urls)],
+        "label": "Benchmark",
+        "group_id": "group-0000",
+        "extra_settings": {"ACAPY_AUTO_ACCEPT_INVITES": True},
+    }
+
+
+def update_body(urls: int) -> dict:
+    """Return a valid `wallet_update` body with the given number of webhooks."""
+
+    return {
+        "wallet_webhook_urls": [f"http://localhost:{8000 + i}" for i in range(urls)],
+        "label": "Benchmark",
+        "group_id": "group-0001",
+    }
+
+
+def json_request(app: web.Application, context: AdminRequestContext, body: dict):
+    """Return a mocked aiohttp request with a JSON body."""
+
+    data = json.dumps(body).encode()
+    payload = StreamReader(
+        mock.Mock(_reading_paused=False), 2**16, loop=asyncio.get_running_loop()
+    )
+    payload.feed_data(data)
+    payload.feed_eof()
+
+    request = make_mocked_request(
+        "POST",
+        "/multitenancy/wallet",
+        headers={"Content-Type": "application/json", "Content-Length": str(len(data))},
+        payload=payload,
+        app=app,
+    )
+    request["context"] = context
+    return request
+
+
+def body_handler(schema):
+    """Return a handler validating its body with the schema, like the routes."""
+
+    @validated_body
+    @request_schema(schema)
+    async def handler(request: web.BaseRequest):
+        return await request_body(request)
+
+    return handler
+
+
+async def bench_body(
+    app: web.Application,
+    context: AdminRequestContext,
+    schema,
+    body: dict,
+    iterations: int,
+) -> dict:
+    """Measure validating a body and handing it to the handler."""
+
+    handler = body_handler(schema)
+
+    async def operation(_: int):
+        try:
+            await handler(json_request(app, context, body))
+        except web.HTTPException:
+            pass
+
+    return await measure(operation, iterations)
+
+
+async def bench_load(schema, body: dict, compiled: bool, iterations: int) -> dict:
+    """Measure loading a decoded body with the schema or the compiled checks."""
+
+    schema = schema()
+    load = CompiledValidator(schema).load if compiled else schema.load
+
+    async def operation(_: int):
+        try:
+            load(body)
+        except ValidationError:
+            pass
+
+    return await measure(operation, iterations)
+
+
+def report(result: dict):
+    """Print a benchmark result."""
+
+    print(
+        f"{result['name']:<36} urls={result['size']:<5} "
+        f"p50={result['p50_ms']:.4f}ms {result['ops_per_sec']:.1f} ops/s"
+    )
+
+
+async def main(argv: Optional[List[str]] = None):
+    """Run the validation benchmarks."""
+
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument(
+        "--url-counts", type=int, nargs="+", default=DEFAULT_URL_COUNTS
+    )
+    arg_parser.add_argument("--iterations", type=int, default=2000)
+    arg_parser.add_argument("--output", default="bench_validation_output.json")
+    args = arg_parser.parse_args(argv)
+
+    app = web.Application()
+    app["_apispec_parser"] = parser
+    app["_apispec_request_data_name"] = "data"
+
+    contexts = {}
+    for path, enabled in PATHS.items():
+        profile = await create_bench_profile(
+            {"plugin_config": {PLUGIN_CONFIG_KEY: {"fast_body_validation": enabled}}}
+        )
+        contexts[path] = AdminRequestContext.test_context({}, profile)
+
+    create_schema = routes.CreateWalletRequestWithGroupIdSchema
+    update_schema = routes.UpdateWalletRequestWithGroupIdSchema
+    cases = []
+    for urls in args.url_counts:
+        invalid = {**create_body(urls), "wallet_dispatch_type": "unknown"}
+        cases += [
+            ("wallet_create", create_schema, create_body(urls), urls),
+            ("wallet_update", update_schema, update_body(urls), urls),
+            ("wallet_create_invalid", create_schema, invalid, urls),
+        ]
+
+    results = []
+    for name, schema, body, urls in cases:
+        for path, context in contexts.items():
+            result = {
+                "name": f"{name}[{path}]",
+                "size": urls,
+                **await bench_body(app, context, schema, body, args.iterations),
+            }
+            report(result)
+            results.append(result)
+
+    for name, schema, body, urls in cases:
+        if name.endswith("_invalid"):
+            continue
+        for path, compiled in PATHS.items():
+            result = {
+                "name": f"{name}_load[{path}]",
+                "size": urls,
+                **await bench_load(schema, body, compiled, args.iterations),
+            }
+            report(result)
+            results.append(result)
+
+    for context in contexts.values():
+        await context.profile.close()
+
+    with open(args.output, "w") as output:
+        json.dump({"environment": environment(), "results": results}, output, indent=2)
+    print(f"Wrote {len(results)} results to {args.output}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,82 @@
+"""Compare two benchmark result files.
+
+Usage:
+
+    python -m benchmarks.compare baseline.json current.json --threshold 0.2
+
+Exits with status 1 when any benchmark present in both files got slower than
+the threshold, measured on the p50 latency by default.
+"""
+
+import argparse
+import json
+import sys
+from typing import Dict, List, Optional, Tuple
+
+Key = Tuple[str, int]
+
+
+def load_results(path: str) -> Dict[Key, dict]:
+    """Load a benchmark result file, keyed by benchmark name and store size."""
+
+    with open(path) as results_file:
+        results = json.load(results_file)["results"]
+
+    return {(result["name"], result["size"]): result for result in results}
+
+
+def compare(
+    baseline: Dict[Key, dict],
+    current: Dict[Key, dict],
+    metric: str = "p50_ms",
+    threshold: float = 0.2,
+) -> Tuple[List[str], List[Key]]:
+    """Compare the metric of benchmarks present in both result sets.
+
+    Returns:
+        The report lines and the keys of benchmarks that regressed by more
+        than the threshold (a fraction, 0.2 is 20% slower)
+    """
+
+    lines = [f"{'benchmark':<40} {'size':>7} {'baseline':>10} {'current':>10} change"]
+    regressions = []
+    for key in sorted(baseline.keys() & current.keys()):
+        before = baseline[key][metric]
+        after = current[key][metric]
+        change = (after - before) / before if before else 0.0
+        regressed = change > threshold
+        if regressed:
+            regressions.append(key)
+
+        name, size = key
+        lines.append(
+            f"{name:<40} {size:>7} {before:>10.3f} {after:>10.3f} "
+            f"{change:+.1%}{'  REGRESSION' if regressed else ''}"
+        )
+
+    return lines, regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Compare two result files and report regressions."""
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("baseline")
+    parser.add_argument("current")
+    parser.add_argument("--metric", default="p50_ms")
+    parser.add_argument("--threshold", type=float, default=0.2)
+    args = parser.parse_args(argv)
+
+    lines, regressions = compare(
+        load_results(args.baseline),
+        load_results(args.current),
+        args.metric,
+        args.threshold,
+    )
+    print("\n".join(lines))
+
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
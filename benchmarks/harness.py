@@ -0,0 +1,183 @@
+"""Shared setup for benchmarking the plugin routes against real storage.
+
+Everything runs on an in-memory askar profile from `create_test_profile`, so
+benchmarks need no network or files. Sub-wallets are not provisioned as
+separate stores: the benchmark multitenant manager hands out the base profile
+as the wallet profile, which keeps `wallet_create` on the same storage while
+still exercising the record, token and endorser steps of the route.
+"""
+
+import statistics
+import time
+from typing import Awaitable, Callable, Iterable, List, Optional
+
+from acapy_agent.admin.request_context import AdminRequestContext
+from acapy_agent.config.injection_context import InjectionContext
+from acapy_agent.core.profile import Profile
+from acapy_agent.multitenant.base import BaseMultitenantManager
+from acapy_agent.multitenant.cache import ProfileCache
+from acapy_agent.utils.testing import create_test_profile
+from acapy_agent.wallet.models.wallet_record import WalletRecord
+
+# Importing the plugin applies the `group_id` patch on WalletRecord
+import acapy_wallet_groups_plugin.v1_0  # noqa: F401
+
+BENCH_SETTINGS = {
+    "wallet.type": "askar",
+    "multitenant.enabled": True,
+    "multitenant.jwt_secret": "benchmark-jwt-secret",
+}
+
+
+class BenchMultitenantManager(BaseMultitenantManager):
+    """Multitenant manager serving the base profile as every wallet profile."""
+
+    def __init__(self, profile: Profile):
+        """Initialize the manager."""
+        super().__init__(profile)
+        self._profiles = ProfileCache(100)
+
+    @property
+    def open_profiles(self) -> Iterable[Profile]:
+        """Return the open wallet profiles."""
+        return [self._profile]
+
+    async def get_wallet_profile(
+        self,
+        base_context: InjectionContext,
+        wallet_record: WalletRecord,
+        extra_settings: Optional[dict] = None,
+        *,
+        provision=False,
+    ) -> Profile:
+        """Return the base profile as the wallet profile."""
+        return self._profile
+
+    async def remove_wallet_profile(self, profile: Profile):
+        """Nothing to remove, wallet profiles are not opened."""
+
+
+class BenchRequest(dict):
+    """Minimal stand-in for an aiohttp request, as seen by the route handlers."""
+
+    def __init__(
+        self,
+        context: AdminRequestContext,
+        *,
+        match_info: Optional[dict] = None,
+        query: Optional[dict] = None,
+        body: Optional[dict] = None,
+        headers: Optional[dict] = None,
+    ):
+        """Initialize the request."""
+        super().__init__(context=context)
+        self.app = {}
+        self.match_info = match_info or {}
+        self.query = query or {}
+        self.headers = headers or {}
+        self._body = body
+
+    @property
+    def has_body(self) -> bool:
+        """Whether the request has a body."""
+        return self._body is not None
+
+    async def json(self) -> dict:
+        """Return a copy of the request body."""
+        return dict(self._body or {})
+
+
+async def create_bench_profile(settings: Optional[dict] = None) -> Profile:
+    """Create an in-memory base profile with the benchmark multitenant manager."""
+
+    profile = await create_test_profile(settings={**BENCH_SETTINGS, **(settings or {})})
+    profile.context.injector.bind_instance(
+        BaseMultitenantManager, BenchMultitenantManager(profile)
+    )
+    return profile
+
+
+def group_name(index: int) -> str:
+    """Return the name of the benchmark group with the given index."""
+    return f"group-{index:04d}"
+
+
+async def seed_wallets(
+    profile: Profile, count: int, groups: int, batch_size: int = 1000
+) -> List[str]:
+    """Store `count` wallet records spread round robin over `groups` groups.
+
+    Returns:
+        The ids of the stored wallet records
+    """
+
+    wallet_ids = []
+    for start in range(0, count, batch_size):
+        async with profile.transaction() as transaction:
+            for index in range(start, min(start + batch_size, count)):
+                group_id = group_name(index % groups)
+                record = WalletRecord(
+                    key_management_mode=WalletRecord.MODE_MANAGED,
+                    settings={
+                        "wallet.type": "askar",
+                        "wallet.name": f"wallet-{index}",
+                        "wallet.webhook_urls": [],
+                        "wallet.dispatch_type": "base",
+                        "wallet.group_id": group_id,
+                        "default_label": f"Tenant {index}",
+                    },
+                    group_id=group_id,
+                )
+                await record.save(transaction)
+                wallet_ids.append(record.wallet_id)
+            await transaction.commit()
+
+    return wallet_ids
+
+
+async def measure(
+    operation: Callable[[int], Awaitable],
+    iterations: int,
+    warmup: int = 3,
+) -> dict:
+    """Time an async operation and return latency statistics in milliseconds.
+
+    Args:
+        operation: coroutine function called with the iteration number
+        iterations: number of timed calls
+        warmup: number of untimed calls made first
+    """
+
+    for iteration in range(warmup):
+        await operation(iteration)
+
+    latencies = []
+    started = time.perf_counter()
+    for iteration in range(iterations):
+        before = time.perf_counter()
+        await operation(warmup + iteration)
+        latencies.append((time.perf_counter() - before) * 1000)
+    elapsed = time.perf_counter() - started
+
+    return summarize(latencies, elapsed)
+
+
+def summarize(latencies: List[float], elapsed: float) -> dict:
+    """Return latency percentiles (ms) and throughput of timed operations."""
+
+    ordered = sorted(latencies)
+    if len(ordered) > 1:
+        quantiles = statistics.quantiles(ordered, n=100, method="inclusive")
+        p50, p95, p99 = quantiles[49], quantiles[94], quantiles[98]
+    else:
+        p50 = p95 = p99 = ordered[0] if ordered else 0.0
+
+    return {
+        "iterations": len(ordered),
+        "mean_ms": round(statistics.fmean(ordered), 4) if ordered else 0.0,
+        "min_ms": round(ordered[0], 4) if ordered else 0.0,
+        "p50_ms": round(p50, 4),
+        "p95_ms": round(p95, 4),
+        "p99_ms": round(p99, 4),
+        "ops_per_sec": round(len(ordered) / elapsed, 2) if elapsed else 0.0,
+    }
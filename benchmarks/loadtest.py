@@ -0,0 +1,250 @@
+"""Load test the plugin routes on a local aiohttp app.
+
+Starts an aiohttp app with the routes from the plugin's `register()` on an
+in-memory profile, then drives a configurable mix of create, list, get and
+update requests at each requested concurrency level. Reports latency
+percentiles and error rates per operation, plus event loop lag, which shows
+how long handlers hold up the loop. Client and server share the loop, as
+they would share a CPU in a real deployment, so lag covers both.
+
+Runs fully offline. Usage:
+
+    python -m benchmarks.loadtest --concurrency 1 10 50 --duration 10 \\
+        --mix create=1 list=4 get=4 update=1 --output loadtest.json
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+from acapy_agent.admin.request_context import AdminRequestContext
+from acapy_agent.core.profile import Profile
+from aiohttp import ClientSession, TCPConnector, web
+from aiohttp.test_utils import TestServer
+from aiohttp_apispec import setup_aiohttp_apispec, validation_middleware
+
+from acapy_wallet_groups_plugin.v1_0 import routes
+
+from .harness import create_bench_profile, group_name, seed_wallets, summarize
+
+DEFAULT_MIX = {"create": 1, "list": 4, "get": 4, "update": 1}
+
+
+def create_app(profile: Profile) -> web.Application:
+    """Create an admin-like aiohttp app serving the plugin routes."""
+
+    @web.middleware
+    async def context_middleware(request: web.Request, handler):
+        request["context"] = AdminRequestContext(profile)
+        return await handler(request)
+
+    app = web.Application(middlewares=[context_middleware, validation_middleware])
+    setup_aiohttp_apispec(app=app, title="Wallet groups load test", version="v1")
+    return app
+
+
+class LoopLagMonitor:
+    """Measures how late the event loop wakes up a periodic task."""
+
+    def __init__(self, interval: float = 0.01):
+        """Initialize the monitor."""
+        self.interval = interval
+        self.lags: List[float] = []
+        self._task: Optional[asyncio.Task] = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            self.lags.append(max(0.0, loop.time() - expected) * 1000)
+
+    def start(self):
+        """Start measuring."""
+        self.lags = []
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> dict:
+        """Stop measuring and return lag statistics in milliseconds."""
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+
+        stats = summarize(self.lags, 0)
+        return {
+            "p50_ms": stats["p50_ms"],
+            "p99_ms": stats["p99_ms"],
+            "max_ms": round(max(self.lags, default=0.0), 4),
+        }
+
+
+class LoadGenerator:
+    """Drives a weighted mix of route requests against the test server."""
+
+    def __init__(
+        self,
+        server: TestServer,
+        session: ClientSession,
+        wallet_ids: List[str],
+        groups: int,
+        mix: Dict[str, int],
+        seed: int = 0,
+    ):
+        """Initialize the generator."""
+        self.server = server
+        self.session = session
+        self.wallet_ids = wallet_ids
+        self.groups = groups
+        self.operations = list(mix)
+        self.weights = [mix[operation] for operation in self.operations]
+        self.random = random.Random(seed)
+        self.created = 0
+
+    def _request(self, operation: str):
+        group_id = group_name(self.random.randrange(self.groups))
+        wallet_id = self.random.choice(self.wallet_ids)
+
+        if operation == "create":
+            self.created += 1
+            return "POST", "/multitenancy/wallet", {
+                "wallet_name": f"load-{time.monotonic_ns()}-{self.created}",
+                "wallet_key": "load-test-wallet-key",
+                "group_id": group_id,
+            }
+        if operation == "list":
+            return "GET", f"/multitenancy/wallets?group_id={group_id}&limit=100", None
+        if operation == "get":
+            return "GET", f"/multitenancy/wallet/{wallet_id}", None
+        if operation == "update":
+            return "PUT", f"/multitenancy/wallet/{wallet_id}", {
+                "label": f"Load {self.random.random()}"
+            }
+        raise ValueError(f"Unknown operation: {operation}")
+
+    async def _worker(self, deadline: float, latencies, errors):
+        while time.perf_counter() < deadline:
+            [operation] = self.random.choices(self.operations, self.weights)
+            method, path, body = self._request(operation)
+
+            started = time.perf_counter()
+            try:
+                async with self.session.request(
+                    method, self.server.make_url(path), json=body
+                ) as response:
+                    data = await response.read()
+                    if response.status >= 400:
+                        errors[operation][str(response.status)] += 1
+                    elif operation == "create":
+                        self.wallet_ids.append(json.loads(data)["wallet_id"])
+            except Exception as err:
+                errors[operation][type(err).__name__] += 1
+            latencies[operation].append((time.perf_counter() - started) * 1000)
+
+    async def run(self, concurrency: int, duration: float) -> dict:
+        """Run the traffic mix at a concurrency level for `duration` seconds."""
+
+        latencies = defaultdict(list)
+        errors = defaultdict(lambda: defaultdict(int))
+        monitor = LoopLagMonitor()
+
+        monitor.start()
+        started = time.perf_counter()
+        deadline = started + duration
+        await asyncio.gather(
+            *(self._worker(deadline, latencies, errors) for _ in range(concurrency))
+        )
+        elapsed = time.perf_counter() - started
+        loop_lag = await monitor.stop()
+
+        operations = {}
+        for operation, values in latencies.items():
+            error_count = sum(errors[operation].values())
+            operations[operation] = {
+                **summarize(values, elapsed),
+                "errors": dict(errors[operation]),
+                "error_rate": round(error_count / len(values), 4),
+            }
+        total = sum(len(values) for values in latencies.values())
+        total_errors = sum(sum(counts.values()) for counts in errors.values())
+
+        return {
+            "concurrency": concurrency,
+            "duration_s": round(elapsed, 2),
+            "requests": total,
+            "requests_per_sec": round(total / elapsed, 2),
+            "error_rate": round(total_errors / total, 4) if total else 0.0,
+            "loop_lag": loop_lag,
+            "operations": operations,
+        }
+
+
+def parse_mix(values: List[str]) -> Dict[str, int]:
+    """Parse `operation=weight` pairs."""
+
+    mix = {}
+    for value in values:
+        operation, _, weight = value.partition("=")
+        if operation not in DEFAULT_MIX:
+            raise argparse.ArgumentTypeError(f"Unknown operation: {operation}")
+        mix[operation] = int(weight or 1)
+    return mix
+
+
+async def main(argv: Optional[List[str]] = None):
+    """Run the load test."""
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 10, 50])
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument(
+        "--mix", nargs="+", default=[f"{k}={v}" for k, v in DEFAULT_MIX.items()]
+    )
+    parser.add_argument("--seed-wallets", type=int, default=1000)
+    parser.add_argument("--groups", type=int, default=20)
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args(argv)
+
+    profile = await create_bench_profile()
+    wallet_ids = await seed_wallets(profile, args.seed_wallets, args.groups)
+
+    app = create_app(profile)
+    await routes.register(app)
+
+    results = []
+    connector = TCPConnector(limit=0)
+    async with TestServer(app) as server, ClientSession(connector=connector) as session:
+        generator = LoadGenerator(
+            server, session, wallet_ids, args.groups, parse_mix(args.mix)
+        )
+        for concurrency in args.concurrency:
+            result = await generator.run(concurrency, args.duration)
+            results.append(result)
+            print(
+                f"concurrency={concurrency:<4} {result['requests_per_sec']:>8.1f} req/s "
+                f"errors={result['error_rate']:.2%} "
+                f"loop lag p99={result['loop_lag']['p99_ms']:.1f}ms"
+            )
+            for operation, stats in sorted(result["operations"].items()):
+                print(
+                    f"    {operation:<8} p50={stats['p50_ms']:.2f}ms "
+                    f"p95={stats['p95_ms']:.2f}ms p99={stats['p99_ms']:.2f}ms "
+                    f"errors={stats['error_rate']:.2%}"
+                )
+
+    await profile.close()
+
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump({"results": results}, output, indent=2)
+        print(f"Wrote results to {args.output}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
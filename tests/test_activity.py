@@ -0,0 +1,107 @@
+import unittest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from acapy_agent.core.event_bus import Event
+from acapy_agent.utils.testing import create_test_profile
+
+import acapy_wallet_groups_plugin.v1_0.activity as test_module
+from acapy_wallet_groups_plugin.v1_0.activity import (
+    ActivityTracker,
+    activity_middleware,
+)
+from acapy_wallet_groups_plugin.v1_0.events import WALLET_EVENT_TOPIC_PREFIX
+
+test_group_id = "test-group-id"
+
+
+def wallet_event(state: str, wallet_id: str, group_id=None, previous_group_id=None):
+    return Event(
+        f"{WALLET_EVENT_TOPIC_PREFIX}{state}",
+        {
+            "wallet_id": wallet_id,
+            "group_id": group_id,
+            "previous_group_id": previous_group_id,
+        },
+    )
+
+
+class TestActivityTracker(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.profile = await create_test_profile()
+        self.tracker = ActivityTracker()
+
+    async def touch_at(self, timestamp: float, wallet_id: str, group_id=None):
+        with patch.object(test_module.time, "time", return_value=timestamp):
+            self.tracker.touch(wallet_id, group_id)
+
+    async def idle_ids(self, group_id: str, since: float):
+        results = await self.tracker.idle_wallets(self.profile, group_id, since)
+        return sorted(result["wallet_id"] for result in results)
+
+    async def test_idle_wallets_from_flushed_activity(self):
+        await self.touch_at(1000, "old", test_group_id)
+        await self.touch_at(5000, "recent", test_group_id)
+        await self.touch_at(1000, "other-group", "other")
+
+        assert await self.tracker.flush(self.profile) == 3
+        assert await self.tracker.flush(self.profile) == 0
+
+        assert await self.idle_ids(test_group_id, 2000) == ["old"]
+        assert await self.idle_ids(test_group_id, 6000) == ["old", "recent"]
+
+    async def test_unflushed_activity_is_not_idle(self):
+        await self.touch_at(1000, "wallet", test_group_id)
+        await self.tracker.flush(self.profile)
+        await self.touch_at(5000, "wallet", test_group_id)
+
+        assert await self.idle_ids(test_group_id, 2000) == []
+
+    async def test_flush_keeps_most_recent_activity(self):
+        await self.touch_at(5000, "wallet", test_group_id)
+        await self.tracker.flush(self.profile)
+        # e.g. flushed late by another agent instance
+        await self.touch_at(1000, "wallet")
+        await self.tracker.flush(self.profile)
+
+        assert await self.idle_ids(test_group_id, 2000) == []
+        assert await self.idle_ids(test_group_id, 6000) == ["wallet"]
+
+    async def test_wallet_events(self):
+        await self.tracker.on_wallet_event(
+            self.profile, wallet_event("created", "moved", test_group_id)
+        )
+        await self.tracker.on_wallet_event(
+            self.profile, wallet_event("created", "removed", test_group_id)
+        )
+        await self.tracker.flush(self.profile)
+
+        await self.tracker.on_wallet_event(
+            self.profile, wallet_event("updated", "moved", "other", test_group_id)
+        )
+        await self.tracker.on_wallet_event(
+            self.profile, wallet_event("removed", "removed", test_group_id)
+        )
+        await self.tracker.flush(self.profile)
+
+        since = 10**11
+        assert await self.idle_ids(test_group_id, since) == []
+        assert await self.idle_ids("other", since) == ["moved"]
+
+    async def test_middleware_touches_tenant_wallet(self):
+        self.profile.context.injector.bind_instance(ActivityTracker, self.tracker)
+        self.profile.settings["wallet.group_id"] = test_group_id
+        request = {
+            "context": MagicMock(profile=self.profile, metadata={"wallet_id": "tenant"})
+        }
+        handler = AsyncMock(return_value="response")
+
+        assert await activity_middleware(request, handler) == "response"
+        assert self.tracker.pending["tenant"][1] == test_group_id
+
+    async def test_middleware_ignores_base_wallet(self):
+        self.profile.context.injector.bind_instance(ActivityTracker, self.tracker)
+        request = {"context": MagicMock(profile=self.profile, metadata=None)}
+
+        await activity_middleware(request, AsyncMock())
+
+        assert not self.tracker.pending
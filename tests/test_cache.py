@@ -0,0 +1,162 @@
+import unittest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from acapy_agent.core.event_bus import Event
+from acapy_agent.multitenant.base import BaseMultitenantManager
+from acapy_agent.multitenant.cache import ProfileCache
+from acapy_agent.multitenant.manager import MultitenantManager
+from acapy_agent.utils.testing import create_test_profile
+from acapy_agent.wallet.models.wallet_record import WalletRecord
+
+from acapy_wallet_groups_plugin.v1_0.cache import (
+    GroupAwareProfileCache,
+    GroupProfileCacheInstaller,
+)
+
+
+def make_profile(group_id=None):
+    return MagicMock(settings={"wallet.group_id": group_id})
+
+
+class TestGroupAwareProfileCache(unittest.TestCase):
+    def setUp(self):
+        # Keep strong references, the cache only holds weak references to
+        # evicted profiles
+        self.profiles = {}
+
+    def put(self, cache, key, group_id):
+        self.profiles[key] = make_profile(group_id)
+        cache.put(key, self.profiles[key])
+
+    def test_pinned_groups_are_not_evicted(self):
+        cache = GroupAwareProfileCache(2, pinned_groups=["premium"])
+
+        self.put(cache, "premium-1", "premium")
+        for index in range(5):
+            self.put(cache, f"bulk-{index}", "bulk")
+
+        assert list(cache._cache) == ["premium-1", "bulk-4"]
+        assert cache.metrics["bulk"].evictions == 4
+        assert cache.metrics["premium"].evictions == 0
+        # Evicted profiles are no longer accounted to their group
+        assert set(cache._groups) == {"premium-1", "bulk-4"}
+
+    def test_all_pinned_exceeds_capacity(self):
+        cache = GroupAwareProfileCache(1, pinned_groups=["premium"])
+
+        self.put(cache, "premium-1", "premium")
+        self.put(cache, "premium-2", "premium")
+
+        assert len(cache._cache) == 2
+
+    def test_weighted_shares(self):
+        cache = GroupAwareProfileCache(4, group_weights={"premium": 3, "bulk": 1})
+
+        for index in range(3):
+            self.put(cache, f"premium-{index}", "premium")
+        for index in range(5):
+            self.put(cache, f"bulk-{index}", "bulk")
+
+        # The bulk burst only evicts its own profiles beyond its share
+        assert [key for key in cache._cache if key.startswith("premium")] == [
+            "premium-0",
+            "premium-1",
+            "premium-2",
+        ]
+        assert cache.metrics["premium"].evictions == 0
+
+        # Beyond its share, the premium group evicts its own profiles as well
+        self.put(cache, "premium-3", "premium")
+        assert "premium-0" not in cache._cache
+        assert "bulk-4" in cache._cache
+
+    def test_hits_and_misses(self):
+        cache = GroupAwareProfileCache(2)
+        self.put(cache, "wallet", "group")
+
+        assert cache.get("wallet")
+        assert not cache.get("unknown")
+        assert cache.metrics["group"].hits == 1
+        assert cache.metrics["group"].misses == 1
+
+        [stats] = cache.stats()["groups"]
+        assert stats == {
+            "group_id": "group",
+            "size": 1,
+            "pinned": False,
+            "weight": 1.0,
+            "hits": 1,
+            "misses": 1,
+            "evictions": 0,
+        }
+
+    def test_remove(self):
+        cache = GroupAwareProfileCache(2)
+        self.put(cache, "wallet", "group")
+
+        cache.remove("wallet")
+
+        assert not cache.has("wallet")
+        assert cache.stats()["size"] == 0
+        assert cache._groups == {}
+
+    def test_rescued_profile_accounted_to_its_group(self):
+        cache = GroupAwareProfileCache(1)
+        self.put(cache, "wallet-1", "group")
+        self.put(cache, "wallet-2", "other")
+
+        # Evicted, but still referenced, so still open
+        assert "wallet-1" not in cache._cache
+        assert cache.get("wallet-1") is self.profiles["wallet-1"]
+
+        assert list(cache._cache) == ["wallet-1"]
+        assert cache._groups == {"wallet-1": "group"}
+        assert cache.metrics["group"].hits == 1
+
+
+class TestGroupAwareProfileCacheManager(unittest.IsolatedAsyncioTestCase):
+    async def test_hits_counted_by_get_wallet_profile(self):
+        profile = await create_test_profile()
+        multitenant_mgr = MultitenantManager(profile)
+        cache = GroupAwareProfileCache(2)
+        multitenant_mgr._profiles = cache
+        wallet_record = WalletRecord(
+            wallet_id="wallet",
+            key_management_mode=WalletRecord.MODE_MANAGED,
+            settings={"wallet.group_id": "group"},
+        )
+        opened = make_profile("group")
+
+        with patch(
+            "acapy_agent.multitenant.manager.wallet_config",
+            AsyncMock(return_value=(opened, None)),
+        ):
+            for _ in range(3):
+                assert (
+                    await multitenant_mgr.get_wallet_profile(
+                        profile.context, wallet_record
+                    )
+                    is opened
+                )
+
+        assert cache.metrics["group"].misses == 1
+        assert cache.metrics["group"].hits == 2
+
+
+class TestGroupProfileCacheInstaller(unittest.IsolatedAsyncioTestCase):
+    async def test_on_startup_replaces_cache(self):
+        profile = await create_test_profile()
+        multitenant_mgr = MagicMock(BaseMultitenantManager)
+        multitenant_mgr._profiles = ProfileCache(10)
+        cached = make_profile("premium")
+        multitenant_mgr._profiles.put("wallet", cached)
+        profile.context.injector.bind_instance(BaseMultitenantManager, multitenant_mgr)
+
+        installer = GroupProfileCacheInstaller(pinned_groups=["premium"])
+        await installer.on_startup(profile, Event("acapy::core::startup"))
+
+        cache = multitenant_mgr._profiles
+        assert isinstance(cache, GroupAwareProfileCache)
+        assert cache.capacity == 10
+        assert cache.get("wallet") is cached
+        assert profile.inject(GroupAwareProfileCache) is cache
@@ -0,0 +1,104 @@
+import asyncio
+import unittest
+
+from acapy_agent.core.event_bus import Event
+
+from acapy_wallet_groups_plugin.v1_0.change_feed import GroupChangeFeed
+from acapy_wallet_groups_plugin.v1_0.events import WALLET_EVENT_TOPIC_PREFIX
+
+test_group_id = "test-group-id"
+test_wallet_id = "test-wallet-id"
+
+
+class TestGroupChangeFeed(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.feed = GroupChangeFeed(max_events_per_group=2)
+
+    async def test_publish_and_events_after(self):
+        first = await self.feed.publish(test_group_id, "created", test_wallet_id)
+        second = await self.feed.publish(test_group_id, "updated", test_wallet_id)
+        await self.feed.publish("other-group-id", "created", "other-wallet-id")
+
+        assert first.sequence < second.sequence
+        assert self.feed.events_after(test_group_id, 0) == [first, second]
+        assert self.feed.events_after(test_group_id, first.sequence) == [second]
+        assert self.feed.events_after(test_group_id, second.sequence) == []
+
+    async def test_is_truncated(self):
+        first = await self.feed.publish(test_group_id, "created", test_wallet_id)
+        second = await self.feed.publish(test_group_id, "updated", test_wallet_id)
+
+        assert not self.feed.is_truncated(test_group_id, 0)
+        assert not self.feed.is_truncated(test_group_id, first.sequence)
+        # A cursor from a previous feed, e.g. before an agent restart
+        assert self.feed.is_truncated(test_group_id, 1)
+
+        # Third event drops the first one from the retained history
+        await self.feed.publish(test_group_id, "removed", test_wallet_id)
+        assert not self.feed.is_truncated(test_group_id, first.sequence)
+        assert self.feed.is_truncated(test_group_id, first.sequence - 1)
+        assert [event.sequence for event in self.feed.events_after(test_group_id, 0)][
+            0
+        ] == second.sequence
+
+    async def test_max_groups(self):
+        feed = GroupChangeFeed(max_events_per_group=2, max_groups=2)
+        first = await feed.publish(test_group_id, "created", test_wallet_id)
+        await feed.publish("other-group-id", "created", "other-wallet-id")
+        await feed.publish(test_group_id, "updated", test_wallet_id)
+        last = await feed.publish("new-group-id", "created", "new-wallet-id")
+
+        # The least recently changed group is dropped
+        assert feed.events_after("other-group-id", 0) == []
+        assert feed.is_truncated("other-group-id", first.sequence)
+        assert len(feed.events_after(test_group_id, 0)) == 2
+        assert not feed.is_truncated(test_group_id, first.sequence)
+
+        # A dropped group coming back keeps reporting the lost events
+        await feed.publish("other-group-id", "updated", "other-wallet-id")
+        assert feed.is_truncated("other-group-id", first.sequence)
+        assert not feed.is_truncated("new-group-id", last.sequence - 1)
+
+    async def test_wait_for_events_timeout(self):
+        events = await self.feed.wait_for_events(test_group_id, 0, timeout=0.01)
+
+        assert events == []
+
+    async def test_wait_for_events_wakes_on_publish(self):
+        waiter = asyncio.create_task(
+            self.feed.wait_for_events(test_group_id, self.feed.sequence, timeout=5)
+        )
+        await asyncio.sleep(0)
+        event = await self.feed.publish(test_group_id, "created", test_wallet_id)
+
+        assert await waiter == [event]
+
+    async def test_on_wallet_event_group_move(self):
+        await self.feed.on_wallet_event(
+            None,
+            Event(
+                f"{WALLET_EVENT_TOPIC_PREFIX}updated",
+                {
+                    "wallet_id": test_wallet_id,
+                    "group_id": test_group_id,
+                    "previous_group_id": "old-group-id",
+                },
+            ),
+        )
+
+        [left] = self.feed.events_after("old-group-id", 0)
+        [joined] = self.feed.events_after(test_group_id, 0)
+        assert left.state == "removed"
+        assert joined.state == "updated"
+        assert joined.previous_group_id == "old-group-id"
+
+    async def test_on_wallet_event_without_group(self):
+        await self.feed.on_wallet_event(
+            None,
+            Event(
+                f"{WALLET_EVENT_TOPIC_PREFIX}created",
+                {"wallet_id": test_wallet_id, "group_id": None},
+            ),
+        )
+
+        assert self.feed.sequence == self.feed.start_sequence
@@ -0,0 +1,128 @@
+import gzip
+import json
+import unittest
+import zlib
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from acapy_agent.utils.testing import create_test_profile
+from aiohttp import web
+
+from acapy_wallet_groups_plugin.v1_0 import compression as test_module
+from acapy_wallet_groups_plugin.v1_0.config import WalletGroupsConfig
+
+listing = {
+    "results": [
+        {"wallet_id": f"wallet-{index}", "settings": {"wallet.name": "name"}}
+        for index in range(100)
+    ]
+}
+
+
+class TestCompression(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.profile = await create_test_profile()
+        self.profile.context.injector.bind_instance(
+            WalletGroupsConfig,
+            WalletGroupsConfig(response_compression=True, compression_min_size=256),
+        )
+        context = MagicMock(profile=self.profile)
+        self.request = MagicMock(
+            headers={"Accept-Encoding": "gzip"}, __getitem__=lambda _, k: context
+        )
+
+    def test_negotiate_encoding(self):
+        codecs = {"brotli": MagicMock(), "zstandard": None}
+        with patch.object(test_module, "_codec", codecs.get):
+            for header, expected in (
+                ("gzip, deflate", "gzip"),
+                ("gzip, br", "br"),
+                ("gzip;q=1.0, br;q=0.5", "gzip"),
+                ("*", "br"),
+                ("br;q=0, *;q=0.1", "gzip"),
+                ("identity", None),
+                ("gzip;q=0", None),
+            ):
+                self.request.headers = {"Accept-Encoding": header}
+                assert test_module.negotiate_encoding(self.request) == expected
+
+    def test_negotiate_encoding_disabled(self):
+        self.profile.context.injector.bind_instance(
+            WalletGroupsConfig, WalletGroupsConfig()
+        )
+
+        assert test_module.negotiate_encoding(self.request) is None
+
+    async def test_compress_response(self):
+        response = web.json_response(listing)
+        response.headers["ETag"] = '"abc"'
+
+        response = await test_module.compress_response(self.request, response)
+
+        assert response.headers["Content-Encoding"] == "gzip"
+        assert response.headers["Vary"] == "Accept-Encoding"
+        assert response.headers["ETag"] == 'W/"abc"'
+        assert json.loads(gzip.decompress(response.body)) == listing
+
+    async def test_large_response_compressed_in_executor(self):
+        body = json.dumps(listing).encode()
+        with patch.object(test_module, "EXECUTOR_MIN_SIZE", len(body)), patch.object(
+            test_module.asyncio.get_running_loop(),
+            "run_in_executor",
+            AsyncMock(return_value=b"compressed"),
+        ) as run_in_executor:
+            response = await test_module.compress_response(
+                self.request, web.json_response(listing)
+            )
+
+        run_in_executor.assert_awaited_once_with(
+            None, test_module.compress, "gzip", body
+        )
+        assert response.body == b"compressed"
+
+    async def test_small_response_not_compressed(self):
+        response = await test_module.compress_response(
+            self.request, web.json_response({"results": []})
+        )
+
+        assert "Content-Encoding" not in response.headers
+        assert json.loads(response.body) == {"results": []}
+
+    def test_stream_compressor_flushes_each_write(self):
+        compressor = test_module.StreamCompressor("gzip")
+        decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+
+        for index in range(3):
+            line = json.dumps({"wallet_id": f"wallet-{index}"}).encode() + b"\n"
+            assert decompressor.decompress(compressor.compress(line)) == line
+
+        assert decompressor.decompress(compressor.finish()) == b""
+        assert decompressor.eof
+
+    async def test_stream_response_compressed(self):
+        response = test_module.stream_response(
+            self.request, headers={"Content-Type": "application/x-ndjson"}
+        )
+        assert isinstance(response, test_module.CompressedStreamResponse)
+        assert response.headers["Content-Encoding"] == "gzip"
+
+        with patch.object(
+            web.StreamResponse, "write", AsyncMock()
+        ) as mock_write, patch.object(
+            web.StreamResponse, "write_eof", AsyncMock()
+        ) as mock_write_eof:
+            await response.write(b'{"wallet_id": "wallet"}\n')
+            await response.write_eof()
+            await response.write_eof()
+
+            body = mock_write.await_args.args[0] + mock_write_eof.await_args_list[
+                0
+            ].args[0]
+            assert gzip.decompress(body) == b'{"wallet_id": "wallet"}\n'
+            assert mock_write_eof.await_count == 2
+
+    async def test_stream_response_uncompressed(self):
+        self.request.headers = {}
+
+        response = test_module.stream_response(self.request)
+
+        assert type(response) is web.StreamResponse
@@ -0,0 +1,42 @@
+import unittest
+from unittest.mock import MagicMock
+
+from acapy_wallet_groups_plugin.v1_0.conditional import (
+    etag_matches,
+    wallet_record_etag,
+    wallet_records_etag,
+)
+
+
+def make_record(wallet_id: str, updated_at: str):
+    return MagicMock(wallet_id=wallet_id, updated_at=updated_at)
+
+
+class TestConditional(unittest.TestCase):
+    def test_etag_changes_with_updated_at(self):
+        before = wallet_record_etag(make_record("wallet", "2024-01-01T00:00:00Z"))
+        after = wallet_record_etag(make_record("wallet", "2024-01-02T00:00:00Z"))
+
+        assert before != after
+        assert before.startswith('"') and before.endswith('"')
+
+    def test_list_etag_depends_on_page_contents(self):
+        first = make_record("first", "2024-01-01T00:00:00Z")
+        second = make_record("second", "2024-01-01T00:00:00Z")
+
+        assert wallet_records_etag([first, second]) == wallet_records_etag(
+            [first, second]
+        )
+        assert wallet_records_etag([first, second]) != wallet_records_etag([first])
+        assert wallet_records_etag([first, second]) != wallet_records_etag(
+            [second, first]
+        )
+
+    def test_etag_matches(self):
+        etag = '"abc"'
+
+        assert not etag_matches(MagicMock(headers={}), etag)
+        assert etag_matches(MagicMock(headers={"If-None-Match": etag}), etag)
+        assert etag_matches(MagicMock(headers={"If-None-Match": "*"}), etag)
+        assert etag_matches(MagicMock(headers={"If-None-Match": f'"x", W/{etag}'}), etag)
+        assert not etag_matches(MagicMock(headers={"If-None-Match": '"x"'}), etag)
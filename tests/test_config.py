@@ -0,0 +1,31 @@
+import unittest
+
+from acapy_agent.config.settings import Settings
+
+from acapy_wallet_groups_plugin.v1_0.config import WalletGroupsConfig
+
+
+class TestWalletGroupsConfig(unittest.TestCase):
+    def test_defaults(self):
+        config = WalletGroupsConfig.from_settings(Settings())
+
+        assert config == WalletGroupsConfig()
+
+    def test_from_plugin_config(self):
+        settings = Settings(
+            {
+                "plugin_config": {
+                    "wallet_groups": {
+                        "token_batch_concurrency": "25",
+                        "group_page_size": 500,
+                        "warmup_groups": "premium, gold",
+                    }
+                }
+            }
+        )
+
+        config = WalletGroupsConfig.from_settings(settings)
+
+        assert config.token_batch_concurrency == 25
+        assert config.group_page_size == 500
+        assert config.warmup_groups == ["premium", "gold"]
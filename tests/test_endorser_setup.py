@@ -0,0 +1,94 @@
+import asyncio
+import unittest
+from unittest.mock import AsyncMock, MagicMock
+
+from acapy_agent.core.event_bus import Event
+
+from acapy_wallet_groups_plugin.v1_0.endorser_setup import (
+    SETUP_COMPLETED,
+    SETUP_FAILED,
+    SETUP_PENDING,
+    SETUP_RUNNING,
+    EndorserSetupQueue,
+)
+from acapy_wallet_groups_plugin.v1_0.events import WALLET_EVENT_TOPIC_PREFIX
+
+
+class TestEndorserSetupQueue(unittest.IsolatedAsyncioTestCase):
+    async def test_submit_runs_in_background(self):
+        queue = EndorserSetupQueue()
+        started = asyncio.Event()
+        release = asyncio.Event()
+
+        async def setup():
+            started.set()
+            await release.wait()
+
+        status = queue.submit("wallet", setup)
+        assert status.state == SETUP_PENDING
+
+        await started.wait()
+        assert queue.status("wallet").state == SETUP_RUNNING
+
+        release.set()
+        await queue.join()
+        assert queue.status("wallet").state == SETUP_COMPLETED
+        assert queue.status("wallet").finished_at >= status.started_at
+
+    async def test_failure_is_recorded(self):
+        queue = EndorserSetupQueue()
+
+        queue.submit("wallet", AsyncMock(side_effect=ValueError("no endorser")))
+        await queue.join()
+
+        assert queue.status("wallet").serialize()["state"] == SETUP_FAILED
+        assert queue.status("wallet").error == "no endorser"
+
+    async def test_concurrency_is_bounded(self):
+        queue = EndorserSetupQueue(concurrency=2)
+        running = 0
+        peak = 0
+
+        async def setup():
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+
+        for index in range(6):
+            queue.submit(f"wallet-{index}", setup)
+        await queue.join()
+
+        assert peak == 2
+
+    async def test_finished_statuses_are_trimmed(self):
+        queue = EndorserSetupQueue(max_statuses=2)
+
+        for index in range(3):
+            queue.submit(f"wallet-{index}", AsyncMock())
+            await queue.join()
+
+        assert list(queue.statuses) == ["wallet-1", "wallet-2"]
+
+    async def test_removed_wallet_is_forgotten(self):
+        queue = EndorserSetupQueue()
+        queue.submit("wallet", AsyncMock())
+        await queue.join()
+
+        await queue.on_wallet_event(
+            MagicMock(),
+            Event(f"{WALLET_EVENT_TOPIC_PREFIX}removed", {"wallet_id": "wallet"}),
+        )
+
+        assert queue.status("wallet") is None
+
+    async def test_shutdown_cancels_setups(self):
+        queue = EndorserSetupQueue()
+        queue.submit("wallet", asyncio.Event().wait)
+        await asyncio.sleep(0)
+
+        await queue.on_shutdown(MagicMock(), MagicMock())
+
+        assert queue.status("wallet").state == SETUP_FAILED
+        assert not queue.tasks
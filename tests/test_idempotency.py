@@ -0,0 +1,121 @@
+import asyncio
+import unittest
+from unittest.mock import AsyncMock, patch
+
+from acapy_agent.storage.base import BaseStorage
+from acapy_agent.storage.error import StorageError
+from acapy_agent.utils.testing import create_test_profile
+
+from acapy_wallet_groups_plugin.v1_0.idempotency import (
+    IdempotencyKeyInProgressError,
+    IdempotencyKeyMismatchError,
+    IdempotencyStore,
+)
+
+test_body = {"wallet_name": "wallet", "group_id": "group"}
+test_response = {"wallet_id": "wallet-id", "token": "token"}
+
+
+class TestIdempotencyStore(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.profile = await create_test_profile()
+        self.store = IdempotencyStore(ttl=60)
+
+    async def run_once(self, operation, key="key", body=test_body, store=None):
+        return await (store or self.store).run(
+            self.profile, "wallet_create", key, body, operation
+        )
+
+    async def test_response_is_replayed(self):
+        operation = AsyncMock(return_value=test_response)
+
+        assert await self.run_once(operation) == (test_response, False)
+        assert await self.run_once(operation) == (test_response, True)
+        assert await self.run_once(operation, key="other") == (test_response, False)
+        assert operation.await_count == 2
+
+    async def test_key_reused_for_other_body(self):
+        await self.run_once(AsyncMock(return_value=test_response))
+
+        with self.assertRaises(IdempotencyKeyMismatchError):
+            await self.run_once(AsyncMock(), body={"wallet_name": "other"})
+
+    async def test_concurrent_duplicates_wait(self):
+        release = asyncio.Event()
+
+        async def operation():
+            await release.wait()
+            return test_response
+
+        first = asyncio.create_task(self.run_once(operation))
+        second = asyncio.create_task(self.run_once(AsyncMock()))
+        await asyncio.sleep(0.01)
+        release.set()
+
+        assert await first == (test_response, False)
+        assert await second == (test_response, True)
+
+    async def test_in_progress_on_other_instance(self):
+        release = asyncio.Event()
+
+        async def operation():
+            await release.wait()
+            return test_response
+
+        first = asyncio.create_task(self.run_once(operation))
+        await asyncio.sleep(0.01)
+
+        with self.assertRaises(IdempotencyKeyInProgressError):
+            await self.run_once(AsyncMock(), store=IdempotencyStore(ttl=60))
+
+        release.set()
+        await first
+
+    async def test_failure_releases_key(self):
+        with self.assertRaises(ValueError):
+            await self.run_once(AsyncMock(side_effect=ValueError()))
+
+        operation = AsyncMock(return_value=test_response)
+        assert await self.run_once(operation) == (test_response, False)
+
+    async def test_store_retried(self):
+        async with self.profile.session() as session:
+            storage_class = type(session.inject(BaseStorage))
+        update_record = storage_class.update_record
+        failures = [StorageError()]
+
+        async def fail_once(storage, *args):
+            if failures:
+                raise failures.pop()
+            await update_record(storage, *args)
+
+        operation = AsyncMock(return_value=test_response)
+        with patch.object(storage_class, "update_record", fail_once):
+            assert await self.run_once(operation) == (test_response, False)
+
+        assert await self.run_once(operation) == (test_response, True)
+        assert operation.await_count == 1
+
+    async def test_store_failure_keeps_key(self):
+        async with self.profile.session() as session:
+            storage_class = type(session.inject(BaseStorage))
+        operation = AsyncMock(return_value=test_response)
+
+        with patch.object(
+            storage_class, "update_record", AsyncMock(side_effect=StorageError())
+        ):
+            assert await self.run_once(operation) == (test_response, False)
+
+        # The wallet was provisioned, a retry must not provision another one
+        with self.assertRaises(IdempotencyKeyInProgressError):
+            await self.run_once(operation)
+        assert operation.await_count == 1
+
+    async def test_expired_response_is_not_replayed(self):
+        self.store = IdempotencyStore(ttl=0)
+        operation = AsyncMock(return_value=test_response)
+
+        await self.run_once(operation)
+        await self.run_once(operation)
+
+        assert operation.await_count == 2
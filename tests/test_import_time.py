@@ -0,0 +1,55 @@
+"""Import time gate for the plugin.
+
+ACA-Py imports the plugin routes while the agent starts, so their import time
+adds to every cold start. The routes are imported in fresh interpreters with
+`python -X importtime`, see `benchmarks.bench_import`. Which modules get
+imported is checked on every run; the share of the import time spent in the
+plugin varies with the machine, so it is only checked when enabled.
+
+Environment variables:
+    WALLET_GROUPS_PERF: set to 1 to check the plugin's share of the import time
+"""
+
+import os
+import unittest
+
+from benchmarks.bench_import import import_times, measure_import, summarize
+
+ROUTES_MODULE = "acapy_wallet_groups_plugin.v1_0.routes"
+RUNS = 3
+# Largest share of the routes' import time spent in the plugin's own modules
+MAX_PLUGIN_SHARE = 0.25
+
+# Imported when their feature is enabled, or on first use. brotli is left out,
+# aiohttp imports it itself when it is installed
+DEFERRED_MODULES = [
+    "acapy_wallet_groups_plugin.v1_0.endorser_setup",
+    "acapy_wallet_groups_plugin.v1_0.invalidation",
+    "acapy_wallet_groups_plugin.v1_0.reconciler",
+    "acapy_wallet_groups_plugin.v1_0.sharding",
+    "acapy_wallet_groups_plugin.v1_0.warmup",
+    "asyncpg",
+    "cProfile",
+    "zstandard",
+]
+
+
+class TestImportTime(unittest.TestCase):
+    def test_optional_modules_deferred(self):
+        imported = import_times(f"import {ROUTES_MODULE}")
+
+        assert ROUTES_MODULE in imported
+        assert [name for name in DEFERRED_MODULES if name in imported] == []
+
+    @unittest.skipUnless(
+        os.environ.get("WALLET_GROUPS_PERF") == "1", "set WALLET_GROUPS_PERF=1 to run"
+    )
+    def test_plugin_share_of_import_time(self):
+        # The first import writes the bytecode caches
+        measure_import(ROUTES_MODULE)
+        summary = summarize([measure_import(ROUTES_MODULE) for _ in range(RUNS)])
+
+        assert summary["plugin_share"] <= MAX_PLUGIN_SHARE, (
+            "The plugin's own modules took {plugin_ms:.1f}ms of {total_ms:.1f}ms "
+            "importing the routes ({plugin_share:.0%})".format(**summary)
+        )
@@ -0,0 +1,127 @@
+import unittest
+from unittest.mock import AsyncMock, MagicMock
+
+from acapy_agent.core.event_bus import Event
+from acapy_agent.multitenant.base import BaseMultitenantManager
+from acapy_agent.utils.testing import create_test_profile
+from acapy_agent.wallet.models.wallet_record import WalletRecord
+
+from acapy_wallet_groups_plugin.v1_0.cache import GroupAwareProfileCache
+from acapy_wallet_groups_plugin.v1_0.events import WALLET_EVENT_TOPIC_PREFIX
+from acapy_wallet_groups_plugin.v1_0.invalidation import (
+    InMemoryInvalidationBackend,
+    InvalidationBus,
+    StorageInvalidationBackend,
+)
+
+test_wallet_id = "test-wallet-id"
+updated_topic = f"{WALLET_EVENT_TOPIC_PREFIX}updated"
+removed_topic = f"{WALLET_EVENT_TOPIC_PREFIX}removed"
+
+
+def wallet_event(topic, group_id="new-group"):
+    return Event(
+        topic,
+        {
+            "wallet_id": test_wallet_id,
+            "group_id": group_id,
+            "previous_group_id": "old-group",
+        },
+    )
+
+
+class TestInvalidationBus(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        hub = []
+        self.profile = await create_test_profile()
+        self.other_profile = await create_test_profile()
+        self.other_profile.notify = AsyncMock()
+
+        self.bus = InvalidationBus(InMemoryInvalidationBackend(hub), "node-a")
+        self.other_bus = InvalidationBus(InMemoryInvalidationBackend(hub), "node-b")
+        await self.bus.on_startup(self.profile, None)
+        await self.other_bus.on_startup(self.other_profile, None)
+
+        # The wallet profile held open by the other instance
+        self.cache = GroupAwareProfileCache(10)
+        self.wallet_profile = MagicMock(settings={"wallet.group_id": "old-group"})
+        self.cache.put(test_wallet_id, self.wallet_profile)
+        multitenant_mgr = MagicMock(BaseMultitenantManager, _profiles=self.cache)
+        self.other_profile.context.injector.bind_instance(
+            BaseMultitenantManager, multitenant_mgr
+        )
+
+        async with self.other_profile.session() as session:
+            await WalletRecord(
+                wallet_id=test_wallet_id,
+                new_with_id=True,
+                key_management_mode=WalletRecord.MODE_MANAGED,
+                settings={"wallet.group_id": "new-group"},
+                group_id="new-group",
+            ).save(session)
+
+    async def test_update_refreshes_profile_of_other_instance(self):
+        await self.bus.on_wallet_event(self.profile, wallet_event(updated_topic))
+
+        assert self.wallet_profile.settings["wallet.group_id"] == "new-group"
+        assert self.cache._groups[test_wallet_id] == "new-group"
+        self.other_profile.notify.assert_awaited_once_with(
+            updated_topic,
+            {
+                "wallet_id": test_wallet_id,
+                "group_id": "new-group",
+                "previous_group_id": "old-group",
+                "origin": "node-a",
+            },
+        )
+
+    async def test_remove_evicts_profile_of_other_instance(self):
+        await self.bus.on_wallet_event(self.profile, wallet_event(removed_topic))
+
+        assert not self.cache.has(test_wallet_id)
+        self.other_profile.notify.assert_awaited_once()
+
+    async def test_replayed_events_are_not_published_again(self):
+        self.other_bus.backend.publish = AsyncMock()
+        event = wallet_event(updated_topic)
+        event.payload["origin"] = "node-a"
+
+        await self.other_bus.on_wallet_event(self.other_profile, event)
+
+        self.other_bus.backend.publish.assert_not_called()
+
+    async def test_shutdown_leaves_hub(self):
+        await self.other_bus.on_shutdown(self.other_profile, None)
+
+        await self.bus.on_wallet_event(self.profile, wallet_event(updated_topic))
+
+        self.other_profile.notify.assert_not_called()
+
+
+class TestStorageInvalidationBackend(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.profile = await create_test_profile()
+        self.received = []
+
+        async def handler(message):
+            self.received.append(message)
+
+        self.publisher = StorageInvalidationBackend(poll_interval=60)
+        self.subscriber = StorageInvalidationBackend(poll_interval=60)
+        await self.publisher.start(self.profile, AsyncMock())
+        await self.subscriber.start(self.profile, handler)
+
+    async def asyncTearDown(self):
+        await self.publisher.stop()
+        await self.subscriber.stop()
+
+    async def test_poll_delivers_each_message_once(self):
+        await self.publisher.publish({"origin": "node-a", "topic": updated_topic})
+        await self.publisher.publish({"origin": "node-a", "topic": removed_topic})
+
+        assert await self.subscriber.poll() == 2
+        assert [message["topic"] for message in self.received] == [
+            updated_topic,
+            removed_topic,
+        ]
+        assert await self.subscriber.poll() == 0
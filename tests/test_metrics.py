@@ -0,0 +1,82 @@
+import unittest
+
+from acapy_agent.utils.testing import create_test_profile
+from acapy_agent.wallet.models.wallet_record import WalletRecord
+from aiohttp import web
+
+import acapy_wallet_groups_plugin.v1_0.metrics as test_module
+from acapy_wallet_groups_plugin.v1_0.metrics import (
+    Counter,
+    Histogram,
+    WalletGroupsMetrics,
+    instrumented,
+)
+
+
+class TestMetrics(unittest.IsolatedAsyncioTestCase):
+    def test_histogram_buckets_are_cumulative(self):
+        histogram = Histogram("latency", "Latency.", ["route"], buckets=(0.1, 1))
+        histogram.observe("list", value=0.05)
+        histogram.observe("list", value=0.5)
+        histogram.observe("list", value=5)
+
+        lines = histogram.render()
+
+        assert 'latency_bucket{route="list",le="0.1"} 1' in lines
+        assert 'latency_bucket{route="list",le="1"} 2' in lines
+        assert 'latency_bucket{route="list",le="+Inf"} 3' in lines
+        assert 'latency_count{route="list"} 3' in lines
+        assert 'latency_sum{route="list"} 5.55' in lines
+        assert "# TYPE latency histogram" in lines
+
+    def test_counter_escapes_labels(self):
+        counter = Counter("errors_total", "Errors.", ["exception"])
+        counter.inc('Bad"Error')
+        counter.inc('Bad"Error', amount=2)
+
+        assert counter.render() == [
+            "# HELP errors_total Errors.",
+            "# TYPE errors_total counter",
+            'errors_total{exception="Bad\\"Error"} 3',
+        ]
+
+    async def test_instrumented_counts_errors(self):
+        metrics = WalletGroupsMetrics()
+        test_module.METRICS, original = metrics, test_module.METRICS
+
+        @instrumented
+        async def failing_route(request):
+            raise web.HTTPNotFound()
+
+        @instrumented
+        async def not_modified_route(request):
+            raise web.HTTPNotModified()
+
+        try:
+            with self.assertRaises(web.HTTPNotFound):
+                await failing_route(None)
+            with self.assertRaises(web.HTTPNotModified):
+                await not_modified_route(None)
+        finally:
+            test_module.METRICS = original
+
+        assert metrics.errors.values == {("failing_route", "HTTPNotFound"): 1}
+        assert ("failing_route",) in metrics.request_duration.values
+        assert ("not_modified_route",) in metrics.request_duration.values
+        assert failing_route.__name__ == "failing_route"
+
+    async def test_refresh_group_wallets(self):
+        profile = await create_test_profile()
+        metrics = WalletGroupsMetrics()
+        async with profile.session() as session:
+            for group_id in ("a", "a", "b", None):
+                await WalletRecord(
+                    key_management_mode=WalletRecord.MODE_MANAGED,
+                    settings={},
+                    group_id=group_id,
+                ).save(session)
+
+        await metrics.refresh_group_wallets(profile, max_age=60)
+
+        assert metrics.group_wallets.values == {("a",): 2, ("b",): 1}
+        assert 'wallet_groups_wallets{group_id="a"} 2' in metrics.render()
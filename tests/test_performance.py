@@ -0,0 +1,141 @@
+"""Performance regression gate for the hot route paths.
+
+Each route benchmark is normalized by the raw storage operation it is built
+on, measured in the same run, so the committed baseline holds the plugin's
+overhead on top of storage rather than machine dependent timings. The ratios
+still vary between runs and machines, hence the generous default tolerance.
+
+Environment variables:
+    WALLET_GROUPS_PERF_TOLERANCE: allowed slowdown as a fraction (default 1.0)
+    WALLET_GROUPS_PERF_UPDATE_BASELINE: set to 1 to record the baseline
+"""
+
+import json
+import os
+import time
+import unittest
+from pathlib import Path
+
+from acapy_agent.storage.base import BaseStorage
+from acapy_agent.storage.record import StorageRecord
+from acapy_agent.wallet.models.wallet_record import WalletRecord
+
+from benchmarks.bench_routes import (
+    bench_wallet_create,
+    bench_wallet_get,
+    bench_wallets_list,
+)
+from benchmarks.compare import compare
+from benchmarks.harness import create_bench_profile, group_name, measure, seed_wallets
+
+BASELINE_PATH = Path(__file__).parent / "perf_baseline.json"
+SEED_WALLETS = 2000
+SEED_GROUPS = 20
+ITERATIONS = 50
+
+UPDATE_BASELINE = os.environ.get("WALLET_GROUPS_PERF_UPDATE_BASELINE") == "1"
+
+
+class TestPerformanceRegression(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.profile = await create_bench_profile()
+        self.wallet_ids = await seed_wallets(self.profile, SEED_WALLETS, SEED_GROUPS)
+
+    async def asyncTearDown(self):
+        await self.profile.close()
+
+    async def raw_list(self) -> dict:
+        async def operation(_: int):
+            async with self.profile.session() as session:
+                await session.inject(BaseStorage).find_paginated_records(
+                    WalletRecord.RECORD_TYPE, {"group_id": group_name(0)}, limit=100
+                )
+
+        return await measure(operation, ITERATIONS)
+
+    async def raw_get(self) -> dict:
+        async def operation(iteration: int):
+            async with self.profile.session() as session:
+                await session.inject(BaseStorage).get_record(
+                    WalletRecord.RECORD_TYPE,
+                    self.wallet_ids[(iteration * 7919) % len(self.wallet_ids)],
+                )
+
+        return await measure(operation, ITERATIONS)
+
+    async def raw_create(self) -> dict:
+        run_id = time.monotonic_ns()
+
+        async def operation(iteration: int):
+            async with self.profile.session() as session:
+                await session.inject(BaseStorage).add_record(
+                    StorageRecord(
+                        "perf_reference",
+                        json.dumps({"settings": {"wallet.name": str(iteration)}}),
+                        {"group_id": group_name(0)},
+                        f"{run_id}-{iteration}",
+                    )
+                )
+
+        return await measure(operation, ITERATIONS)
+
+    async def run_benchmarks(self) -> dict:
+        cases = {
+            "wallets_list[group_id,limit=100]": (
+                bench_wallets_list(self.profile, ITERATIONS, 100, group_name(0)),
+                self.raw_list(),
+            ),
+            "wallet_get": (
+                bench_wallet_get(self.profile, ITERATIONS, self.wallet_ids),
+                self.raw_get(),
+            ),
+            "wallet_create[group_id]": (
+                bench_wallet_create(self.profile, ITERATIONS, SEED_GROUPS),
+                self.raw_create(),
+            ),
+        }
+
+        results = {}
+        for name, (route, reference) in cases.items():
+            route_stats = await route
+            reference_stats = await reference
+            results[name] = {
+                "ratio": round(route_stats["p50_ms"] / reference_stats["p50_ms"], 3),
+                "p50_ms": route_stats["p50_ms"],
+                "reference_p50_ms": reference_stats["p50_ms"],
+            }
+        return results
+
+    async def test_hot_paths_within_baseline(self):
+        results = await self.run_benchmarks()
+
+        if UPDATE_BASELINE:
+            BASELINE_PATH.write_text(
+                json.dumps(
+                    {
+                        "seed_wallets": SEED_WALLETS,
+                        "benchmarks": {
+                            name: {"ratio": result["ratio"]}
+                            for name, result in results.items()
+                        },
+                    },
+                    indent=2,
+                )
+                + "\n"
+            )
+            self.skipTest(f"Baseline written to {BASELINE_PATH}")
+
+        baseline = json.loads(BASELINE_PATH.read_text())["benchmarks"]
+        tolerance = float(os.environ.get("WALLET_GROUPS_PERF_TOLERANCE", "1.0"))
+
+        lines, regressions = compare(
+            {(name, SEED_WALLETS): values for name, values in baseline.items()},
+            {(name, SEED_WALLETS): values for name, values in results.items()},
+            metric="ratio",
+            threshold=tolerance,
+        )
+
+        assert not regressions, (
+            "Hot path regressed beyond {:.0%} of the baseline (ratio of route "
+            "p50 to raw storage p50):\n{}".format(tolerance, "\n".join(lines))
+        )
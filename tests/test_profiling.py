@@ -0,0 +1,87 @@
+import asyncio
+import marshal
+import os
+import tempfile
+import unittest
+from unittest.mock import MagicMock
+
+from acapy_agent.utils.testing import create_test_profile
+from aiohttp import web
+
+from acapy_wallet_groups_plugin.v1_0.config import WalletGroupsConfig
+from acapy_wallet_groups_plugin.v1_0.profiling import PROFILE_CONTENT_TYPE, profiled
+
+
+@profiled
+async def handler(request):
+    return web.json_response({"results": [index for index in range(100)]})
+
+
+@profiled
+async def slow_handler(request):
+    await asyncio.sleep(0.01)
+    return web.json_response({})
+
+
+class TestProfiling(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.profile = await create_test_profile()
+        context = MagicMock(profile=self.profile)
+        self.request = MagicMock(
+            method="GET", headers={"X-Profile": "1"}, __getitem__=lambda _, k: context
+        )
+
+    def bind_config(self, **kwargs):
+        self.profile.context.injector.bind_instance(
+            WalletGroupsConfig, WalletGroupsConfig(**kwargs)
+        )
+
+    async def test_header_ignored_when_disabled(self):
+        response = await handler(self.request)
+
+        assert response.content_type == "application/json"
+
+    async def test_profile_returned_as_attachment(self):
+        self.bind_config(request_profiling=True)
+
+        response = await handler(self.request)
+
+        assert response.content_type == "application/octet-stream"
+        assert 'filename="handler-' in response.headers["Content-Disposition"]
+        assert response.headers["X-Profile-Status"] == "200"
+        assert isinstance(marshal.loads(response.body), dict)
+
+    async def test_profile_written_to_directory(self):
+        with tempfile.TemporaryDirectory() as directory:
+            self.bind_config(request_profiling=True, request_profiling_dir=directory)
+
+            response = await handler(self.request)
+
+            assert response.content_type == "application/json"
+            assert os.listdir(directory) == [response.headers["X-Profile-File"]]
+
+    async def test_concurrent_profiles_refused(self):
+        self.bind_config(request_profiling=True)
+
+        first = asyncio.ensure_future(slow_handler(self.request))
+        await asyncio.sleep(0)
+        with self.assertRaises(web.HTTPConflict):
+            await handler(self.request)
+
+        assert (await first).content_type == "application/octet-stream"
+        # The next request is profiled again
+        assert (await handler(self.request)).content_type == PROFILE_CONTENT_TYPE
+
+    async def test_changes_only_profiled_to_directory(self):
+        self.bind_config(request_profiling=True)
+        self.request.method = "POST"
+
+        with self.assertRaises(web.HTTPBadRequest):
+            await handler(self.request)
+
+        with tempfile.TemporaryDirectory() as directory:
+            self.bind_config(request_profiling=True, request_profiling_dir=directory)
+
+            response = await handler(self.request)
+
+            assert response.content_type == "application/json"
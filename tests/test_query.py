@@ -0,0 +1,107 @@
+import asyncio
+import unittest
+
+from acapy_agent.utils.testing import create_test_profile
+from acapy_agent.wallet.models.wallet_record import WalletRecord
+
+import acapy_wallet_groups_plugin.v1_0  # noqa: F401 - patches WalletRecord group_id
+from acapy_wallet_groups_plugin.v1_0.query import (
+    QueryTimeoutError,
+    iter_wallet_records,
+    query_until_deadline,
+    run_query,
+)
+
+test_group_id = "test-group-id"
+
+
+class TestIterWalletRecords(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.profile = await create_test_profile()
+
+        async with self.profile.session() as session:
+            for index in range(5):
+                await WalletRecord(
+                    wallet_id=f"wallet-{index}",
+                    new_with_id=True,
+                    key_management_mode=WalletRecord.MODE_MANAGED,
+                    settings={"wallet.name": f"wallet-{index}"},
+                    group_id=test_group_id,
+                ).save(session)
+            await WalletRecord(
+                wallet_id="other",
+                new_with_id=True,
+                key_management_mode=WalletRecord.MODE_MANAGED,
+                settings={"wallet.name": "other"},
+                group_id="other-group-id",
+            ).save(session)
+
+    async def test_iter_wallet_records_pages(self):
+        pages = [
+            page
+            async for page in iter_wallet_records(
+                self.profile, {"group_id": test_group_id}, page_size=2
+            )
+        ]
+
+        assert [len(page) for page in pages] == [2, 2, 1]
+        assert {record.wallet_id for page in pages for record in page} == {
+            f"wallet-{index}" for index in range(5)
+        }
+
+    async def test_iter_wallet_records_no_match(self):
+        pages = [
+            page
+            async for page in iter_wallet_records(
+                self.profile, {"group_id": "unknown"}, page_size=2
+            )
+        ]
+
+        assert pages == []
+
+
+class TestQueryDeadlines(unittest.IsolatedAsyncioTestCase):
+    async def test_run_query(self):
+        async def query():
+            return ["record"]
+
+        assert await run_query(query(), 0) == ["record"]
+        assert await run_query(query(), 1) == ["record"]
+
+    async def test_run_query_cancelled_at_deadline(self):
+        cancelled = asyncio.Event()
+
+        async def query():
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        with self.assertRaises(QueryTimeoutError):
+            await run_query(query(), 0.01)
+        assert cancelled.is_set()
+
+    async def test_query_until_deadline(self):
+        calls = []
+
+        async def fetch(limit: int, offset: int):
+            calls.append((limit, offset))
+            if len(calls) > 2:
+                await asyncio.sleep(10)
+            return list(range(offset, offset + limit))
+
+        records, partial = await query_until_deadline(fetch, 10, 5, 0.05, 3)
+
+        assert partial
+        assert records == [5, 6, 7, 8, 9, 10]
+        assert calls == [(3, 5), (3, 8), (3, 11)]
+
+    async def test_query_until_deadline_complete(self):
+        async def fetch(limit: int, offset: int):
+            return list(range(offset, min(offset + limit, 7)))
+
+        records, partial = await query_until_deadline(fetch, 10, 0, 1, 3)
+
+        assert not partial
+        assert records == list(range(7))
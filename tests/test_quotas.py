@@ -0,0 +1,91 @@
+import asyncio
+import unittest
+
+from acapy_agent.utils.testing import create_test_profile
+from acapy_agent.wallet.models.wallet_record import WalletRecord
+
+from acapy_wallet_groups_plugin.v1_0.quotas import (
+    GroupQuotaExceededError,
+    GroupQuotas,
+    group_move_slot,
+    group_slot,
+    release_group_slot,
+)
+
+test_group_id = "test-group-id"
+
+
+class TestGroupQuotas(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.profile = await create_test_profile()
+        self.quotas = GroupQuotas({test_group_id: 3}, default_quota=0)
+        self.profile.context.injector.bind_instance(GroupQuotas, self.quotas)
+
+        async with self.profile.session() as session:
+            await WalletRecord(
+                wallet_id="existing",
+                new_with_id=True,
+                key_management_mode=WalletRecord.MODE_MANAGED,
+                settings={},
+                group_id=test_group_id,
+            ).save(session)
+
+    async def test_counter_starts_from_existing_wallets(self):
+        assert await self.quotas.count(self.profile, test_group_id) == 1
+        assert await self.quotas.reserve(self.profile, test_group_id) == 2
+        assert await self.quotas.reserve(self.profile, test_group_id) == 3
+
+        with self.assertRaises(GroupQuotaExceededError):
+            await self.quotas.reserve(self.profile, test_group_id)
+
+        assert await self.quotas.release(self.profile, test_group_id) == 2
+        assert await self.quotas.count(self.profile, test_group_id) == 2
+
+    async def test_concurrent_reservations_respect_quota(self):
+        results = await asyncio.gather(
+            *(self.quotas.reserve(self.profile, test_group_id) for _ in range(5)),
+            return_exceptions=True,
+        )
+
+        assert sorted(result for result in results if isinstance(result, int)) == [
+            2,
+            3,
+        ]
+        assert await self.quotas.count(self.profile, test_group_id) == 3
+
+    async def test_unlimited_group_is_counted(self):
+        assert self.quotas.limit("other") is None
+
+        for _ in range(5):
+            await self.quotas.reserve(self.profile, "other")
+
+        assert await self.quotas.count(self.profile, "other") == 5
+
+    async def test_release_initializes_counter_from_remaining_wallets(self):
+        await release_group_slot(self.profile, test_group_id)
+
+        assert await self.quotas.count(self.profile, test_group_id) == 1
+
+    async def test_group_slot_released_on_failure(self):
+        with self.assertRaises(ValueError):
+            async with group_slot(self.profile, test_group_id):
+                raise ValueError()
+
+        assert await self.quotas.count(self.profile, test_group_id) == 1
+
+        async with group_slot(self.profile, test_group_id):
+            pass
+
+        assert await self.quotas.count(self.profile, test_group_id) == 2
+
+    async def test_group_move_slot(self):
+        await self.quotas.reserve(self.profile, "other")
+
+        async with group_move_slot(self.profile, "existing", "other"):
+            async with self.profile.session() as session:
+                wallet_record = await WalletRecord.retrieve_by_id(session, "existing")
+                wallet_record.group_id = "other"
+                await wallet_record.save(session)
+
+        assert await self.quotas.count(self.profile, "other") == 2
+        assert await self.quotas.count(self.profile, test_group_id) == 0
@@ -0,0 +1,144 @@
+import asyncio
+import unittest
+
+from acapy_agent.utils.testing import create_test_profile
+from acapy_agent.wallet.models.wallet_record import WalletRecord
+
+import acapy_wallet_groups_plugin.v1_0  # noqa: F401 - patches WalletRecord group_id
+from acapy_wallet_groups_plugin.v1_0 import reconciler as test_module
+from acapy_wallet_groups_plugin.v1_0.events import WALLET_EVENT_TOPIC_PREFIX
+from acapy_wallet_groups_plugin.v1_0.quotas import GroupQuotas
+
+test_group_id = "test-group-id"
+other_group_id = "other-group-id"
+
+
+class TestGroupReconciler(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.profile = await create_test_profile()
+        self.reconciler = test_module.GroupReconciler(batch_size=2)
+        self.events = []
+
+        async def notify(topic, payload):
+            self.events.append((topic, payload))
+
+        self.profile.notify = notify
+
+        async with self.profile.session() as session:
+            for wallet_id, setting, tag in (
+                ("wallet-0", test_group_id, test_group_id),
+                ("wallet-1", test_group_id, other_group_id),
+                ("wallet-2", None, other_group_id),
+                ("wallet-3", test_group_id, None),
+                ("wallet-4", None, None),
+            ):
+                settings = {"wallet.group_id": setting} if setting else {}
+                await WalletRecord(
+                    wallet_id=wallet_id,
+                    new_with_id=True,
+                    key_management_mode=WalletRecord.MODE_MANAGED,
+                    settings=settings,
+                    group_id=tag,
+                ).save(session)
+
+    async def groups(self):
+        async with self.profile.session() as session:
+            records = await WalletRecord.query(session)
+        return {
+            record.wallet_id: (record.group_id, record.settings.get("wallet.group_id"))
+            for record in records
+        }
+
+    async def reconcile_pass(self):
+        results = [await self.reconciler.reconcile_batch(self.profile)]
+        while not results[-1].completed:
+            results.append(await self.reconciler.reconcile_batch(self.profile))
+        return results
+
+    async def test_repairs_drift(self):
+        results = await self.reconcile_pass()
+
+        assert [result.scanned for result in results] == [2, 2, 1]
+        assert {
+            wallet_id: drift_field
+            for result in results
+            for wallet_id, drift_field in result.repaired.items()
+        } == {"wallet-1": "tag", "wallet-2": "setting", "wallet-3": "tag"}
+        assert await self.groups() == {
+            "wallet-0": (test_group_id, test_group_id),
+            "wallet-1": (test_group_id, test_group_id),
+            "wallet-2": (other_group_id, other_group_id),
+            "wallet-3": (test_group_id, test_group_id),
+            "wallet-4": (None, None),
+        }
+        assert [
+            (payload["wallet_id"], payload["group_id"], payload["previous_group_id"])
+            for topic, payload in self.events
+            if topic == f"{WALLET_EVENT_TOPIC_PREFIX}updated"
+        ] == [
+            ("wallet-1", test_group_id, other_group_id),
+            ("wallet-2", other_group_id, other_group_id),
+            ("wallet-3", test_group_id, None),
+        ]
+
+        cursor = await self.reconciler.load_cursor(self.profile)
+        assert cursor.offset == 0
+        assert cursor.completed_at
+        assert test_module.METRICS.reconciler_pass_drift.values[()] == 3
+
+        # A second pass finds nothing left to repair
+        results = await self.reconcile_pass()
+        assert not any(result.drifted for result in results)
+
+    async def test_resumes_from_persisted_cursor(self):
+        await self.reconciler.reconcile_batch(self.profile)
+
+        reconciler = test_module.GroupReconciler(batch_size=2)
+        cursor = await reconciler.load_cursor(self.profile)
+        result = await reconciler.reconcile_batch(self.profile)
+
+        assert cursor.offset == 2
+        assert cursor.drift == 1
+        assert set(result.repaired) == {"wallet-2", "wallet-3"}
+
+    async def test_batch_reconciled_elsewhere_is_skipped(self):
+        cursor = await self.reconciler.load_cursor(self.profile)
+        await test_module.GroupReconciler(batch_size=2).reconcile_batch(self.profile)
+
+        result = await self.reconciler.reconcile_batch(self.profile, cursor)
+
+        assert not result.scanned
+        assert (await self.reconciler.load_cursor(self.profile)).offset == 2
+
+    async def test_repair_updates_group_counters(self):
+        quotas = GroupQuotas({test_group_id: 1})
+        self.profile.context.injector.bind_instance(GroupQuotas, quotas)
+        assert await quotas.count(self.profile, test_group_id) == 1
+        assert await quotas.count(self.profile, other_group_id) == 2
+
+        await self.reconcile_pass()
+
+        # Wallets already in a full group are counted, not refused
+        assert await quotas.count(self.profile, test_group_id) == 3
+        assert await quotas.count(self.profile, other_group_id) == 1
+
+    async def test_run_survives_unexpected_errors(self):
+        reconciler = test_module.GroupReconciler(interval=0, batch_size=2)
+        calls = []
+
+        async def reconcile_batch(profile, cursor=None):
+            calls.append(cursor)
+            if len(calls) == 1:
+                raise ValueError("Wallet record cannot be loaded")
+            return test_module.ReconcileResult()
+
+        reconciler.reconcile_batch = reconcile_batch
+        await reconciler.on_startup(self.profile, None)
+        task = reconciler.task
+        while len(calls) < 3:
+            await asyncio.sleep(0.01)
+
+        assert not task.done()
+        await reconciler.on_shutdown(self.profile, None)
+        with self.assertRaises(asyncio.CancelledError):
+            await task
@@ -0,0 +1,120 @@
+import unittest
+
+from acapy_agent.utils.testing import create_test_profile
+from acapy_agent.wallet.models.wallet_record import WalletRecord
+
+from acapy_wallet_groups_plugin.v1_0.events import WALLET_EVENT_TOPIC_PREFIX
+from acapy_wallet_groups_plugin.v1_0.quotas import (
+    GroupQuotaExceededError,
+    GroupQuotas,
+)
+from acapy_wallet_groups_plugin.v1_0.regroup import move_wallets
+
+source_group_id = "source-group-id"
+target_group_id = "target-group-id"
+
+
+class TestMoveWallets(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.profile = await create_test_profile()
+        self.events = []
+
+        async def notify(topic, payload):
+            self.events.append((topic, payload))
+
+        self.profile.notify = notify
+
+        async with self.profile.session() as session:
+            for index in range(5):
+                await WalletRecord(
+                    wallet_id=f"wallet-{index}",
+                    new_with_id=True,
+                    key_management_mode=WalletRecord.MODE_MANAGED,
+                    settings={"wallet.group_id": source_group_id},
+                    group_id=source_group_id,
+                ).save(session)
+
+    async def group_wallets(self, group_id):
+        async with self.profile.session() as session:
+            records = await WalletRecord.query(session, {"group_id": group_id})
+        return sorted(record.wallet_id for record in records)
+
+    async def test_move_source_group_in_chunks(self):
+        progress = [
+            progress.serialize()
+            async for progress in move_wallets(
+                self.profile,
+                target_group_id,
+                source_group_id=source_group_id,
+                chunk_size=2,
+            )
+        ]
+
+        assert [len(line["moved"]) for line in progress] == [2, 2, 1]
+        assert progress[-1]["total_moved"] == 5
+        assert await self.group_wallets(source_group_id) == []
+        assert len(await self.group_wallets(target_group_id)) == 5
+
+        async with self.profile.session() as session:
+            wallet_record = await WalletRecord.retrieve_by_id(session, "wallet-0")
+        assert wallet_record.settings["wallet.group_id"] == target_group_id
+
+        assert len(self.events) == 5
+        topic, payload = self.events[0]
+        assert topic == f"{WALLET_EVENT_TOPIC_PREFIX}updated"
+        assert payload["group_id"] == target_group_id
+        assert payload["previous_group_id"] == source_group_id
+
+    async def test_move_wallet_ids_reports_missing(self):
+        progress = [
+            progress.serialize()
+            async for progress in move_wallets(
+                self.profile,
+                target_group_id,
+                wallet_ids=["wallet-1", "unknown", "wallet-1"],
+            )
+        ]
+
+        assert progress == [
+            {
+                "moved": ["wallet-1"],
+                "errors": [{"wallet_id": "unknown", "error": "Wallet not found"}],
+                "total_moved": 1,
+                "total_failed": 1,
+            }
+        ]
+        assert await self.group_wallets(target_group_id) == ["wallet-1"]
+
+    async def test_move_updates_group_counters(self):
+        quotas = GroupQuotas({target_group_id: 3})
+        self.profile.context.injector.bind_instance(GroupQuotas, quotas)
+
+        progress = [
+            progress
+            async for progress in move_wallets(
+                self.profile, target_group_id, wallet_ids=["wallet-0", "wallet-1"]
+            )
+        ]
+
+        assert progress[-1].total_moved == 2
+        assert await quotas.count(self.profile, target_group_id) == 2
+        assert await quotas.count(self.profile, source_group_id) == 3
+
+    async def test_move_stops_at_quota(self):
+        quotas = GroupQuotas({target_group_id: 3})
+        self.profile.context.injector.bind_instance(GroupQuotas, quotas)
+
+        moved = []
+        with self.assertRaises(GroupQuotaExceededError):
+            async for progress in move_wallets(
+                self.profile,
+                target_group_id,
+                source_group_id=source_group_id,
+                chunk_size=2,
+            ):
+                moved.extend(progress.moved)
+
+        # The second chunk is rolled back as a whole
+        assert len(moved) == 2
+        assert await self.group_wallets(target_group_id) == sorted(moved)
+        assert await quotas.count(self.profile, target_group_id) == 2
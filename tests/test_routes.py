@@ -1,3 +1,5 @@
+import asyncio
+import json
 import unittest
 from unittest.mock import AsyncMock, MagicMock, patch
 
@@ -11,6 +13,21 @@ from acapy_agent.wallet.models.wallet_record import WalletRecord
 from marshmallow.exceptions import ValidationError
 
 import acapy_wallet_groups_plugin.v1_0.routes as test_module
+from acapy_wallet_groups_plugin.v1_0.activity import ActivityTracker
+from acapy_wallet_groups_plugin.v1_0.change_feed import GroupChangeFeed
+from acapy_wallet_groups_plugin.v1_0.config import WalletGroupsConfig
+from acapy_wallet_groups_plugin.v1_0.endorser_setup import EndorserSetupQueue
+from acapy_wallet_groups_plugin.v1_0.idempotency import IdempotencyStore
+from acapy_wallet_groups_plugin.v1_0.quotas import GroupQuotaExceededError, GroupQuotas
+from acapy_wallet_groups_plugin.v1_0.regroup import MoveProgress
+from acapy_wallet_groups_plugin.v1_0.search import GroupSearchIndex
+from acapy_wallet_groups_plugin.v1_0.sharding import ShardRouter
+from acapy_wallet_groups_plugin.v1_0.snapshot import (
+    GroupSnapshots,
+    Snapshot,
+    SnapshotNotFoundError,
+)
+from acapy_wallet_groups_plugin.v1_0.tracing import InMemorySpanExporter, Tracer
 
 test_created_at = 1234567890
 test_group_id = "test-group-id"
@@ -130,6 +147,26 @@ class TestMultitenantRoutes(unittest.IsolatedAsyncioTestCase):
             with self.assertRaises(test_module.web.HTTPBadRequest):
                 await test_module.wallets_list(self.request)
 
+    async def test_wallets_list_not_modified(self):
+        wallets = [
+            MagicMock(wallet_id=f"wallet-{index}", updated_at=str(test_created_at))
+            for index in range(3)
+        ]
+        self.request.headers = {
+            "If-None-Match": f'"other", W/{test_module.wallet_records_etag(wallets)}'
+        }
+
+        with patch.object(
+            test_module, "WalletRecord", autospec=True
+        ) as mock_wallet_record:
+            mock_wallet_record.query = AsyncMock(return_value=wallets)
+
+            with self.assertRaises(test_module.web.HTTPNotModified):
+                await test_module.wallets_list(self.request)
+
+            for wallet in wallets:
+                wallet.serialize.assert_not_called()
+
     async def test_wallets_list_query(self):
         self.request.query = {"wallet_name": test_wallet_name}
 
@@ -167,6 +204,198 @@ class TestMultitenantRoutes(unittest.IsolatedAsyncioTestCase):
                 }
             )
 
+    async def test_wallets_list_sharded(self):
+        self.request.query = {"group_id": test_group_id}
+        wallet = MagicMock(
+            group_id=test_group_id,
+            updated_at=str(test_created_at),
+            serialize=MagicMock(
+                return_value={"wallet_id": test_wallet_id, "settings": {}}
+            ),
+        )
+        self.profile.context.injector.bind_instance(
+            WalletGroupsConfig, WalletGroupsConfig(shards={"a": {}})
+        )
+        shard_router = ShardRouter()
+        shard_router.ready = True
+        shard_router.query = AsyncMock(return_value=[wallet])
+        self.profile.context.injector.bind_instance(ShardRouter, shard_router)
+
+        with patch.object(
+            test_module, "WalletRecord", autospec=True
+        ) as mock_wallet_record, patch.object(
+            test_module.web, "json_response"
+        ) as mock_response:
+            mock_wallet_record.query = AsyncMock()
+
+            await test_module.wallets_list(self.request)
+
+            mock_wallet_record.query.assert_not_called()
+            shard_router.query.assert_awaited_once_with(
+                {"group_id": test_group_id}, 100, 0, "id", False
+            )
+            mock_response.assert_called_once_with(
+                {"results": [test_module.format_wallet_record(wallet)]}
+            )
+
+    async def test_wallets_list_search(self):
+        self.request.query = {"group_id": test_group_id, "q": "acme"}
+        wallet = MagicMock(
+            group_id=test_group_id,
+            updated_at=str(test_created_at),
+            serialize=MagicMock(
+                return_value={"wallet_id": test_wallet_id, "settings": {}}
+            ),
+        )
+        search_index = GroupSearchIndex()
+        search_index.query = AsyncMock(return_value=[wallet])
+        self.profile.context.injector.bind_instance(GroupSearchIndex, search_index)
+
+        with patch.object(
+            test_module, "WalletRecord", autospec=True
+        ) as mock_wallet_record, patch.object(
+            test_module.web, "json_response"
+        ) as mock_response:
+            mock_wallet_record.query = AsyncMock()
+
+            await test_module.wallets_list(self.request)
+
+            mock_wallet_record.query.assert_not_called()
+            search_index.query.assert_awaited_once_with(
+                self.profile, test_group_id, "acme", 100, 0, None
+            )
+            mock_response.assert_called_once_with(
+                {"results": [test_module.format_wallet_record(wallet)]}
+            )
+
+    async def test_wallets_list_search_requires_group(self):
+        self.profile.context.injector.bind_instance(
+            GroupSearchIndex, GroupSearchIndex()
+        )
+        self.request.query = {"q": "acme"}
+
+        with self.assertRaises(test_module.web.HTTPBadRequest):
+            await test_module.wallets_list(self.request)
+
+    async def test_wallets_list_snapshot(self):
+        self.request.query = {"snapshot_id": "test-snapshot", "offset": "200"}
+        wallet = MagicMock(
+            group_id=test_group_id,
+            updated_at=str(test_created_at),
+            serialize=MagicMock(
+                return_value={"wallet_id": test_wallet_id, "settings": {}}
+            ),
+        )
+        snapshots = GroupSnapshots(ttl=60)
+        snapshot = Snapshot(
+            "test-snapshot", test_group_id, 250, 1000, test_created_at, 1e12
+        )
+        snapshots.page = AsyncMock(return_value=(snapshot, [wallet]))
+        self.profile.context.injector.bind_instance(GroupSnapshots, snapshots)
+
+        with patch.object(
+            test_module, "WalletRecord", autospec=True
+        ) as mock_wallet_record, patch.object(
+            test_module.web, "json_response"
+        ) as mock_response:
+            mock_wallet_record.query = AsyncMock()
+
+            await test_module.wallets_list(self.request)
+
+            mock_wallet_record.query.assert_not_called()
+            snapshots.page.assert_awaited_once_with(
+                self.profile, "test-snapshot", 100, 200
+            )
+            mock_response.assert_called_once_with(
+                {
+                    "results": [test_module.format_wallet_record(wallet)],
+                    "snapshot_id": "test-snapshot",
+                    "count": 250,
+                }
+            )
+
+    async def test_wallets_list_snapshot_expired(self):
+        self.request.query = {"snapshot_id": "test-snapshot"}
+        snapshots = GroupSnapshots(ttl=60)
+        snapshots.page = AsyncMock(side_effect=SnapshotNotFoundError())
+        self.profile.context.injector.bind_instance(GroupSnapshots, snapshots)
+
+        with self.assertRaises(test_module.web.HTTPGone):
+            await test_module.wallets_list(self.request)
+
+    async def test_group_snapshot_create(self):
+        self.request.match_info = {"group_id": test_group_id}
+        snapshots = GroupSnapshots(ttl=60)
+        snapshot = Snapshot(
+            "test-snapshot", test_group_id, 250, 1000, test_created_at, 1e12
+        )
+        snapshots.create = AsyncMock(return_value=snapshot)
+        self.profile.context.injector.bind_instance(GroupSnapshots, snapshots)
+
+        with patch.object(test_module.web, "json_response") as mock_response:
+            await test_module.group_snapshot_create(self.request)
+
+            snapshots.create.assert_awaited_once_with(self.profile, test_group_id)
+            mock_response.assert_called_once_with(snapshot.serialize())
+
+    async def test_wallets_list_timeout(self):
+        self.profile.context.injector.bind_instance(
+            WalletGroupsConfig, WalletGroupsConfig(query_timeout=0.01)
+        )
+
+        async def slow_query(*args, **kwargs):
+            await asyncio.sleep(10)
+
+        with patch.object(
+            test_module, "WalletRecord", autospec=True
+        ) as mock_wallet_record:
+            mock_wallet_record.query = AsyncMock(side_effect=slow_query)
+
+            with self.assertRaises(test_module.web.HTTPGatewayTimeout):
+                await test_module.wallets_list(self.request)
+
+    async def test_wallets_list_allow_partial(self):
+        self.profile.context.injector.bind_instance(
+            WalletGroupsConfig,
+            WalletGroupsConfig(query_timeout=0.05, group_page_size=2),
+        )
+        self.request.query = {"allow_partial": "true", "limit": "5", "offset": "10"}
+        wallets = [
+            MagicMock(
+                group_id=test_group_id,
+                serialize=MagicMock(
+                    return_value={"wallet_id": f"wallet-{index}", "settings": {}}
+                ),
+            )
+            for index in range(2)
+        ]
+
+        async def query(*args, offset, **kwargs):
+            if offset > 10:
+                await asyncio.sleep(10)
+            return wallets
+
+        with patch.object(
+            test_module, "WalletRecord", autospec=True
+        ) as mock_wallet_record, patch.object(
+            test_module.web, "json_response"
+        ) as mock_response:
+            mock_wallet_record.query = AsyncMock(side_effect=query)
+            mock_response.return_value = MagicMock(headers={})
+
+            result = await test_module.wallets_list(self.request)
+
+            mock_response.assert_called_once_with(
+                {
+                    "results": [
+                        test_module.format_wallet_record(wallet) for wallet in wallets
+                    ],
+                    "partial": True,
+                    "next_offset": 12,
+                }
+            )
+            assert "ETag" not in result.headers
+
     async def test_wallet_create_tenant_settings(self):
         body = {
             "wallet_name": "test",
@@ -293,6 +522,154 @@ class TestMultitenantRoutes(unittest.IsolatedAsyncioTestCase):
             assert mock_multitenant_mgr.get_wallet_profile.called
             assert test_module.attempt_auto_author_with_endorser_setup.called
 
+    async def test_wallet_create_traces_steps(self):
+        body = {"wallet_name": test_wallet_name, "group_id": test_group_id}
+        self.request.json = AsyncMock(return_value=body)
+        test_module.attempt_auto_author_with_endorser_setup = AsyncMock()
+        exporter = InMemorySpanExporter()
+        self.profile.context.injector.bind_instance(Tracer, Tracer(exporter))
+        mock_multitenant_mgr = AsyncMock(BaseMultitenantManager, autospec=True)
+        mock_multitenant_mgr.create_wallet = AsyncMock(
+            return_value=WalletRecord(
+                wallet_id=test_wallet_id,
+                key_management_mode=WalletRecord.MODE_MANAGED,
+                settings={},
+            )
+        )
+        mock_multitenant_mgr.create_auth_token = AsyncMock(return_value=test_token)
+        self.profile.context.injector.bind_instance(
+            BaseMultitenantManager, mock_multitenant_mgr
+        )
+
+        with patch.object(test_module.WalletRecord, "save", AsyncMock()):
+            await test_module.wallet_create(self.request)
+
+        spans = {span.name: span for span in exporter.spans}
+        assert list(spans) == [
+            "multitenant.create_wallet",
+            "wallet_record.save",
+            "multitenant.create_auth_token",
+            "multitenant.get_wallet_profile",
+            "endorser_setup",
+            "wallet_create",
+        ]
+        assert spans["wallet_record.save"].attributes == {
+            "group_id": test_group_id,
+            "wallet_id": test_wallet_id,
+        }
+        assert all(
+            span.trace_id == spans["wallet_create"].trace_id for span in exporter.spans
+        )
+
+    async def test_wallet_create_deferred_endorser_setup(self):
+        self.request.json = AsyncMock(return_value={"wallet_name": test_wallet_name})
+        test_module.attempt_auto_author_with_endorser_setup = AsyncMock()
+        endorser_setup = EndorserSetupQueue()
+        self.profile.context.injector.bind_instance(EndorserSetupQueue, endorser_setup)
+        wallet_record = WalletRecord(
+            wallet_id=test_wallet_id,
+            key_management_mode=WalletRecord.MODE_MANAGED,
+            settings={},
+        )
+        mock_multitenant_mgr = AsyncMock(BaseMultitenantManager, autospec=True)
+        mock_multitenant_mgr.create_wallet = AsyncMock(return_value=wallet_record)
+        mock_multitenant_mgr.create_auth_token = AsyncMock(return_value=test_token)
+        self.profile.context.injector.bind_instance(
+            BaseMultitenantManager, mock_multitenant_mgr
+        )
+
+        with patch.object(test_module.web, "json_response") as mock_response:
+            await test_module.wallet_create(self.request)
+
+            result = mock_response.call_args.args[0]
+            assert result["token"] == test_token
+            assert result["endorser_setup"] == "pending"
+            assert not test_module.attempt_auto_author_with_endorser_setup.called
+
+            await endorser_setup.join()
+            assert test_module.attempt_auto_author_with_endorser_setup.called
+
+            self.request.match_info = {"wallet_id": test_wallet_id}
+            await test_module.wallet_endorser_setup_status(self.request)
+            assert mock_response.call_args.args[0]["state"] == "completed"
+
+    async def test_wallet_endorser_setup_status_not_enabled(self):
+        self.request.match_info = {"wallet_id": test_wallet_id}
+
+        with self.assertRaises(test_module.web.HTTPNotFound):
+            await test_module.wallet_endorser_setup_status(self.request)
+
+    async def test_wallet_create_idempotency_key(self):
+        body = {"wallet_name": test_wallet_name}
+        self.request.json = AsyncMock(return_value=body)
+        self.request.headers = {"Idempotency-Key": "retry-key"}
+        self.profile.context.injector.bind_instance(
+            IdempotencyStore, IdempotencyStore(ttl=60)
+        )
+
+        with patch.object(
+            test_module, "create_subwallet", AsyncMock(return_value={"token": "t"})
+        ) as mock_create, patch.object(
+            test_module.web,
+            "json_response",
+            side_effect=lambda data: MagicMock(headers={}),
+        ):
+            first = await test_module.wallet_create(self.request)
+            second = await test_module.wallet_create(self.request)
+
+        mock_create.assert_awaited_once_with(self.context, body)
+        assert "Idempotent-Replayed" not in first.headers
+        assert second.headers["Idempotent-Replayed"] == "true"
+
+        self.request.json = AsyncMock(return_value={"wallet_name": "other"})
+        with self.assertRaises(test_module.web.HTTPUnprocessableEntity):
+            await test_module.wallet_create(self.request)
+
+    async def test_wallet_create_over_quota(self):
+        self.request.json = AsyncMock(
+            return_value={"wallet_name": test_wallet_name, "group_id": test_group_id}
+        )
+        mock_multitenant_mgr = AsyncMock(BaseMultitenantManager, autospec=True)
+        self.profile.context.injector.bind_instance(
+            BaseMultitenantManager, mock_multitenant_mgr
+        )
+        quotas = GroupQuotas({test_group_id: 1})
+        self.profile.context.injector.bind_instance(GroupQuotas, quotas)
+        await quotas.reserve(self.profile, test_group_id)
+
+        with self.assertRaises(test_module.web.HTTPForbidden):
+            await test_module.wallet_create(self.request)
+
+        mock_multitenant_mgr.create_wallet.assert_not_called()
+
+    async def test_wallet_create_keeps_slot_of_persisted_wallet(self):
+        self.request.json = AsyncMock(
+            return_value={"wallet_name": test_wallet_name, "group_id": test_group_id}
+        )
+        wallet_record = WalletRecord(
+            wallet_id=test_wallet_id,
+            new_with_id=True,
+            key_management_mode=WalletRecord.MODE_MANAGED,
+            settings={},
+        )
+        # The manager persists the wallet record it creates
+        async with self.profile.session() as session:
+            await wallet_record.save(session)
+        mock_multitenant_mgr = AsyncMock(BaseMultitenantManager, autospec=True)
+        mock_multitenant_mgr.create_wallet = AsyncMock(return_value=wallet_record)
+        mock_multitenant_mgr.create_auth_token.side_effect = MultitenantManagerError()
+        self.profile.context.injector.bind_instance(
+            BaseMultitenantManager, mock_multitenant_mgr
+        )
+        quotas = GroupQuotas({test_group_id: 2})
+        self.profile.context.injector.bind_instance(GroupQuotas, quotas)
+
+        with self.assertRaises(test_module.web.HTTPBadRequest):
+            await test_module.wallet_create(self.request)
+
+        # The wallet exists with its group tag, so it still counts
+        assert await quotas.count(self.profile, test_group_id) == 1
+
     async def test_wallet_create_x(self):
         body = {}
         self.request.json = AsyncMock(return_value=body)
@@ -640,6 +1017,62 @@ class TestMultitenantRoutes(unittest.IsolatedAsyncioTestCase):
                 {"settings": {}, "wallet_id": test_wallet_id, "group_id": test_group_id}
             )
 
+    async def test_wallet_get_timeout(self):
+        self.request.match_info = {"wallet_id": test_wallet_id}
+        self.profile.context.injector.bind_instance(
+            WalletGroupsConfig, WalletGroupsConfig(query_timeout=0.01)
+        )
+
+        async def slow_retrieve(*args, **kwargs):
+            await asyncio.sleep(10)
+
+        with patch.object(
+            test_module.WalletRecord, "retrieve_by_id", AsyncMock()
+        ) as mock_wallet_record_retrieve_by_id:
+            mock_wallet_record_retrieve_by_id.side_effect = slow_retrieve
+
+            with self.assertRaises(test_module.web.HTTPGatewayTimeout):
+                await test_module.wallet_get(self.request)
+
+    async def test_wallet_get_etag(self):
+        self.request.match_info = {"wallet_id": test_wallet_id}
+        mock_wallet_record = MagicMock(
+            wallet_id=test_wallet_id, updated_at="2024-01-01T00:00:00Z"
+        )
+        mock_wallet_record.serialize.return_value = dict_wallet_id_no_settings
+        etag = test_module.wallet_record_etag(mock_wallet_record)
+
+        with patch.object(
+            test_module.WalletRecord, "retrieve_by_id", AsyncMock()
+        ) as mock_wallet_record_retrieve_by_id, patch.object(
+            test_module.web, "json_response"
+        ) as mock_response:
+            mock_wallet_record_retrieve_by_id.return_value = mock_wallet_record
+            mock_response.return_value = MagicMock(headers={})
+
+            result = await test_module.wallet_get(self.request)
+
+            assert result.headers["ETag"] == etag
+
+    async def test_wallet_get_not_modified(self):
+        self.request.match_info = {"wallet_id": test_wallet_id}
+        mock_wallet_record = MagicMock(
+            wallet_id=test_wallet_id, updated_at="2024-01-01T00:00:00Z"
+        )
+        etag = test_module.wallet_record_etag(mock_wallet_record)
+        self.request.headers = {"If-None-Match": etag}
+
+        with patch.object(
+            test_module.WalletRecord, "retrieve_by_id", AsyncMock()
+        ) as mock_wallet_record_retrieve_by_id:
+            mock_wallet_record_retrieve_by_id.return_value = mock_wallet_record
+
+            with self.assertRaises(test_module.web.HTTPNotModified) as context:
+                await test_module.wallet_get(self.request)
+
+            assert context.exception.headers["ETag"] == etag
+            mock_wallet_record.serialize.assert_not_called()
+
     async def test_wallet_get_not_found(self):
         self.request.match_info = {"wallet_id": test_wallet_id}
 
@@ -840,6 +1273,266 @@ class TestMultitenantRoutes(unittest.IsolatedAsyncioTestCase):
                 )
                 await test_module.wallet_remove(self.request)
 
+    async def test_group_tokens_create(self):
+        self.request.match_info = {"group_id": test_group_id}
+        managed = MagicMock(wallet_id="managed", requires_external_key=False)
+        unmanaged = MagicMock(wallet_id="unmanaged", requires_external_key=True)
+        failing = MagicMock(wallet_id="failing", requires_external_key=False)
+
+        async def iter_records(profile, tag_filter, page_size, timeout):
+            assert tag_filter == {"group_id": test_group_id}
+            yield [managed, unmanaged]
+            yield [failing]
+
+        async def create_auth_token(wallet_record):
+            if wallet_record is failing:
+                raise MultitenantManagerError("token failure")
+            return test_token
+
+        mock_multitenant_mgr = AsyncMock(BaseMultitenantManager, autospec=True)
+        mock_multitenant_mgr.create_auth_token = AsyncMock(
+            side_effect=create_auth_token
+        )
+        self.profile.context.injector.bind_instance(
+            BaseMultitenantManager, mock_multitenant_mgr
+        )
+
+        with patch.object(
+            test_module, "iter_wallet_records", iter_records
+        ), patch.object(test_module.web, "StreamResponse") as mock_stream:
+            mock_stream.return_value = AsyncMock()
+
+            result = await test_module.group_tokens_create(self.request)
+
+            lines = [
+                json.loads(call.args[0])
+                for call in result.write.await_args_list
+            ]
+            assert sorted(lines, key=lambda line: line["wallet_id"]) == [
+                {"wallet_id": "failing", "error": "token failure."},
+                {"wallet_id": "managed", "token": test_token},
+                {
+                    "wallet_id": "unmanaged",
+                    "error": "Wallet key required to create token for unmanaged wallet",
+                },
+            ]
+            mock_multitenant_mgr.create_auth_token.assert_any_await(managed)
+            result.write_eof.assert_awaited_once()
+
+    async def test_group_tokens_create_storage_x(self):
+        self.request.match_info = {"group_id": test_group_id}
+
+        async def iter_records(profile, tag_filter, page_size, timeout):
+            raise StorageError("storage failure")
+            yield  # pragma: no cover
+
+        self.profile.context.injector.bind_instance(
+            BaseMultitenantManager, AsyncMock(BaseMultitenantManager, autospec=True)
+        )
+
+        with patch.object(
+            test_module, "iter_wallet_records", iter_records
+        ), patch.object(test_module.web, "StreamResponse") as mock_stream:
+            mock_stream.return_value = AsyncMock()
+
+            result = await test_module.group_tokens_create(self.request)
+
+            result.write.assert_awaited_once_with(
+                json.dumps({"error": "storage failure."}).encode() + b"\n"
+            )
+
+    async def test_group_move(self):
+        self.request.match_info = {"group_id": test_group_id}
+        self.request.json = AsyncMock(return_value={"source_group_id": "other"})
+        progress = MoveProgress(moved=[test_wallet_id], total_moved=1)
+
+        async def move(profile, group_id, **kwargs):
+            assert group_id == test_group_id
+            assert kwargs == {
+                "wallet_ids": None,
+                "source_group_id": "other",
+                "chunk_size": 100,
+                "timeout": 0.0,
+            }
+            yield progress
+            raise GroupQuotaExceededError("quota reached")
+
+        with patch.object(test_module, "move_wallets", move), patch.object(
+            test_module.web, "StreamResponse"
+        ) as mock_stream:
+            mock_stream.return_value = AsyncMock()
+
+            result = await test_module.group_move(self.request)
+
+            lines = [
+                json.loads(call.args[0]) for call in result.write.await_args_list
+            ]
+            assert lines == [progress.serialize(), {"error": "quota reached."}]
+
+    async def test_group_move_requires_one_selection(self):
+        self.request.match_info = {"group_id": test_group_id}
+
+        for body in (
+            {},
+            {"wallet_ids": [test_wallet_id], "source_group_id": "other"},
+            {"source_group_id": test_group_id},
+        ):
+            self.request.json = AsyncMock(return_value=body)
+            with self.assertRaises(test_module.web.HTTPBadRequest):
+                await test_module.group_move(self.request)
+
+    async def test_group_events(self):
+        self.request.match_info = {"group_id": test_group_id}
+        change_feed = GroupChangeFeed()
+        self.profile.context.injector.bind_instance(GroupChangeFeed, change_feed)
+        event = await change_feed.publish(test_group_id, "created", test_wallet_id)
+
+        with patch.object(test_module.web, "json_response") as mock_response:
+            await test_module.group_events(self.request)
+
+            mock_response.assert_called_once_with(
+                {
+                    "events": [event.serialize()],
+                    "cursor": event.sequence,
+                    "truncated": False,
+                }
+            )
+
+    async def test_group_events_timeout(self):
+        self.request.match_info = {"group_id": test_group_id}
+        self.request.query = {"after": "1", "timeout": "0"}
+        change_feed = GroupChangeFeed()
+        self.profile.context.injector.bind_instance(GroupChangeFeed, change_feed)
+
+        with patch.object(test_module.web, "json_response") as mock_response:
+            await test_module.group_events(self.request)
+
+            mock_response.assert_called_once_with(
+                {"events": [], "cursor": change_feed.sequence, "truncated": True}
+            )
+
+    async def test_group_events_stream(self):
+        self.request.match_info = {"group_id": test_group_id}
+        self.request.headers = {"Accept": "text/event-stream"}
+        change_feed = GroupChangeFeed()
+        self.profile.context.injector.bind_instance(GroupChangeFeed, change_feed)
+        self.profile.context.injector.bind_instance(
+            WalletGroupsConfig, WalletGroupsConfig(change_feed_heartbeat=0.01)
+        )
+        event = await change_feed.publish(test_group_id, "created", test_wallet_id)
+
+        with patch.object(test_module.web, "StreamResponse") as mock_stream:
+            # Client disconnects after receiving the first event
+            mock_stream.return_value = AsyncMock(
+                write=AsyncMock(side_effect=[None, ConnectionResetError()])
+            )
+
+            result = await test_module.group_events(self.request)
+
+            assert result.write.await_args_list[0].args[0] == (
+                test_module.format_server_sent_event(event)
+            )
+
+    async def test_wallet_update_notifies_group_move(self):
+        self.request.match_info = {"wallet_id": test_wallet_id}
+        self.request.json = AsyncMock(return_value={"group_id": test_group_id})
+        wallet_record = WalletRecord(
+            wallet_id=test_wallet_id,
+            key_management_mode=WalletRecord.MODE_MANAGED,
+            settings={},
+            group_id="old-group-id",
+        )
+        mock_multitenant_mgr = AsyncMock(BaseMultitenantManager, autospec=True)
+        mock_multitenant_mgr.update_wallet = AsyncMock(return_value=wallet_record)
+        self.profile.context.injector.bind_instance(
+            BaseMultitenantManager, mock_multitenant_mgr
+        )
+
+        with patch.object(
+            test_module, "notify_wallet_event", AsyncMock()
+        ) as mock_notify, patch.object(WalletRecord, "save", AsyncMock()):
+            await test_module.wallet_update(self.request)
+
+            mock_notify.assert_awaited_once_with(
+                self.profile,
+                test_module.WALLET_UPDATED,
+                test_wallet_id,
+                test_group_id,
+                "old-group-id",
+            )
+
+    async def test_wallet_remove_notifies(self):
+        self.request.has_body = False
+        self.request.match_info = {"wallet_id": test_wallet_id}
+        mock_multitenant_mgr = AsyncMock(BaseMultitenantManager, autospec=True)
+        self.profile.context.injector.bind_instance(
+            BaseMultitenantManager, mock_multitenant_mgr
+        )
+
+        with patch.object(
+            test_module.WalletRecord, "retrieve_by_id", AsyncMock()
+        ) as mock_retrieve, patch.object(
+            test_module, "notify_wallet_event", AsyncMock()
+        ) as mock_notify:
+            mock_retrieve.return_value = MagicMock(group_id=test_group_id)
+
+            await test_module.wallet_remove(self.request)
+
+            mock_notify.assert_awaited_once_with(
+                self.profile, test_module.WALLET_REMOVED, test_wallet_id, test_group_id
+            )
+
+    async def test_metrics_get(self):
+        self.profile.context.injector.bind_instance(
+            WalletGroupsConfig, WalletGroupsConfig(metrics_group_counts=True)
+        )
+
+        with patch.object(
+            test_module.METRICS, "refresh_group_wallets", AsyncMock()
+        ) as mock_refresh:
+            response = await test_module.metrics_get(self.request)
+
+        mock_refresh.assert_awaited_once_with(self.profile, 60.0)
+        assert response.content_type == "text/plain"
+        assert b"# TYPE wallet_groups_request_duration_seconds histogram" in (
+            response.body
+        )
+
+    async def test_wallets_list_records_metrics(self):
+        with patch.object(
+            test_module.WalletRecord, "query", AsyncMock(return_value=[])
+        ), patch.object(test_module.web, "json_response"):
+            await test_module.wallets_list(self.request)
+
+        assert ("wallets_list",) in test_module.METRICS.storage_duration.values
+        assert ("wallets_list",) in test_module.METRICS.result_size.values
+
+    async def test_group_idle_wallets(self):
+        self.request.match_info = {"group_id": test_group_id}
+        self.request.query = {"since": "2000"}
+        tracker = ActivityTracker()
+        tracker.idle_wallets = AsyncMock(
+            return_value=[{"wallet_id": test_wallet_id, "last_active": 1000.0}]
+        )
+        self.profile.context.injector.bind_instance(ActivityTracker, tracker)
+
+        with patch.object(test_module.web, "json_response") as mock_response:
+            await test_module.group_idle_wallets(self.request)
+
+        tracker.idle_wallets.assert_awaited_once_with(
+            self.profile, test_group_id, 2000, 100, 0
+        )
+        mock_response.assert_called_once_with(
+            {"results": [{"wallet_id": test_wallet_id, "last_active": 1000.0}]}
+        )
+
+    async def test_group_idle_wallets_not_enabled(self):
+        self.request.match_info = {"group_id": test_group_id}
+        self.request.query = {"since": "2000"}
+
+        with self.assertRaises(test_module.web.HTTPNotFound):
+            await test_module.group_idle_wallets(self.request)
+
     async def test_register(self):
         mock_app = MagicMock()
         mock_app.add_routes = MagicMock()
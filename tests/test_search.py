@@ -0,0 +1,149 @@
+import unittest
+from unittest.mock import patch
+
+from acapy_agent.core.event_bus import Event
+from acapy_agent.utils.testing import create_test_profile
+from acapy_agent.wallet.models.wallet_record import WalletRecord
+
+import acapy_wallet_groups_plugin.v1_0  # noqa: F401 - patches WalletRecord group_id
+from acapy_wallet_groups_plugin.v1_0 import search as test_module
+from acapy_wallet_groups_plugin.v1_0.events import WALLET_EVENT_TOPIC_PREFIX
+
+test_group_id = "test-group-id"
+
+
+class TestGroupIndex(unittest.TestCase):
+    def test_search(self):
+        index = test_module.GroupIndex()
+        index.put("1", test_module.SearchEntry("acme-prod", "ACME Corporation"))
+        index.put("2", test_module.SearchEntry("acme-dev", "Acme Development"))
+        index.put("3", test_module.SearchEntry("globex", "Globex"))
+
+        assert index.search("acme") == ["2", "1"]
+        assert index.search("CORP") == ["1"]
+        assert index.search("ac") == ["2", "1"]
+        assert index.search("x") == ["3"]
+        assert index.search("initech") == []
+
+    def test_put_replaces_and_discard_removes(self):
+        index = test_module.GroupIndex()
+        index.put("1", test_module.SearchEntry("acme", "ACME"))
+        index.put("1", test_module.SearchEntry("acme", "Renamed"))
+
+        assert index.search("renamed") == ["1"]
+        assert index.search("acme") == ["1"]
+        assert "ren" in index.ngrams
+
+        index.discard("1")
+        index.discard("unknown")
+
+        assert index.search("acme") == []
+        assert not index.ngrams
+
+
+class TestGroupSearchIndex(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.profile = await create_test_profile()
+        self.index = test_module.GroupSearchIndex(max_groups=1, page_size=2)
+
+        async with self.profile.session() as session:
+            for name, label, group_id in (
+                ("acme-prod", "ACME Corporation", test_group_id),
+                ("acme-dev", "Acme Development", test_group_id),
+                ("globex", "Globex", test_group_id),
+                ("acme-other", "ACME Other", "other-group-id"),
+            ):
+                await WalletRecord(
+                    wallet_id=name,
+                    new_with_id=True,
+                    key_management_mode=WalletRecord.MODE_MANAGED,
+                    settings={"wallet.name": name, "default_label": label},
+                    group_id=group_id,
+                ).save(session)
+
+    async def notify(self, state: str, wallet_id: str, group_id: str, previous=None):
+        await self.index.on_wallet_event(
+            self.profile,
+            Event(
+                f"{WALLET_EVENT_TOPIC_PREFIX}{state}",
+                {
+                    "wallet_id": wallet_id,
+                    "group_id": group_id,
+                    "previous_group_id": previous,
+                },
+            ),
+        )
+
+    async def test_query(self):
+        records = await self.index.query(self.profile, test_group_id, "acme", 10, 0)
+
+        assert [record.wallet_id for record in records] == ["acme-dev", "acme-prod"]
+        assert [
+            record.wallet_id
+            for record in await self.index.query(
+                self.profile, test_group_id, "acme", 10, 1
+            )
+        ] == ["acme-prod"]
+        assert await self.index.search(
+            self.profile, test_group_id, "acme", wallet_name="acme-prod"
+        ) == ["acme-prod"]
+
+    async def test_indexed_once(self):
+        with patch.object(
+            test_module, "iter_wallet_records", wraps=test_module.iter_wallet_records
+        ) as mock_iter:
+            await self.index.search(self.profile, test_group_id, "acme")
+            await self.index.search(self.profile, test_group_id, "globex")
+
+            mock_iter.assert_called_once()
+
+        # Only the most recently searched group is kept
+        await self.index.search(self.profile, "other-group-id", "acme")
+        assert list(self.index.groups) == ["other-group-id"]
+
+    async def test_kept_current_by_wallet_events(self):
+        await self.index.search(self.profile, test_group_id, "acme")
+
+        async with self.profile.session() as session:
+            record = await WalletRecord.retrieve_by_id(session, "globex")
+            record.update_settings({"default_label": "Globex ACME"})
+            await record.save(session)
+            await WalletRecord(
+                wallet_id="acme-new",
+                new_with_id=True,
+                key_management_mode=WalletRecord.MODE_MANAGED,
+                settings={"wallet.name": "acme-new", "default_label": "New"},
+                group_id=test_group_id,
+            ).save(session)
+            moved = await WalletRecord.retrieve_by_id(session, "acme-prod")
+            moved.group_id = "other-group-id"
+            await moved.save(session)
+
+        await self.notify("updated", "globex", test_group_id)
+        await self.notify("created", "acme-new", test_group_id)
+        await self.notify("updated", "acme-prod", "other-group-id", test_group_id)
+        await self.notify("removed", "acme-dev", test_group_id)
+
+        assert await self.index.search(self.profile, test_group_id, "acme") == [
+            "acme-new",
+            "globex",
+        ]
+
+    async def test_changes_while_indexing(self):
+        async def iter_records(profile, tag_filter, page_size):
+            async with profile.session() as session:
+                records = await WalletRecord.query(session, tag_filter)
+            # A wallet changes after its page was read
+            record = next(record for record in records if record.wallet_id == "globex")
+            async with profile.session() as session:
+                changed = await WalletRecord.retrieve_by_id(session, "globex")
+                changed.update_settings({"default_label": "Globex ACME"})
+                await changed.save(session)
+            await self.notify("updated", "globex", test_group_id)
+            assert record.settings["default_label"] == "Globex"
+            yield records
+
+        with patch.object(test_module, "iter_wallet_records", iter_records):
+            wallet_ids = await self.index.search(self.profile, test_group_id, "acme")
+
+        assert wallet_ids == ["acme-dev", "acme-prod", "globex"]
@@ -0,0 +1,131 @@
+import unittest
+
+from acapy_agent.core.event_bus import Event
+from acapy_agent.utils.testing import create_test_profile
+from acapy_agent.wallet.models.wallet_record import WalletRecord
+
+from acapy_wallet_groups_plugin.v1_0.events import WALLET_EVENT_TOPIC_PREFIX
+from acapy_wallet_groups_plugin.v1_0.sharding import ShardRouter
+
+
+def wallet_event(state, wallet_id, group_id, previous_group_id=None, **payload):
+    return Event(
+        f"{WALLET_EVENT_TOPIC_PREFIX}{state}",
+        {
+            "wallet_id": wallet_id,
+            "group_id": group_id,
+            "previous_group_id": previous_group_id,
+            **payload,
+        },
+    )
+
+
+class TestShardRouter(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.profile = await create_test_profile()
+        self.router = ShardRouter(group_shards={"group-a": "a", "group-b": "b"})
+        self.router.shards = {
+            "a": await create_test_profile(),
+            "b": await create_test_profile(),
+        }
+
+        async with self.profile.session() as session:
+            for index, group_id in enumerate(["group-a", "group-b", "group-a"]):
+                await WalletRecord(
+                    wallet_id=f"wallet-{index}",
+                    new_with_id=True,
+                    key_management_mode=WalletRecord.MODE_MANAGED,
+                    settings={"wallet.name": f"wallet-{index}", "wallet.key": "key"},
+                    group_id=group_id,
+                ).save(session)
+
+    async def shard_wallet_ids(self, name):
+        async with self.router.shards[name].session() as session:
+            records = await WalletRecord.query(session, {})
+        return sorted(record.wallet_id for record in records)
+
+    async def test_shard_for(self):
+        assert self.router.shard_for("group-b") == "b"
+        assert self.router.shard_for("other") == self.router.shard_for("other")
+        assert self.router.shard_for("other") in ("a", "b")
+
+    async def test_fill_copies_wallets_without_keys(self):
+        assert await self.router.fill(self.profile) == 3
+        assert self.router.ready
+
+        assert await self.shard_wallet_ids("a") == ["wallet-0", "wallet-2"]
+        assert await self.shard_wallet_ids("b") == ["wallet-1"]
+
+        records = await self.router.query({"group_id": "group-a"}, 10, 0)
+        assert sorted(record.wallet_id for record in records) == [
+            "wallet-0",
+            "wallet-2",
+        ]
+        assert all("wallet.key" not in record.settings for record in records)
+
+        # Filled shards with the same assignment are not copied again
+        assert await self.router.fill(self.profile) == 0
+
+    async def test_fill_repairs_filled_shards(self):
+        await self.router.fill(self.profile)
+
+        # Replica writes lost while the agent was down
+        async with self.router.shards["a"].session() as session:
+            replica = await WalletRecord.retrieve_by_id(session, "wallet-2")
+            await replica.delete_record(session)
+        async with self.profile.session() as session:
+            wallet_record = await WalletRecord.retrieve_by_id(session, "wallet-1")
+            await wallet_record.delete_record(session)
+            wallet_record = await WalletRecord.retrieve_by_id(session, "wallet-0")
+            wallet_record.update_settings({"wallet.name": "renamed"})
+            await wallet_record.save(session)
+
+        router = ShardRouter(group_shards=self.router.group_shards)
+        router.shards = self.router.shards
+        assert await router.fill(self.profile) == 2
+        assert router.ready
+
+        assert await self.shard_wallet_ids("a") == ["wallet-0", "wallet-2"]
+        assert await self.shard_wallet_ids("b") == []
+        async with router.shards["a"].session() as session:
+            replica = await WalletRecord.retrieve_by_id(session, "wallet-0")
+        assert replica.settings["wallet.name"] == "renamed"
+
+    async def test_query_merges_shards(self):
+        await self.router.fill(self.profile)
+
+        records = await self.router.query({}, 2, 1)
+
+        assert [record.wallet_id for record in records] == ["wallet-1", "wallet-2"]
+
+    async def test_replicas_follow_wallet_events(self):
+        await self.router.fill(self.profile)
+
+        async with self.profile.session() as session:
+            wallet_record = await WalletRecord.retrieve_by_id(session, "wallet-0")
+            wallet_record.group_id = "group-b"
+            await wallet_record.save(session)
+        await self.router.on_wallet_event(
+            self.profile, wallet_event("updated", "wallet-0", "group-b", "group-a")
+        )
+
+        assert await self.shard_wallet_ids("a") == ["wallet-2"]
+        assert await self.shard_wallet_ids("b") == ["wallet-0", "wallet-1"]
+
+        await self.router.on_wallet_event(
+            self.profile, wallet_event("removed", "wallet-1", "group-b")
+        )
+
+        assert await self.shard_wallet_ids("b") == ["wallet-0"]
+
+    async def test_relayed_events_applied_unless_shards_shared(self):
+        await self.router.fill(self.profile)
+        relayed = wallet_event("removed", "wallet-1", "group-b", origin="other-node")
+
+        self.router.shared = True
+        await self.router.on_wallet_event(self.profile, relayed)
+        assert await self.shard_wallet_ids("b") == ["wallet-1"]
+
+        self.router.shared = False
+        await self.router.on_wallet_event(self.profile, relayed)
+        assert await self.shard_wallet_ids("b") == []
@@ -0,0 +1,88 @@
+import unittest
+from unittest.mock import patch
+
+from acapy_agent.storage.base import BaseStorage
+from acapy_agent.utils.testing import create_test_profile
+from acapy_agent.wallet.models.wallet_record import WalletRecord
+
+import acapy_wallet_groups_plugin.v1_0  # noqa: F401 - patches WalletRecord group_id
+from acapy_wallet_groups_plugin.v1_0 import snapshot as test_module
+
+test_group_id = "test-group-id"
+other_group_id = "other-group-id"
+
+
+class TestGroupSnapshots(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.profile = await create_test_profile()
+        self.snapshots = test_module.GroupSnapshots(ttl=60, page_size=2, chunk_size=2)
+
+        for index in range(5):
+            await self.save_wallet(f"wallet-{index}", test_group_id)
+        await self.save_wallet("wallet-other", other_group_id)
+
+    async def save_wallet(self, wallet_id: str, group_id: str):
+        async with self.profile.session() as session:
+            await WalletRecord(
+                wallet_id=wallet_id,
+                new_with_id=True,
+                key_management_mode=WalletRecord.MODE_MANAGED,
+                settings={"wallet.name": wallet_id},
+                group_id=group_id,
+            ).save(session)
+
+    async def list_snapshot(self, snapshot_id: str, limit: int):
+        wallet_ids = []
+        for offset in range(0, 5, limit):
+            _, records = await self.snapshots.page(
+                self.profile, snapshot_id, limit, offset
+            )
+            wallet_ids.extend(record.wallet_id for record in records)
+        return wallet_ids
+
+    async def test_pages_are_stable(self):
+        snapshot = await self.snapshots.create(self.profile, test_group_id)
+        assert snapshot.count == 5
+
+        captured = await self.list_snapshot(snapshot.snapshot_id, 3)
+        assert sorted(captured) == [f"wallet-{index}" for index in range(5)]
+
+        # Wallets created or removed since do not shift the pages
+        await self.save_wallet("wallet-new", test_group_id)
+        async with self.profile.session() as session:
+            wallet_record = await WalletRecord.retrieve_by_id(session, captured[0])
+            await wallet_record.delete_record(session)
+
+        assert await self.list_snapshot(snapshot.snapshot_id, 3) == captured[1:]
+
+    async def test_page_beyond_snapshot(self):
+        snapshot = await self.snapshots.create(self.profile, test_group_id)
+
+        _, records = await self.snapshots.page(
+            self.profile, snapshot.snapshot_id, 10, 5
+        )
+
+        assert records == []
+
+    async def test_unknown_or_expired_snapshot(self):
+        with self.assertRaises(test_module.SnapshotNotFoundError):
+            await self.snapshots.page(self.profile, "unknown", 10, 0)
+
+        snapshot = await self.snapshots.create(self.profile, test_group_id)
+        with patch.object(test_module.time, "time", return_value=snapshot.expires_at):
+            with self.assertRaises(test_module.SnapshotNotFoundError):
+                await self.snapshots.page(self.profile, snapshot.snapshot_id, 10, 0)
+
+    async def test_expired_snapshots_purged(self):
+        snapshot = await self.snapshots.create(self.profile, test_group_id)
+
+        with patch.object(
+            test_module.time, "time", return_value=snapshot.expires_at + 61
+        ):
+            await self.snapshots.create(self.profile, other_group_id)
+
+        async with self.profile.session() as session:
+            records = await session.inject(BaseStorage).find_all_records(
+                test_module.SNAPSHOT_RECORD_TYPE, {"snapshot_id": snapshot.snapshot_id}
+            )
+        assert records == []
@@ -0,0 +1,82 @@
+import unittest
+from unittest.mock import MagicMock
+
+from acapy_agent.utils.testing import create_test_profile
+from aiohttp import web
+
+from acapy_wallet_groups_plugin.v1_0.tracing import (
+    NOOP_SPAN,
+    STATUS_ERROR,
+    InMemorySpanExporter,
+    LoggingSpanExporter,
+    Tracer,
+    load_exporter,
+    start_span,
+    traced,
+)
+
+
+class TestTracing(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.profile = await create_test_profile()
+        self.exporter = InMemorySpanExporter()
+        self.profile.context.injector.bind_instance(Tracer, Tracer(self.exporter))
+
+    async def test_nested_spans_share_trace(self):
+        with start_span(self.profile, "parent", group_id="group") as parent:
+            with start_span(self.profile, "child", wallet_id=None) as child:
+                child.set_attribute("record_count", 3)
+
+        assert [span.name for span in self.exporter.spans] == ["child", "parent"]
+        assert child.trace_id == parent.trace_id
+        assert child.parent_id == parent.span_id
+        assert parent.parent_id is None
+        assert parent.attributes == {"group_id": "group"}
+        assert child.attributes == {"record_count": 3}
+        assert child.duration >= 0
+
+    async def test_span_records_error(self):
+        with self.assertRaises(ValueError):
+            with start_span(self.profile, "failing"):
+                raise ValueError()
+        with self.assertRaises(web.HTTPNotModified):
+            with start_span(self.profile, "not_modified"):
+                raise web.HTTPNotModified()
+
+        [failing] = self.exporter.by_name("failing")
+        [not_modified] = self.exporter.by_name("not_modified")
+        assert failing.status == STATUS_ERROR
+        assert failing.error == "ValueError"
+        assert not_modified.error is None
+
+    async def test_traced_handler_is_root_span(self):
+        @traced
+        async def handler(request):
+            with start_span(self.profile, "step"):
+                return web.Response()
+
+        context = MagicMock(profile=self.profile)
+        await handler(MagicMock(__getitem__=lambda _, k: context))
+
+        [step] = self.exporter.by_name("step")
+        [root] = self.exporter.by_name("handler")
+        assert step.parent_id == root.span_id
+
+    async def test_start_span_without_tracer(self):
+        profile = await create_test_profile()
+
+        with start_span(profile, "disabled") as span:
+            span.set_attribute("ignored", True)
+
+        assert span is NOOP_SPAN
+
+    def test_load_exporter(self):
+        assert isinstance(load_exporter("memory"), InMemorySpanExporter)
+        assert isinstance(
+            load_exporter(
+                "acapy_wallet_groups_plugin.v1_0.tracing:LoggingSpanExporter"
+            ),
+            LoggingSpanExporter,
+        )
+        with self.assertRaises(ValueError):
+            load_exporter("unknown")
@@ -0,0 +1,192 @@
+import unittest
+from unittest.mock import AsyncMock, MagicMock
+
+from acapy_agent.utils.testing import create_test_profile
+from aiohttp import web
+from aiohttp_apispec import match_info_schema, request_schema
+from marshmallow import Schema, fields, post_load, validates, validates_schema
+from marshmallow.exceptions import ValidationError
+
+from acapy_wallet_groups_plugin.v1_0 import routes
+from acapy_wallet_groups_plugin.v1_0 import validation as test_module
+from acapy_wallet_groups_plugin.v1_0.config import WalletGroupsConfig
+
+create_body = {
+    "wallet_name": "wallet_name",
+    "wallet_key": "dummy_key",
+    "wallet_type": "askar",
+    "wallet_dispatch_type": "base",
+    "wallet_webhook_urls": ["http://localhost:8022/webhooks"],
+    "label": "test-label",
+    "group_id": "test-group-id",
+    "extra_settings": {"ACAPY_AUTO_ACCEPT_INVITES": True},
+}
+
+
+class JsonRequest(dict):
+    def __init__(self, app: dict, profile, body):
+        super().__init__(context=MagicMock(profile=profile))
+        self.app = app
+        self.body_exists = True
+        self.content_type = "application/json"
+        self.json = AsyncMock(return_value=body)
+
+
+class TestCompiledValidator(unittest.TestCase):
+    def test_load_valid_body(self):
+        schema = routes.CreateWalletRequestWithGroupIdSchema()
+        validator = test_module.CompiledValidator(schema)
+
+        assert validator.supported
+        for body in (
+            create_body,
+            {**create_body, "unknown": "excluded"},
+            {"wallet_name": "wallet_name", "image_url": None},
+            {},
+        ):
+            try:
+                expected = schema.load(body)
+            except ValidationError:
+                expected = None
+            assert validator.load(body) == expected
+
+    def test_load_leaves_invalid_body_to_schema(self):
+        schema = routes.CreateWalletRequestWithGroupIdSchema()
+        validator = test_module.CompiledValidator(schema)
+
+        for body in (
+            {**create_body, "wallet_dispatch_type": "unknown"},
+            {**create_body, "wallet_webhook_urls": "http://localhost:8022"},
+            {**create_body, "wallet_webhook_urls": [None]},
+            {**create_body, "label": 1},
+            {**create_body, "extra_settings": []},
+            {"wallet_type": "indy"},
+            ["not", "an", "object"],
+        ):
+            with self.assertRaises(ValidationError):
+                schema.load(body)
+            assert validator.load(body) is None
+
+    def test_validation_hooks(self):
+        class HookSchema(Schema):
+            label = fields.Str()
+            group_id = fields.Str()
+
+            @validates("group_id")
+            def validate_group_id(self, value, **kwargs):
+                if value == "invalid":
+                    raise ValidationError("Invalid group")
+
+            @validates_schema
+            def validate_label(self, data, **kwargs):
+                if data.get("label") == "invalid":
+                    raise ValidationError("Invalid label")
+
+        validator = test_module.CompiledValidator(HookSchema())
+
+        assert validator.supported
+        assert validator.has_validators
+        assert validator.load({"label": "valid", "group_id": "group"}) == {
+            "label": "valid",
+            "group_id": "group",
+        }
+        assert validator.load({"label": "invalid"}) is None
+        assert validator.load({"group_id": "invalid"}) is None
+
+    def test_unsupported_schema(self):
+        class NestedSchema(Schema):
+            inner = fields.Nested(routes.GroupIdMatchInfoSchema())
+
+        class PostLoadSchema(Schema):
+            label = fields.Str()
+
+            @post_load
+            def make_label(self, data, **kwargs):
+                return data
+
+        for schema in (NestedSchema(), PostLoadSchema()):
+            validator = test_module.CompiledValidator(schema)
+
+            assert not validator.supported
+            assert validator.load({}) is None
+
+
+class TestValidatedBody(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.profile = await create_test_profile()
+        self.profile.context.injector.bind_instance(
+            WalletGroupsConfig, WalletGroupsConfig(fast_body_validation=True)
+        )
+        self.parser = MagicMock(parse=AsyncMock(return_value={"parsed": True}))
+        self.app = {
+            "_apispec_parser": self.parser,
+            "_apispec_request_data_name": "data",
+        }
+
+        @test_module.validated_body
+        @match_info_schema(routes.WalletIdMatchInfoSchema())
+        @request_schema(routes.CreateWalletRequestWithGroupIdSchema())
+        async def handler(request):
+            return await test_module.request_body(request)
+
+        self.handler = handler
+
+    def test_body_schemas_left_to_wrapper(self):
+        for handler in (self.handler, routes.wallet_update):
+            assert [schema["location"] for schema in handler.__schemas__] == [
+                "match_info"
+            ]
+        assert routes.wallet_create.__schemas__ == []
+
+    async def test_fast_path(self):
+        request = JsonRequest(self.app, self.profile, create_body)
+
+        body = await self.handler(request)
+
+        assert body == create_body
+        assert request["data"] == routes.CreateWalletRequestWithGroupIdSchema().load(
+            create_body
+        )
+        request.json.assert_awaited_once()
+        self.parser.parse.assert_not_awaited()
+
+    async def test_merged_with_middleware_data(self):
+        request = JsonRequest(self.app, self.profile, create_body)
+        request["data"] = {"wallet_id": "test-wallet-id"}
+
+        await self.handler(request)
+
+        assert request["data"] == {
+            **routes.CreateWalletRequestWithGroupIdSchema().load(create_body),
+            "wallet_id": "test-wallet-id",
+        }
+
+    async def test_invalid_body_loaded_by_parser(self):
+        self.parser.parse.side_effect = web.HTTPUnprocessableEntity()
+        request = JsonRequest(
+            self.app, self.profile, {**create_body, "wallet_type": "unknown"}
+        )
+
+        with self.assertRaises(web.HTTPUnprocessableEntity):
+            await self.handler(request)
+
+        self.parser.parse.assert_awaited_once()
+        assert test_module.BODY_KEY not in request
+
+    async def test_disabled(self):
+        self.profile.context.injector.bind_instance(
+            WalletGroupsConfig, WalletGroupsConfig()
+        )
+        request = JsonRequest(self.app, self.profile, create_body)
+
+        body = await self.handler(request)
+
+        assert body == create_body
+        assert request["data"] == {"parsed": True}
+        self.parser.parse.assert_awaited_once()
+
+    async def test_without_parser(self):
+        request = JsonRequest({}, self.profile, create_body)
+
+        assert await self.handler(request) == create_body
+        assert "data" not in request
@@ -0,0 +1,81 @@
+import unittest
+from unittest.mock import AsyncMock
+
+from acapy_agent.core.event_bus import Event
+from acapy_agent.multitenant.base import BaseMultitenantManager
+from acapy_agent.utils.testing import create_test_profile
+from acapy_agent.wallet.models.wallet_record import WalletRecord
+
+import acapy_wallet_groups_plugin.v1_0  # noqa: F401 - patches WalletRecord group_id
+from acapy_wallet_groups_plugin.v1_0.warmup import ProfileWarmer
+
+test_group_id = "test-group-id"
+
+
+class TestProfileWarmer(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.profile = await create_test_profile()
+        self.multitenant_mgr = AsyncMock(BaseMultitenantManager, autospec=True)
+        self.profile.context.injector.bind_instance(
+            BaseMultitenantManager, self.multitenant_mgr
+        )
+
+        async with self.profile.session() as session:
+            for index in range(4):
+                await WalletRecord(
+                    wallet_id=f"managed-{index}",
+                    new_with_id=True,
+                    key_management_mode=WalletRecord.MODE_MANAGED,
+                    settings={"wallet.name": f"managed-{index}"},
+                    group_id=test_group_id,
+                ).save(session)
+            await WalletRecord(
+                wallet_id="unmanaged",
+                new_with_id=True,
+                key_management_mode=WalletRecord.MODE_UNMANAGED,
+                settings={"wallet.name": "unmanaged"},
+                group_id=test_group_id,
+            ).save(session)
+            await WalletRecord(
+                wallet_id="other",
+                new_with_id=True,
+                key_management_mode=WalletRecord.MODE_MANAGED,
+                settings={"wallet.name": "other"},
+                group_id="other-group-id",
+            ).save(session)
+
+    def opened_wallet_ids(self):
+        return {
+            call.args[1].wallet_id
+            for call in self.multitenant_mgr.get_wallet_profile.await_args_list
+        }
+
+    async def test_warm_opens_managed_wallets_of_group(self):
+        warmer = ProfileWarmer([test_group_id], page_size=2)
+
+        warmed = await warmer.warm(self.profile)
+
+        assert warmed == 4
+        assert self.opened_wallet_ids() == {f"managed-{index}" for index in range(4)}
+
+    async def test_warm_respects_limit(self):
+        warmer = ProfileWarmer([test_group_id, "other-group-id"], limit=3, page_size=2)
+
+        warmed = await warmer.warm(self.profile)
+
+        assert warmed == 3
+        assert "other" not in self.opened_wallet_ids()
+
+    async def test_warm_counts_failures(self):
+        self.multitenant_mgr.get_wallet_profile.side_effect = Exception("failure")
+        warmer = ProfileWarmer(["other-group-id"])
+
+        assert await warmer.warm(self.profile) == 0
+
+    async def test_on_startup_runs_in_background(self):
+        warmer = ProfileWarmer([test_group_id])
+
+        await warmer.on_startup(self.profile, Event("acapy::core::startup"))
+
+        assert await warmer.task == 4
+        await warmer.on_shutdown(self.profile, Event("acapy::core::shutdown"))